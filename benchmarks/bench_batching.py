@@ -0,0 +1,77 @@
+"""
+Requests and prompt tokens of atomic-fact extraction, one chunk per request against packed requests.
+
+Chunks the sample book (or the PDF given) and extracts its atomic facts through
+the local fake server, once with a request per chunk and once per token budget
+with consecutive chunks packed into one request. The server counts requests and
+prompt tokens, system prompt included. With --drop-rate the fake leaves chunks
+out of packed answers, which are then sent again alone; every run must give the
+same facts as the unpacked one.
+
+Usage:
+    python -m benchmarks.bench_batching [--pdf book.pdf] [--chunks 200] [--budgets 2000 4000] [--latency 0.05]
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from benchmarks.fake_openai_server import FakeOpenAIServer, fake_key_atomic_facts
+from graphreader.document import Document
+from graphreader.graph_class import CHUNK_HEADER, CHUNK_HEADER_RE, Graph
+
+BOOK = 'Microsoft Word - ONE HUNDRED YEARS-MARQUEZ.doc.pdf'
+
+
+def dropping_responder(drop_rate, seed=0):
+    rng = random.Random(seed)
+
+    def respond(messages, model):
+        text = messages[-1]['content']
+        parts = CHUNK_HEADER_RE.split(text)
+        if len(parts) < 2:
+            return fake_key_atomic_facts(text)
+        # Each chunk of a packed request is left out of the answer with probability drop_rate
+        return "\n".join(CHUNK_HEADER.format(chunk_id) + "\n" + fake_key_atomic_facts(body)
+                         for chunk_id, body in zip(parts[1::2], parts[2::2]) if rng.random() >= drop_rate)
+    return respond
+
+
+def run(chunks, server, **kwargs):
+    requests, prompt_tokens = server.requests, server.prompt_tokens
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph = Graph(chunks, openai_api_key='fake', base_url=server.base_url, llm_cache=None, **kwargs)
+    return graph, {'requests': server.requests - requests, 'prompt_tokens': server.prompt_tokens - prompt_tokens,
+                   'seconds': round(time.perf_counter() - start, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pdf', default=BOOK)
+    parser.add_argument('--st-ind', type=int, default=705)
+    parser.add_argument('--chunks', type=int, default=200)
+    parser.add_argument('--budgets', type=int, nargs='+', default=[2000, 4000])
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        book = Document(args.pdf).get_chunks(st_ind=args.st_ind)
+    chunks = dict(list(book.items())[:args.chunks])
+    results = {'chunks': len(chunks), 'latency_s': args.latency, 'drop_rate': args.drop_rate}
+    with FakeOpenAIServer(latency=args.latency, responder=dropping_responder(args.drop_rate)) as server:
+        single, results['single'] = run(chunks, server)
+        for budget in args.budgets:
+            packed, stats = run(chunks, server, batch_tokens=budget)
+            stats.update(packed.batch_stats)
+            stats['request_factor'] = round(results['single']['requests'] / stats['requests'], 2)
+            stats['prompt_token_factor'] = round(results['single']['prompt_tokens'] / stats['prompt_tokens'], 2)
+            stats['identical'] = list(single.k_at_dict.items()) == list(packed.k_at_dict.items())
+            results[f'packed_{budget}'] = stats
+    print(json.dumps(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Memory held by a built Graph, networkx dicts against the compact array core.
+
+Builds the same synthetic corpus twice with the deterministic fake extractor,
+once with compact=False and once with compact=True, and measures with
+tracemalloc the memory still held by the Graph after the build, chunks
+excluded. Lookups through the tools' calls are timed on both and must return
+the same facts and neighbors.
+
+Usage:
+    python -m benchmarks.bench_compact_graph [--pages 300 1000] [--sentences 40]
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import time
+import tracemalloc
+from benchmarks.fakes import FakeOpenAIClient, SyntheticDocument
+from graphreader.graph_class import Graph
+
+
+def build(chunks, compact):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph = Graph(chunks, 'fake', gpt_client=FakeOpenAIClient(), llm_cache=None, compact=compact)
+    graph.chunks = None
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return graph, (held - before) / 2 ** 20, (peak - before) / 2 ** 20
+
+
+def lookups(graph, nodes):
+    start = time.perf_counter()
+    found = [(graph.nodes[node]['data'], list(graph.neighbors(node))) for node in nodes]
+    return found, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', type=int, nargs='+', default=[300, 1000])
+    parser.add_argument('--sentences', type=int, default=40)
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        with contextlib.redirect_stdout(io.StringIO()):
+            chunks = SyntheticDocument(pages, sentences_per_page=args.sentences).get_chunks()
+        dicts, dicts_mb, dicts_peak_mb = build(chunks, compact=False)
+        compact, compact_mb, compact_peak_mb = build(chunks, compact=True)
+        nodes = list(dicts.graph.nodes())
+        dict_found, dict_s = lookups(dicts.graph, nodes)
+        compact_found, compact_s = lookups(compact.graph, nodes)
+        print(json.dumps({
+            'pages': pages, 'chunks': len(chunks), 'nodes': len(nodes),
+            'edges': dicts.graph.number_of_edges(),
+            'networkx_held_mb': round(dicts_mb, 2), 'compact_held_mb': round(compact_mb, 2),
+            'networkx_peak_mb': round(dicts_peak_mb, 2), 'compact_peak_mb': round(compact_peak_mb, 2),
+            'compact_graph_mb': round(compact.graph.nbytes() / 2 ** 20, 2),
+            'networkx_lookup_s': round(dict_s, 4), 'compact_lookup_s': round(compact_s, 4),
+            'same_lookups': dict_found == compact_found,
+            'same_edges': compact.graph.number_of_edges() == dicts.graph.number_of_edges()}))
+
+
+if __name__ == '__main__':
+    main()
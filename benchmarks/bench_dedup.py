@@ -0,0 +1,83 @@
+"""
+Extraction requests and facts saved by near-duplicate chunk detection.
+
+Takes the first chunks of the sample book (or the PDF given) and appends
+near-duplicate copies of some of them: a running header glued on, a few words
+changed, as reprinted sections and copied appendices look. The graph is built
+with and without dedup_threshold through the fake extractor, and the detected
+duplicates are checked against the injected ones (and the book's own chunks
+must not be flagged). Every duplicate chunk must still be readable.
+
+Usage:
+    python -m benchmarks.bench_dedup [--pdf book.pdf] [--chunks 300] [--copies 0.3] [--threshold 0.8]
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from benchmarks.bench_batching import BOOK
+from benchmarks.fakes import FakeOpenAIClient
+from graphreader.dedup import dedup_chunks
+from graphreader.document import Document
+from graphreader.graph_class import Graph
+from graphreader.store import KnowledgeStore
+
+
+def near_copy(text, rng, edits=3):
+    # A header the page cleanup missed and a few changed words
+    words = text.split()
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = rng.choice(['the', 'a', 'of', 'and', 'Macondo'])
+    return "ONE HUNDRED YEARS OF SOLITUDE " + " ".join(words)
+
+
+def build(chunks, **kwargs):
+    client = FakeOpenAIClient()
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph = Graph(chunks, 'fake', gpt_client=client, llm_cache=None, **kwargs)
+    facts = sum(len(facts) for facts in graph.k_at_dict.values())
+    return graph, client.calls, facts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pdf', default=BOOK)
+    parser.add_argument('--st-ind', type=int, default=705)
+    parser.add_argument('--chunks', type=int, default=300)
+    parser.add_argument('--copies', type=float, default=0.3, help='Share of chunks appended again as near copies')
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        book = Document(args.pdf).get_chunks(st_ind=args.st_ind)
+    chunks = dict(list(book.items())[:args.chunks])
+    rng = random.Random(0)
+    originals = rng.sample(list(chunks), int(args.copies * len(chunks)))
+    injected = {}
+    for original in originals:
+        copy_id = len(chunks)
+        chunks[copy_id] = near_copy(chunks[original], rng)
+        injected[copy_id] = original
+
+    start = time.perf_counter()
+    _, duplicates = dedup_chunks(chunks, threshold=args.threshold)
+    dedup_s = time.perf_counter() - start
+    plain, plain_calls, plain_facts = build(chunks)
+    deduped, dedup_calls, dedup_facts = build(chunks, dedup_threshold=args.threshold)
+    store = KnowledgeStore(graph=deduped.graph, chunks=deduped.chunks)
+    found = set(duplicates.items())
+    print(json.dumps({'chunks': len(chunks), 'injected_copies': len(injected), 'dedup_s': round(dedup_s, 3),
+                      'duplicates_found': len(duplicates),
+                      'recall': round(len(found & set(injected.items())) / max(len(injected), 1), 3),
+                      'false_positives': len([chunk_id for chunk_id in duplicates if chunk_id not in injected]),
+                      'extraction_calls': {'plain': plain_calls, 'dedup': dedup_calls},
+                      'facts': {'plain': plain_facts, 'dedup': dedup_facts},
+                      'nodes': {'plain': plain.graph.number_of_nodes(), 'dedup': deduped.graph.number_of_nodes()},
+                      'same_as_graph_build': duplicates == deduped.chunk_duplicates,
+                      'duplicates_readable': all(store.chunk(chunk_id) == chunks[chunk_id] for chunk_id in duplicates)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of Document text extraction and chunking on the bundled PDF.
+
+Compares the original implementation (repeated string concatenation, one
+process, re-joining the chunk for every sentence) with the streaming pipeline,
+sequential and over a process pool, and checks the chunk dicts are identical.
+Peak traced Python memory is reported for each run.
+
+Usage:
+    python -m benchmarks.bench_document [--pdf PATH] [--workers 4] [--st-ind 705]
+"""
+import argparse
+import json
+import os
+import re
+import time
+import tracemalloc
+from graphreader.document import Document
+
+DEFAULT_PDF = 'Microsoft Word - ONE HUNDRED YEARS-MARQUEZ.doc.pdf'
+
+
+def legacy_chunks(doc, **kwargs):
+    # The original Document._get_text and get_chunks
+    text = ''
+    for page in doc.document.pages:
+        pg_text = page.extract_text()
+        if pg_text:
+            text += ' ' + doc._del_head_foot(pg_text, **kwargs)
+    sentences = re.split(r'(?<=[.!?]) +', text)
+    chunks = []
+    current_chunk = []
+    for sentence in sentences:
+        if len(' '.join(current_chunk + [sentence])) <= doc.chunk_len:
+            current_chunk.append(sentence)
+        else:
+            chunks.append(' '.join(current_chunk))
+            current_chunk = [sentence]
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+    return {i: chunk for i, chunk in enumerate(chunks) if chunk}
+
+
+def timed(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, round(elapsed, 3), round(peak / 2 ** 20, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pdf', default=DEFAULT_PDF)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--st-ind', type=int, default=705)
+    parser.add_argument('--chunk-len', type=int, default=1000)
+    args = parser.parse_args()
+
+    reference, legacy_s, legacy_mb = timed(
+        lambda: legacy_chunks(Document(args.pdf, chunk_len=args.chunk_len), st_ind=args.st_ind))
+    results = {'pages': len(Document(args.pdf).document.pages), 'chunks': len(reference),
+               'legacy_s': legacy_s, 'legacy_peak_mb': legacy_mb}
+    for workers in (1, args.workers):
+        doc = Document(args.pdf, chunk_len=args.chunk_len, workers=workers)
+        chunks, elapsed, peak = timed(lambda: doc.get_chunks(st_ind=args.st_ind))
+        results[f'streaming_w{workers}_s'] = elapsed
+        results[f'streaming_w{workers}_peak_mb'] = peak
+        results[f'streaming_w{workers}_identical'] = chunks == reference
+    results['speedup'] = round(legacy_s / results[f'streaming_w{args.workers}_s'], 2)
+    print(json.dumps(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Scaling benchmark for the graph edge construction in Graph._build.
+
+Times the single-pass key matcher on synthetic clean_dicts of 1k, 10k and 50k
+keys, and the original pairwise construction where it finishes in reasonable
+time. Whenever both run, the two graphs are checked to be identical, including
+node and adjacency order.
+
+Usage:
+    python -m benchmarks.bench_edge_build [--sizes 1000 10000 50000] [--legacy-max 1000]
+"""
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+import networkx as nx
+from graphreader.graph_class import Graph
+from graphreader.edge_builder import build_graph
+
+WORDS = ["colonel", "aureliano", "buendia", "ursula", "macondo", "gypsy", "melquiades",
+         "war", "rain", "ice", "river", "house", "alchemy", "letter", "priest", "soldier",
+         "banana", "company", "train", "gold", "fish", "remedios", "amaranta", "jose",
+         "arcadio", "pilar", "ternera", "rebeca", "fernanda", "meme", "mauricio", "babilonia"]
+
+
+def synthetic_clean_dict(n_keys, facts_per_key=3, mentions_per_fact=3, seed=0):
+    # Keys are unique multi word phrases, facts mention a few random keys each
+    rng = random.Random(seed)
+    keys = []
+    seen = set()
+    while len(keys) < n_keys:
+        key = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+        key = f"{key} {len(keys)}" if key in seen else key
+        seen.add(key)
+        keys.append(key)
+    clean_dict = defaultdict(list)
+    for chunk_id, key in enumerate(keys):
+        for _ in range(facts_per_key):
+            mentioned = [rng.choice(keys) for _ in range(mentions_per_fact)] + [key]
+            fact = " and ".join(mentioned).capitalize() + ", said the narrator."
+            clean_dict[key].append({'atom_fact': fact, 'chunk_id': chunk_id})
+    return clean_dict
+
+
+def legacy_build(clean_dict, clean_fn):
+    # The original pairwise construction from Graph._build
+    graph = nx.Graph()
+    for key, at_fact in clean_dict.items():
+        graph.add_node(key, data=at_fact)
+        for other_key in clean_dict:
+            other_document = clean_fn(". ".join(
+                [i["atom_fact"] for i in clean_dict[other_key]]))
+            self_documents = clean_fn(". ".join(
+                [i["atom_fact"] for i in clean_dict[key]]))
+            if key != other_key and (key in other_document) and (other_key in self_documents):
+                graph.add_edge(key, other_key)
+    return graph
+
+
+def same_graph(a, b):
+    return (list(a.nodes(data=True)) == list(b.nodes(data=True))
+            and list(a.edges()) == list(b.edges())
+            and all(list(a.adj[n]) == list(b.adj[n]) for n in a))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--legacy-max', type=int, default=1000)
+    args = parser.parse_args()
+
+    graph_obj = Graph.__new__(Graph)
+    clean_fn = graph_obj._clean_string
+    results = []
+    for n_keys in args.sizes:
+        clean_dict = synthetic_clean_dict(n_keys)
+        start = time.perf_counter()
+        graph = build_graph(clean_dict, clean_fn, show_progress=False)
+        result = {'keys': n_keys, 'edges': graph.number_of_edges(),
+                  'matcher_s': round(time.perf_counter() - start, 4)}
+        if n_keys <= args.legacy_max:
+            start = time.perf_counter()
+            reference = legacy_build(clean_dict, clean_fn)
+            result['pairwise_s'] = round(time.perf_counter() - start, 4)
+            result['identical'] = same_graph(graph, reference)
+        results.append(result)
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Latency and answers of fast mode against the full query pipeline.
+
+Builds a synthetic graph with the deterministic fakes and answers a fixed set
+of questions twice with the same reader: through the full pipeline (rational
+plan, LLM node selection, atomic-fact agent, chunk-reading agent) and in fast
+mode, where nodes come from the fusion of a BM25 index with the vector index
+and the chunks of their best facts go to the chunk-reading agent directly.
+Every LLM call waits --latency seconds. LLM calls and latency per query are
+reported with the overlap of the two runs: identical answers, word overlap of
+the answers and shared chunks, and the share of chunks naming a key of the
+question.
+
+Usage:
+    python -m benchmarks.bench_fast_path [--pages 200] [--queries 20] [--latency 0.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.fakes import FakeChatModel, FakeOpenAIClient, HashEncoder, SyntheticDocument, key_name
+from graphreader.graph_class import Graph
+from graphreader.graph_reader import GraphReader
+from graphreader.local_vector_store import LocalVectorStore
+from graphreader.store import KnowledgeStore
+
+
+def jaccard(first, second):
+    first, second = set(first), set(second)
+    return len(first & second) / len(first | second) if first | second else 1.0
+
+
+def run_queries(reader, questions, fast):
+    llms = (reader.llm, reader.agent_llm, reader.gpt_client)
+    calls = sum(llm.calls for llm in llms)
+    start = time.perf_counter()
+    sessions = []
+    for question, _ in questions:
+        session = reader.session(question, fast=fast)
+        session.run()
+        sessions.append(session)
+    seconds = time.perf_counter() - start
+    n = len(questions)
+    relevant = [any(key in reader.store.chunk(chunk_id).lower() for key in keys)
+                for session, (_, keys) in zip(sessions, questions) for chunk_id in session.sel_at_facts]
+    return sessions, {'llm_calls': round((sum(llm.calls for llm in llms) - calls) / n, 2),
+                      'query_s': round(seconds / n, 4),
+                      'relevant_chunk_share': round(sum(relevant) / max(len(relevant), 1), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        # The agents run verbose, their traces would bury the results
+        chunks = SyntheticDocument(args.pages).get_chunks()
+        graph = Graph(chunks, 'fake', gpt_client=FakeOpenAIClient(), llm_cache=None)
+        vector_store = LocalVectorStore(encoder_model=HashEncoder(), embedding_cache=None, path=Path(tmp) / 'index')
+        vector_store.upsert_data('bench', graph.graph)
+        reader = GraphReader(graph.graph, None, 'fake', vect_db_name='bench', vector_store=vector_store, upsert=False,
+                             llm_model=FakeChatModel(latency=args.latency), agent_llm=FakeChatModel(latency=args.latency),
+                             gpt_client=FakeOpenAIClient(latency=args.latency, responder=lambda q: "Find the facts about " + q),
+                             store=KnowledgeStore(graph=graph.graph, chunks=graph.chunks))
+        questions = [(f"What happened between {key_name(i)} and {key_name(i + 1)}?",
+                      (key_name(i).lower(), key_name(i + 1).lower())) for i in range(args.queries)]
+        start = time.perf_counter()
+        reader._hybrid_search("", [])
+        index_s = time.perf_counter() - start
+        full_sessions, full = run_queries(reader, questions, fast=False)
+        fast_sessions, fast = run_queries(reader, questions, fast=True)
+    pairs = list(zip(full_sessions, fast_sessions))
+    print(json.dumps({'pages': args.pages, 'nodes': graph.graph.number_of_nodes(), 'queries': args.queries,
+                      'latency_s': args.latency, 'bm25_index_s': round(index_s, 3), 'full': full, 'fast': fast,
+                      'speedup': round(full['query_s'] / fast['query_s'], 2),
+                      'same_answer': round(sum(a.response == b.response for a, b in pairs) / len(pairs), 3),
+                      'answer_word_overlap': round(sum(jaccard(a.response.split(), b.response.split())
+                                                       for a, b in pairs) / len(pairs), 3),
+                      'chunk_overlap': round(sum(jaccard(a.sel_at_facts, b.sel_at_facts) for a, b in pairs) / len(pairs), 3),
+                      'node_overlap': round(sum(jaccard(a.sel_nodes, b.sel_nodes) for a, b in pairs) / len(pairs), 3)}))
+
+
+if __name__ == '__main__':
+    main()
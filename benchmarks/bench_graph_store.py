@@ -0,0 +1,64 @@
+"""
+Write and load times of the binary graph store against GML.
+
+Builds synthetic key graphs, writes each one as GML and as a graph store, and
+times the writes, a full load, and opening the file plus one node lookup as a
+tool call does. The graph store is converted back to networkx and checked to be
+identical to the original, node data and adjacency order included.
+
+Usage:
+    python -m benchmarks.bench_graph_store [--sizes 1000 10000 50000] [--facts-per-key 3]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+import networkx as nx
+from benchmarks.bench_edge_build import same_graph, synthetic_clean_dict
+from graphreader.edge_builder import build_graph
+from graphreader.graph_class import Graph
+from graphreader.graph_store import GraphStore, write_graph_store
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, round(time.perf_counter() - start, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--facts-per-key', type=int, default=3)
+    args = parser.parse_args()
+
+    clean_fn = Graph.__new__(Graph)._clean_string
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for n_keys in args.sizes:
+            graph = build_graph(synthetic_clean_dict(n_keys, facts_per_key=args.facts_per_key), clean_fn,
+                                show_progress=False)
+            node = list(graph.nodes())[n_keys // 2]
+            gml_path, bin_path = tmp / f'{n_keys}.gml', tmp / f'{n_keys}.bin'
+            _, gml_write_s = timed(lambda: nx.write_gml(graph, gml_path))
+            _, bin_write_s = timed(lambda: write_graph_store(graph, bin_path))
+            _, gml_load_s = timed(lambda: nx.read_gml(gml_path))
+            store, bin_open_s = timed(lambda: GraphStore(bin_path))
+            _, bin_lookup_s = timed(lambda: (store.node_data(node), store.neighbors(node)))
+            loaded, bin_full_load_s = timed(store.to_networkx)
+            print(json.dumps({
+                'keys': n_keys, 'edges': graph.number_of_edges(),
+                'gml_mb': round(os.path.getsize(gml_path) / 2 ** 20, 2),
+                'bin_mb': round(os.path.getsize(bin_path) / 2 ** 20, 2),
+                'gml_write_s': gml_write_s, 'bin_write_s': bin_write_s,
+                'gml_load_s': gml_load_s, 'bin_open_s': bin_open_s,
+                'bin_open_and_lookup_s': round(bin_open_s + bin_lookup_s, 4),
+                'bin_to_networkx_s': bin_full_load_s,
+                'identical': same_graph(graph, loaded)}))
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Import-time guard for the graphreader package.
+
+Runs `python -c "import <module>"` in fresh interpreters, reports the median
+wall time, and exits non-zero when it exceeds the budget or when the import
+pulled in heavy or networked dependencies (torch, sentence_transformers, nltk).
+
+Usage:
+    python -m benchmarks.bench_import [--budget 0.3] [--runs 5] [--module graphreader graphreader.chunk_store]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ['torch', 'sentence_transformers', 'nltk', 'transformers']
+
+PROBE = """
+import sys, {module}
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(','.join(heavy))
+"""
+
+
+def measure(module, runs):
+    timings, heavy = [], set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             check=True, capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        heavy.update(m for m in out.stdout.strip().split(',') if m)
+    baseline = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        baseline.append(time.perf_counter() - start)
+    return max(0.0, statistics.median(timings) - statistics.median(baseline)), sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--module', nargs='+', default=['graphreader', 'graphreader.chunk_store'])
+    parser.add_argument('--budget', type=float, default=0.3)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.module:
+        import_s, heavy = measure(module, args.runs)
+        ok = import_s <= args.budget and not heavy
+        failed |= not ok
+        print(json.dumps({'module': module, 'import_s': round(import_s, 4), 'budget_s': args.budget,
+                          'heavy_modules': heavy, 'ok': ok}))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Tokens returned by search_neighbors, all neighbors against a ranked, capped page.
+
+Builds a synthetic graph with few keys, so that every node is a hub, indexes it
+with the hashing encoder, and asks for the neighbors of the best connected nodes
+with a question naming one of their neighbors. The estimated tokens of the full
+payload are compared with those of the first ranked page under the token budget,
+and the rank of the named neighbor is checked to be on that page.
+
+Usage:
+    python -m benchmarks.bench_neighbor_search [--pages 300] [--keys 150] [--top-k 10] [--budget 2000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.fakes import FakeOpenAIClient, HashEncoder, SyntheticDocument
+from graphreader.graph_class import Graph
+from graphreader.local_vector_store import LocalVectorStore
+from graphreader.neighbor_search import NeighborSearch
+from graphreader.rate_limiter import RateLimiter
+from graphreader.store import KnowledgeStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--keys', type=int, default=150)
+    parser.add_argument('--hubs', type=int, default=20)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--budget', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        chunks = SyntheticDocument(args.pages, n_keys=args.keys).get_chunks()
+        graph = Graph(chunks, 'fake', gpt_client=FakeOpenAIClient(), llm_cache=None).graph
+        vector_store = LocalVectorStore(encoder_model=HashEncoder(), embedding_cache=None, path=Path(tmp) / 'index')
+        # Indexing embeds every node text, the ranked search reads them from the encoder's cache
+        vector_store.upsert_data('bench', graph)
+    store = KnowledgeStore(graph=graph, chunks=chunks)
+    search = NeighborSearch(encoder=vector_store.encoder, top_k=args.top_k, token_budget=args.budget)
+    hubs = sorted(graph.nodes(), key=lambda node: -graph.degree(node))[:args.hubs]
+    full_tokens, page_tokens, full_s, page_s, on_first_page = 0, 0, 0.0, 0.0, 0
+    for i, hub in enumerate(hubs):
+        neighbors = [node for node in graph.neighbors(hub) if node != hub]
+        target = neighbors[(7 * i) % len(neighbors)]
+        question = f"What happened between {hub.capitalize()} and {target.capitalize()}?"
+        start = time.perf_counter()
+        payload = [store.node_data(node) for node in store.neighbors(hub)]
+        full_s += time.perf_counter() - start
+        full_tokens += RateLimiter.estimate_tokens(str(payload))
+        start = time.perf_counter()
+        found = search.search(store, hub, question)
+        page_s += time.perf_counter() - start
+        page_tokens += RateLimiter.estimate_tokens(str({k: v for k, v in found.items() if k not in ('tokens', 'tokens_saved')}))
+        on_first_page += any(neighbor['node'] == target for neighbor in found['neighbors'])
+    n = len(hubs)
+    print(json.dumps({'pages': args.pages, 'nodes': graph.number_of_nodes(), 'edges': graph.number_of_edges(),
+                      'hubs': n, 'mean_hub_degree': round(sum(graph.degree(h) for h in hubs) / n, 1),
+                      'full_tokens_per_call': round(full_tokens / n), 'ranked_tokens_per_call': round(page_tokens / n),
+                      'full_ms_per_call': round(1000 * full_s / n, 2), 'ranked_ms_per_call': round(1000 * page_s / n, 2),
+                      'named_neighbor_on_first_page': round(on_first_page / n, 3)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Latency of Pinecone_client upserts and queries against the local mock index API.
+
+Counts control-plane calls per query (which must stay at zero after the first
+connection) and reports the upsert wall time with parallel batches.
+
+Usage:
+    python -m benchmarks.bench_pinecone [--nodes 5000] [--latency 0.05] [--max-in-flight 4]
+"""
+import argparse
+import json
+import time
+import networkx as nx
+from benchmarks.fakes import HashEncoder
+from benchmarks.mock_pinecone import MockPinecone
+from graphreader.pinecone_client import Pinecone_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--max-in-flight', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+
+    graph = nx.Graph()
+    for i in range(args.nodes):
+        graph.add_node(f"node {i}", data=[{'atom_fact': f"fact about node {i} and {i % 97}", 'chunk_id': i}])
+    mock = MockPinecone(latency=args.latency, ready_after=0.3)
+    client = Pinecone_client(api_key='mock', client=mock, encoder_model=HashEncoder(),
+                             batch_size=args.batch_size, max_in_flight=args.max_in_flight)
+
+    start = time.perf_counter()
+    client.upsert_data('bench', graph)
+    upsert_s = time.perf_counter() - start
+    control_calls = sum(mock.calls[c] for c in ('list_indexes', 'describe_index', 'Index', 'create_index'))
+
+    start = time.perf_counter()
+    for i in range(args.queries):
+        client.query_index(f"fact about node {i}", index_name='bench')
+    query_ms = (time.perf_counter() - start) * 1000 / args.queries
+    print(json.dumps({
+        'nodes': args.nodes, 'latency_s': args.latency, 'upsert_s': round(upsert_s, 3),
+        'max_in_flight_seen': mock.indexes['bench'].max_in_flight, 'query_ms': round(query_ms, 2),
+        'control_calls_during_queries': sum(mock.calls[c] for c in ('list_indexes', 'describe_index', 'Index', 'create_index')) - control_calls}))
+
+
+if __name__ == '__main__':
+    main()
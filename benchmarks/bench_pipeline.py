@@ -0,0 +1,61 @@
+"""
+End-to-end ingestion: the staged IngestPipeline against the three separate steps.
+
+The sequential path builds the whole chunk dict, then the Graph, then embeds and
+upserts every node. The pipeline streams the same chunks through bounded queues.
+Both use the local fake OpenAI server, a hashing encoder and a LocalVectorStore,
+and must end with the same nodes and edges.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--chunks 500] [--latency 0.05] [--workers 8]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.bench_extraction import synthetic_chunks
+from benchmarks.fakes import HashEncoder
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from graphreader.graph_class import Graph
+from graphreader.local_vector_store import LocalVectorStore
+from graphreader.pipeline import IngestPipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chunks', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--embed-every', type=int, default=32)
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+    with FakeOpenAIServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        common = dict(base_url=server.base_url, max_workers=args.workers, llm_cache=None)
+
+        start = time.perf_counter()
+        sequential = Graph(dict(chunks), openai_api_key='fake', **common)
+        store = LocalVectorStore(encoder_model=HashEncoder(), embedding_cache=None, path=tmp / 'seq')
+        store.upsert_data('bench', sequential)
+        seq_s = time.perf_counter() - start
+
+        store = LocalVectorStore(encoder_model=HashEncoder(), embedding_cache=None, path=tmp / 'pipe')
+        pipeline = IngestPipeline(chunks.items(), 'fake', store, chunk_path=tmp / 'chunks.bin',
+                                  embed_every=args.embed_every, **common)
+        start = time.perf_counter()
+        streamed = pipeline.run()
+        pipe_s = time.perf_counter() - start
+
+        print(json.dumps({
+            'chunks': args.chunks, 'latency_s': args.latency, 'workers': args.workers,
+            'sequential_s': round(seq_s, 3), 'pipeline_s': round(pipe_s, 3),
+            'speedup': round(seq_s / pipe_s, 2),
+            'same_nodes': sorted(sequential.graph.nodes()) == sorted(streamed.graph.nodes()),
+            'same_edges': {frozenset(e) for e in sequential.graph.edges()} == {frozenset(e) for e in streamed.graph.edges()},
+            'indexed_nodes': len(store.index['rows']), 'stages': pipeline.stats}))
+
+
+if __name__ == '__main__':
+    main()
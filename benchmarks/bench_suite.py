@@ -0,0 +1,145 @@
+"""
+Offline timing of every GraphReader stage on synthetic corpora of growing size.
+
+Chunking, extraction, key normalization, edge building, upserting and the query
+stages are timed separately, with the deterministic fakes of benchmarks.fakes in
+place of OpenAI, the LangChain chat models and the sentence encoder, and a
+LocalVectorStore in place of Pinecone. Latency adds a fixed delay to every fake
+LLM call. With --baseline, stages slower than tolerance times a previous run are
+listed as regressions and the exit status is 1, so the quadratic paths can be
+watched in CI.
+
+Usage:
+    python -m benchmarks.bench_suite [--sizes 100,300,1000] [--latency 0] [--queries 3]
+                                     [--output results.json] [--baseline results.json] [--tolerance 2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.fakes import FakeChatModel, FakeOpenAIClient, HashEncoder, SyntheticDocument, key_name
+from graphreader.graph_class import Graph
+from graphreader.graph_reader import GraphReader
+from graphreader.local_vector_store import LocalVectorStore
+from graphreader.store import KnowledgeStore
+
+
+class TimedGraph(Graph):
+    """Graph recording the wall time of each build stage in timings."""
+    def __init__(self, chunk_dict, openai_api_key, **kwargs):
+        self.timings = {}
+        super().__init__(chunk_dict, openai_api_key, **kwargs)
+
+    def _timed(self, name, stage):
+        start = time.perf_counter()
+        stage()
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def _process_chunks(self):
+        self._timed('_process_chunks', super()._process_chunks)
+
+    def _normalize_keys(self):
+        self._timed('_normalize_keys', super()._normalize_keys)
+
+    def _build_edges(self):
+        self._timed('_build_edges', super()._build_edges)
+
+    def _build(self):
+        self._timed('_build', super()._build)
+
+
+def timed(stage):
+    start = time.perf_counter()
+    stage()
+    return time.perf_counter() - start
+
+
+def bench_size(size, args, tmp):
+    result = {'size': size}
+    stages = {}
+    doc = SyntheticDocument(size, chunk_len=args.chunk_len)
+    chunks = {}
+    stages['get_chunks'] = timed(lambda: chunks.update(doc.get_chunks()))
+
+    extractor = FakeOpenAIClient(latency=args.latency)
+    graph = TimedGraph(chunks, 'fake', gpt_client=extractor, llm_cache=None, max_workers=args.workers)
+    stages.update(graph.timings)
+    # Extraction alone, without the normalization that runs at its end
+    stages['extract'] = stages['_process_chunks'] - stages['_normalize_keys']
+
+    store = LocalVectorStore(encoder_model=HashEncoder(), embedding_cache=None, path=tmp / f'index-{size}')
+    stages['upsert_data'] = timed(lambda: store.upsert_data('bench', graph.graph))
+
+    llm = FakeChatModel(latency=args.latency)
+    agent_llm = FakeChatModel(latency=args.latency)
+    planner = FakeOpenAIClient(latency=args.latency, responder=lambda query: "Find the facts about " + query)
+    reader = GraphReader(graph.graph, None, 'fake', vect_db_name='bench', vector_store=store, upsert=False,
+                         llm_model=llm, agent_llm=agent_llm, gpt_client=planner,
+                         store=KnowledgeStore(graph=graph.graph, chunks=graph.chunks))
+    query_stages = {'_shortlist_nodes': [], '_node_selection': [], '_select_atomic_facts': [], '_reading_chunks': []}
+    for i in range(args.queries):
+        session = reader.session(f"What happened between {key_name(i)} and {key_name(i + 1)}?")
+        query_stages['_shortlist_nodes'].append(timed(session._shortlist_nodes))
+        query_stages['_node_selection'].append(timed(session._get_initial_nodes))
+        query_stages['_select_atomic_facts'].append(timed(session._select_atomic_facts))
+        query_stages['_reading_chunks'].append(timed(session._reading_chunks))
+    # Query stages are averaged over the queries
+    for name, times in query_stages.items():
+        stages[name] = sum(times) / len(times) if times else 0.0
+
+    result.update({'chunks': len(chunks), 'nodes': graph.graph.number_of_nodes(),
+                   'edges': graph.graph.number_of_edges(),
+                   'llm_calls': extractor.calls + planner.calls + llm.calls + agent_llm.calls,
+                   'stages_s': {name: round(value, 4) for name, value in stages.items()}})
+    return result
+
+
+def regressions(runs, baseline, tolerance, min_seconds):
+    # Stages under min_seconds in the baseline are too noisy to compare
+    previous = {run['size']: run['stages_s'] for run in baseline['runs']}
+    found = []
+    for run in runs:
+        for name, seconds in run['stages_s'].items():
+            before = previous.get(run['size'], {}).get(name)
+            if before is not None and before >= min_seconds and seconds > tolerance * before:
+                found.append({'size': run['size'], 'stage': name, 'baseline_s': before, 'seconds': seconds})
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='100,300,1000', help='Comma separated numbers of synthetic pages')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--chunk-len', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=3)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=2.0)
+    parser.add_argument('--min-seconds', type=float, default=0.05)
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(x) for x in args.sizes.split(',')):
+            # The agents run verbose, their traces would bury the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                runs.append(bench_size(size, args, Path(tmp)))
+    results = {'latency_s': args.latency, 'workers': args.workers, 'queries': args.queries, 'runs': runs}
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['regressions'] = regressions(runs, json.load(f), args.tolerance, args.min_seconds)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results))
+    if results.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
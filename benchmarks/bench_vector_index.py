@@ -0,0 +1,59 @@
+"""
+Recall and latency of the local HNSW index against exact brute-force search.
+
+Builds an HNSW graph over synthetic clustered, L2-normalized embeddings and
+compares its top-20 results with the exact matrix-multiply search used by
+LocalVectorStore for small indexes.
+
+Usage:
+    python -m benchmarks.bench_vector_index [--sizes 2000 10000] [--dim 384] [--queries 200]
+"""
+import argparse
+import json
+import time
+import numpy as np
+from graphreader.hnsw import HNSWIndex
+
+
+def synthetic_vectors(n, dim, n_clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = centers[rng.integers(n_clusters, size=n)] + 0.6 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 10000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[32, 64, 128])
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        vectors = synthetic_vectors(n + args.queries, args.dim, seed=n)
+        base, queries = vectors[:n], vectors[n:]
+
+        start = time.perf_counter()
+        index = HNSWIndex(M=16, ef_construction=100)
+        for row in range(n):
+            index.add(row, base)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exact = [set(np.argpartition(-(base @ q), args.k)[:args.k].tolist()) for q in queries]
+        exact_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+        for ef in args.ef_search:
+            start = time.perf_counter()
+            found = [{row for _, row in index.search(q, args.k, base, ef=ef)} for q in queries]
+            hnsw_ms = (time.perf_counter() - start) * 1000 / args.queries
+            recall = np.mean([len(f & e) / args.k for f, e in zip(found, exact)])
+            print(json.dumps({'vectors': n, 'dim': args.dim, 'ef_search': ef, 'build_s': round(build_s, 2),
+                              f'recall@{args.k}': round(float(recall), 4), 'hnsw_ms': round(hnsw_ms, 3),
+                              'exact_ms': round(exact_ms, 3)}))
+
+
+if __name__ == '__main__':
+    main()
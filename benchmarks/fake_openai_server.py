@@ -0,0 +1,146 @@
+"""
+A local OpenAI-compatible chat completions server for offline testing.
+
+The reply to a request is derived deterministically from the last user message:
+each sentence becomes one atomic fact line in the key_atomic_prompt format, with
+its capitalized words as key elements. A message packing several chunks behind
+'### CHUNK <id>' lines is answered chunk by chunk behind the same lines. Latency
+and transient 429/500 errors can be injected to exercise concurrency, rate
+limiting and retries.
+
+Usage:
+    python -m benchmarks.fake_openai_server --port 8089 --latency 0.2 --error-rate 0.1
+
+    Graph(chunk_dict, openai_api_key='fake', base_url='http://127.0.0.1:8089/v1')
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from graphreader.graph_class import CHUNK_HEADER, CHUNK_HEADER_RE
+
+
+def fake_key_atomic_facts(text):
+    parts = CHUNK_HEADER_RE.split(text)
+    if len(parts) > 1:
+        # A packed request, answered per chunk
+        return "\n".join(CHUNK_HEADER.format(chunk_id) + "\n" + fake_key_atomic_facts(body)
+                         for chunk_id, body in zip(parts[1::2], parts[2::2]))
+    lines = []
+    for i, sentence in enumerate(re.split(r'(?<=[.!?]) +', text.strip())):
+        keys = sorted(set(re.findall(r'\b[A-Z][a-z]+\b', sentence)))
+        if sentence and keys:
+            lines.append(f"{i + 1}. {sentence} |" + "| ".join(keys))
+    return "\n".join(lines)
+
+
+class FakeOpenAIServer:
+    """
+    Threaded HTTP server answering POST /v1/chat/completions.
+
+    Attributes:
+    ----------
+    latency : float
+        Seconds every request sleeps before answering.
+    error_rate : float
+        Probability of answering with a 429 or 500 instead of a completion.
+    responder : callable
+        Maps (messages, model) to the reply text, fake_key_atomic_facts of the user message by default.
+    requests : int
+        Number of completion requests received, including failed ones.
+    prompt_tokens : int
+        Estimated prompt tokens received across all requests.
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, responder=None, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.responder = responder or (lambda messages, model: fake_key_atomic_facts(messages[-1]['content']))
+        self.requests = 0
+        self.prompt_tokens = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    def __repr__(self):
+        return f"FakeOpenAIServer at {self.base_url}"
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if status == 429:
+                    self.send_header('Retry-After', '0.05')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt_tokens = sum(len(m['content']) for m in request['messages']) // 4 + 1
+                with server._lock:
+                    server.requests += 1
+                    server.prompt_tokens += prompt_tokens
+                    failure = server._rng.random() < server.error_rate
+                    status = server._rng.choice([429, 500])
+                time.sleep(server.latency)
+                if not self.path.endswith('/chat/completions'):
+                    return self._send(404, {'error': {'message': 'not found'}})
+                if failure:
+                    return self._send(status, {'error': {'message': 'injected failure', 'type': 'fake'}})
+                content = server.responder(request['messages'], request.get('model'))
+                completion_tokens = len(content) // 4 + 1
+                self._send(200, {
+                    'id': f'chatcmpl-{server.requests}', 'object': 'chat.completion',
+                    'created': int(time.time()), 'model': request.get('model', 'fake'),
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                              'total_tokens': prompt_tokens + completion_tokens}})
+
+        return Handler
+
+    def start(self):
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeOpenAIServer(port=args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"Serving fake OpenAI API at {server.base_url}")
+    server.httpd.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Deterministic stand-ins for the paid services, for offline benchmarks.
+
+    HashEncoder        sentence encoder (bag of hashed words, no model download)
+    FakeOpenAIClient   OpenAI_client.get_response with simulated latency
+    FakeChatModel      LangChain chat model for node selection and the tool-calling agents
+    SyntheticDocument  Document whose pages are generated text instead of a PDF
+
+Every fake answers from its input only, so two runs over the same corpus make
+the same calls and build the same graph.
+"""
+import ast
+import hashlib
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from benchmarks.fake_openai_server import fake_key_atomic_facts
+from graphreader.document import Document
+
+
+class HashEncoder:
+    """Deterministic bag-of-words hashing encoder, no model download needed."""
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _one(self, text):
+        v = np.zeros(self.dim, dtype=np.float32)
+        for w in re.findall(r'\w+', text.lower()):
+            v[int(hashlib.md5(w.encode()).hexdigest(), 16) % self.dim] += 1.0
+        return v
+
+    def encode(self, text, **kwargs):
+        return self._one(text) if isinstance(text, str) else np.stack([self._one(t) for t in text])
+
+
+class FakeOpenAIClient:
+    """
+    Drop-in for OpenAI_client: get_response sleeps latency seconds and answers with responder(text).
+
+    The default responder writes atomic facts in the key_atomic_prompt format, one
+    per sentence with its capitalized words as key elements.
+    """
+    def __init__(self, latency=0.0, responder=fake_key_atomic_facts):
+        self.latency = latency
+        self.responder = responder
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_response(self, query, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return self.responder(query)
+
+
+def _listed_items(text):
+    # The items after 'Nodes:' in the messages GraphReader formats
+    match = re.search(r"Nodes: (.*)$", text, re.S)
+    try:
+        return list(ast.literal_eval(match.group(1).strip()))
+    except (AttributeError, ValueError, SyntaxError):
+        return []
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    A chat model that plays GraphReader's node selection and both agents.
+
+    with_structured_output picks the first five shortlisted nodes. The atomic-fact
+    agent reads the first fact_hops nodes, one tool call per turn, and answers with
+    the chunk ids it found, or answers at once from the candidate facts of a
+    prefetched message; the chunk agent reads the first chunk, writes a note and
+    answers from the chunk text.
+    """
+    latency: float = 0.0
+    calls: int = 0
+    fact_hops: int = 1
+
+    @property
+    def _llm_type(self):
+        return 'fake-chat'
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        def select(messages):
+            self.calls += 1
+            time.sleep(self.latency)
+            nodes = _listed_items(messages[-1].content)
+            return {f"node{i + 1}": node for i, node in enumerate(nodes[:5])}
+        return RunnableLambda(select)
+
+    def _reply(self, messages):
+        system = messages[0].content
+        human = next(m for m in messages if m.type == 'human').content
+        items = _listed_items(human)
+        results = [m.content for m in messages if isinstance(m, ToolMessage)]
+        if 'read_node' in system:
+            # Prefetched candidate facts are enough, no tool call is needed
+            ids = re.findall(r"chunk ([\w:]+) \|", human)
+            if not ids and len(results) < min(self.fact_hops, len(items)):
+                node = str(items[len(results)])
+                return AIMessage(content='', tool_calls=[{'name': 'read_node', 'args': {'node_name': node}, 'id': f'read_node{len(results)}'}])
+            ids = ids or re.findall(r"""['"]chunk_id['"]: ['"]?([\w:]+)""", ' '.join(results))
+            return AIMessage(content='[' + ', '.join(list(dict.fromkeys(ids))[:3] or ['0']) + ']')
+        if not results and items:
+            return AIMessage(content='', tool_calls=[{'name': 'read_chunk', 'args': {'chunk_id': items[0]}, 'id': 'read_chunk'}])
+        if len(results) == 1:
+            return AIMessage(content='', tool_calls=[{'name': 'write_notes', 'args': {'text': results[0][:80]}, 'id': 'write_notes'}])
+        return AIMessage(content='Answer: ' + (results[0][:80] if results else 'nothing found'))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+def key_name(i):
+    # Capitalized pseudo-words, which fake_key_atomic_facts picks up as key elements
+    letters = ''
+    i += 26
+    while i:
+        i, r = divmod(i, 26)
+        letters = chr(ord('a') + r) + letters
+    return 'K' + letters
+
+
+class SyntheticDocument(Document):
+    """
+    A Document over generated pages; chunking runs the real Document code.
+
+    Each page has sentences_per_page sentences naming two of n_keys entities, so
+    the number of graph nodes and edges grows with the corpus.
+    """
+    def __init__(self, n_pages, chunk_len=1000, sentences_per_page=40, n_keys=None, seed=0):
+        self.path = f'synthetic-{n_pages}'
+        self.chunk_len = chunk_len
+        self.workers = 1
+        self.pages_per_task = 8
+        self.n_keys = n_keys or n_pages
+        self.sentences_per_page = sentences_per_page
+        self.seed = seed
+        self.document = SimpleNamespace(pages=range(n_pages))
+
+    def _iter_raw_pages(self):
+        rng = random.Random(self.seed)
+        verbs = ['met', 'followed', 'wrote to', 'fought', 'remembered', 'married']
+        for _ in self.document.pages:
+            sentences = []
+            for _ in range(self.sentences_per_page):
+                a, b = key_name(rng.randrange(self.n_keys)), key_name(rng.randrange(self.n_keys))
+                # Keys are lowercased, the lowercase mentions make the two nodes neighbors
+                sentences.append(f"{a} {rng.choice(verbs)} {b}, a story of {a.lower()} and {b.lower()}.")
+            yield " ".join(sentences)
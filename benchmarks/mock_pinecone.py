@@ -0,0 +1,110 @@
+"""
+An in-memory stand-in for the Pinecone client and index API.
+
+Implements the calls Pinecone_client makes (list_indexes, create_index,
+describe_index, Index, upsert, query, delete) with configurable per-request
+latency and a readiness delay for new indexes, and counts every call so the
+number of control-plane round trips can be checked.
+
+Usage:
+    Pinecone_client(api_key='mock', client=MockPinecone(latency=0.05))
+"""
+import threading
+import time
+from collections import Counter
+import numpy as np
+
+
+class _IndexList(list):
+    def names(self):
+        return [index['name'] for index in self]
+
+
+class MockIndex:
+    """A single index holding vectors in memory, answering queries by exact search."""
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+        self.vectors = {}
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, name):
+        self.owner.calls[name] += 1
+        time.sleep(self.owner.latency)
+
+    def upsert(self, vectors, namespace=''):
+        with self._lock:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            self._call('upsert')
+            with self._lock:
+                for v in vectors:
+                    self.vectors[(namespace, v['id'])] = (np.asarray(v['values'], dtype=np.float32), v.get('metadata', {}))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return {'upserted_count': len(vectors)}
+
+    def delete(self, ids, namespace=''):
+        self._call('delete')
+        with self._lock:
+            for vid in ids:
+                self.vectors.pop((namespace, vid), None)
+
+    def query(self, vector, top_k=10, include_metadata=False, namespace='', filter=None):
+        self._call('query')
+        query = np.asarray(vector, dtype=np.float32)
+        scored = []
+        for (ns, vid), (values, metadata) in list(self.vectors.items()):
+            if ns != namespace or (filter and any(metadata.get(k) != v for k, v in filter.items())):
+                continue
+            denom = (np.linalg.norm(values) * np.linalg.norm(query)) or 1.0
+            scored.append((float(values @ query / denom), vid, metadata))
+        scored.sort(key=lambda x: -x[0])
+        return {'matches': [{'id': vid, 'score': score, 'metadata': metadata if include_metadata else None}
+                            for score, vid, metadata in scored[:top_k]]}
+
+
+class MockPinecone:
+    """
+    Control plane of the mock: creates indexes and reports them ready after ready_after seconds.
+
+    Attributes:
+    ----------
+    latency : float
+        Seconds every data-plane request sleeps.
+    ready_after : float
+        Seconds a new index reports status ready=False.
+    calls : Counter
+        Number of calls per API method.
+    """
+    def __init__(self, latency=0.0, ready_after=0.0):
+        self.latency = latency
+        self.ready_after = ready_after
+        self.calls = Counter()
+        self.indexes = {}
+        self._created = {}
+
+    def list_indexes(self):
+        self.calls['list_indexes'] += 1
+        return _IndexList({'name': name} for name in self.indexes)
+
+    def create_index(self, name, dimension, metric, spec=None):
+        self.calls['create_index'] += 1
+        self.indexes[name] = MockIndex(self, name)
+        self._created[name] = time.monotonic()
+
+    def describe_index(self, name):
+        self.calls['describe_index'] += 1
+        ready = time.monotonic() - self._created[name] >= self.ready_after
+
+        class Description:
+            status = {'ready': ready, 'state': 'Ready' if ready else 'Initializing'}
+        return Description()
+
+    def Index(self, name):
+        self.calls['Index'] += 1
+        return self.indexes[name]
@@ -1,12 +1,137 @@
-from sentence_transformers import SentenceTransformer
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from .embedding_cache import EmbeddingStore
+from .resources import DEFAULT_ENCODER, get_encoder_model
+from .tracing import get_tracer
 
 class Text_Encoder:
-    def __init__(self, encoder_model: SentenceTransformer = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')):
-        self.encoder = encoder_model
-        
-    def _encode_text(self, text: str):
-        self.embeddings = self.encoder.encode(text)
-        
-    def get_embeddings(self, text: str):
-        self._encode_text(text)
-        return self.embeddings            
\ No newline at end of file
+    """
+    Encodes texts with a SentenceTransformer and caches the embeddings.
+
+    Every text is keyed by a hash of the model name and the text. Lookups go to
+    an in-memory LRU first, then to the optional on-disk EmbeddingStore, and
+    only the texts found in neither are encoded, in batches of batch_size and
+    over a multi-process pool when there are many of them. No per-call state is
+    kept on the instance, so one encoder can be shared between threads. Without
+    an explicit model the shared default model is loaded on the first cache miss.
+    Cached vectors are read-only, and with a disk cache new vectors are rounded
+    to float16 like the stored ones, so a text gets the same vector whether it
+    was just encoded or read back.
+
+    Attributes:
+    ----------
+    encoder : SentenceTransformer
+        The embedding model, loaded on first use when none was given.
+    model_name : str
+        Name mixed into the cache keys.
+    batch_size : int
+        Encoding batch size.
+    num_processes : int
+        Worker processes used for large encoding jobs, 1 disables the pool.
+    cache_size : int
+        Maximum number of embeddings kept in memory.
+    disk_cache : EmbeddingStore or None
+        Persistent float16 store shared across runs.
+
+    Methods:
+    -------
+    get_embeddings(text) -> numpy.ndarray:
+        Returns a vector for a string, or a matrix with one row per text for a list.
+    """
+    def __init__(self, encoder_model=None, **kwargs):
+        self._encoder = encoder_model
+        self.model_name = kwargs.get('model_name') or (self._model_name(encoder_model) if encoder_model is not None else DEFAULT_ENCODER)
+        self.batch_size = kwargs.get('batch_size', 64)
+        self.num_processes = kwargs.get('num_processes', 1)
+        self.multi_process_min = kwargs.get('multi_process_min', 2000)
+        self.cache_size = kwargs.get('cache_size', 10000)
+        disk_cache = kwargs.get('disk_cache')
+        if disk_cache is not None and not isinstance(disk_cache, EmbeddingStore):
+            disk_cache = EmbeddingStore(disk_cache)
+        self.disk_cache = disk_cache
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = get_encoder_model(self.model_name)
+        return self._encoder
+
+    @staticmethod
+    def _model_name(model):
+        # Hub id of a SentenceTransformer when available, so different models never share keys
+        for getter in (lambda m: m.model_card_data.base_model,
+                       lambda m: m[0].auto_model.config._name_or_path):
+            try:
+                name = getter(model)
+                if name:
+                    return name
+            except Exception:
+                continue
+        return getattr(model, 'name', type(model).__name__)
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def _encode_text(self, texts):
+        if self.num_processes > 1 and len(texts) >= self.multi_process_min and hasattr(self.encoder, 'start_multi_process_pool'):
+            pool = self.encoder.start_multi_process_pool(target_devices=['cpu'] * self.num_processes)
+            try:
+                return self.encoder.encode_multi_process(texts, pool, batch_size=self.batch_size)
+            finally:
+                self.encoder.stop_multi_process_pool(pool)
+        return self.encoder.encode(texts, batch_size=self.batch_size)
+
+    def _remember(self, items):
+        with self._lock:
+            for key, vector in items:
+                # The vector of a single text is returned as it is, callers must not change the cached copy
+                vector.flags.writeable = False
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.cache_size:
+                self._memory.popitem(last=False)
+
+    def get_embeddings(self, text):
+        with get_tracer().span('embed') as span:
+            return self._get_embeddings(text, span)
+
+    def _get_embeddings(self, text, span):
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        keys = [self._key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        span.add(texts=len(texts), cache_hits=len(found))
+        if missing and self.disk_cache is not None:
+            stored = self.disk_cache.get_many(missing)
+            found.update(stored)
+            self._remember(stored.items())
+            missing = [key for key in missing if key not in stored]
+            span.add(cache_hits=len(stored))
+        if missing:
+            span.add(encoded=len(missing))
+            first_text = {}
+            for key, t in zip(keys, texts):
+                first_text.setdefault(key, t)
+            encoded = np.asarray(self._encode_text([first_text[key] for key in missing]), dtype=np.float32)
+            if self.disk_cache is not None:
+                encoded = encoded.astype(np.float16).astype(np.float32)
+            new_items = list(zip(missing, encoded))
+            found.update(new_items)
+            self._remember(new_items)
+            if self.disk_cache is not None:
+                self.disk_cache.put_many(new_items)
+        if single:
+            return found[keys[0]]
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
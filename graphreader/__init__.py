@@ -1,4 +0,0 @@
-import nltk
-
-
-nltk.download("wordnet")
\ No newline at end of file
@@ -0,0 +1,228 @@
+import argparse
+import bisect
+import mmap
+import os
+import pickle
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+MAGIC = b'GRCHUNK1'
+HEADER = struct.Struct('<8sQQ')
+
+
+class ChunkStoreWriter:
+    """
+    Writes text chunks to the packed chunk store format read by ChunkStore.
+
+    Layout of the file (all integers little-endian):
+        header  : magic b'GRCHUNK1', chunk count (uint64), index offset (uint64)
+        blob    : the UTF-8 text of every chunk, back to back
+        index   : chunk ids (int64[count]) sorted ascending, then the matching
+                  byte offsets (uint64[count]) and byte lengths (uint64[count])
+
+    Chunks are streamed to disk as they are added, only the fixed-width index
+    entries are kept in memory until close(). They go to a temporary file next
+    to path, which replaces path only once the index is written: a ChunkStore
+    that has the old file mapped keeps reading it, and a failed write leaves
+    the old file as it was.
+
+    Methods:
+    -------
+    add(chunk_id: int, text: str) -> None:
+        Appends one chunk to the blob.
+
+    close() -> None:
+        Writes the sorted index and the final header, and moves the file into place.
+
+    abort() -> None:
+        Discards the chunks written so far. Leaving a with block on an exception aborts.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        if not os.path.exists(self.path.parent):
+            os.makedirs(self.path.parent)
+        self._tmp = self.path.with_name(self.path.name + '.tmp')
+        self._file = open(self._tmp, 'wb')
+        self._file.write(HEADER.pack(MAGIC, 0, 0))
+        self._offset = HEADER.size
+        self._entries = []
+
+    def __repr__(self):
+        return f"ChunkStoreWriter to {self.path}"
+
+    def add(self, chunk_id, text):
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self._entries.append((int(chunk_id), self._offset, len(data)))
+        self._offset += len(data)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._entries.sort()
+        ids = [entry[0] for entry in self._entries]
+        if len(set(ids)) != len(ids):
+            self.abort()
+            raise ValueError(f"Duplicate chunk ids written to {self.path}")
+        index_offset = self._offset
+        for column, code in ((0, '<q'), (1, '<Q'), (2, '<Q')):
+            self._file.write(b''.join(struct.pack(code, entry[column]) for entry in self._entries))
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, len(self._entries), index_offset))
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped access to a packed chunk store.
+
+    The file is mapped once and chunks are sliced out of the mapping on demand,
+    so opening a store costs the same for one book or a whole library and only
+    the pages of the chunks actually read are ever loaded. It behaves like the
+    dict of chunks returned by Document.get_chunks.
+
+    Methods:
+    -------
+    get_bytes(chunk_id: int) -> memoryview:
+        Returns the UTF-8 bytes of a chunk as a zero-copy view into the mapping.
+
+    __getitem__(chunk_id: int) -> str:
+        Returns the decoded text of a chunk, KeyError if it does not exist.
+
+    keys(), values(), items(), get(), __len__, __contains__, __iter__ :
+        Read-only dict interface over the chunks, in chunk id order.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, index_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a chunk store file.")
+        self._count = count
+        view = self._view = memoryview(self._mmap)
+        width = 8 * count
+        self._ids = self._column(view[index_offset:index_offset + width], 'q')
+        self._offsets = self._column(view[index_offset + width:index_offset + 2 * width], 'Q')
+        self._lengths = self._column(view[index_offset + 2 * width:index_offset + 3 * width], 'Q')
+        # Ids from enumerate() are usually contiguous, then a lookup is plain arithmetic
+        self._first = self._ids[0] if count else 0
+        self._dense = bool(count) and self._ids[count - 1] - self._first == count - 1
+
+    def __repr__(self):
+        return f"ChunkStore at {self.path} with {self._count} chunks"
+
+    @staticmethod
+    def _column(view, code):
+        if sys.byteorder == 'little':
+            return view.cast(code)
+        column = array(code, view.tobytes())
+        column.byteswap()
+        return column
+
+    def _position(self, chunk_id):
+        if self._dense:
+            pos = chunk_id - self._first
+            return pos if 0 <= pos < self._count else None
+        pos = bisect.bisect_left(self._ids, chunk_id)
+        return pos if pos < self._count and self._ids[pos] == chunk_id else None
+
+    def get_bytes(self, chunk_id):
+        pos = self._position(int(chunk_id))
+        if pos is None:
+            raise KeyError(chunk_id)
+        start = self._offsets[pos]
+        return self._view[start:start + self._lengths[pos]]
+
+    def __getitem__(self, chunk_id):
+        return str(self.get_bytes(chunk_id), 'utf-8')
+
+    def get(self, chunk_id, default=None):
+        try:
+            return self[chunk_id]
+        except KeyError:
+            return default
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, chunk_id):
+        return self._position(int(chunk_id)) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return list(self._ids)
+
+    def values(self):
+        return (self[chunk_id] for chunk_id in self._ids)
+
+    def items(self):
+        return ((chunk_id, self[chunk_id]) for chunk_id in self._ids)
+
+    def close(self):
+        for column in (self._ids, self._offsets, self._lengths, self._view):
+            if isinstance(column, memoryview):
+                column.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views handed out by get_bytes are still alive, the mapping closes with them
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_chunk_store(chunk_dict, path):
+    """Writes a dict of chunk id to text to a chunk store file."""
+    with ChunkStoreWriter(path) as writer:
+        for chunk_id, text in chunk_dict.items():
+            writer.add(chunk_id, text)
+
+
+def convert_pickle(pkl_path, store_path=None):
+    """
+    Converts a chunks.pkl file written by Document.export_chunks to a chunk store.
+
+    Args:
+        pkl_path (str): Path of the pickled chunk dictionary.
+        store_path (str): Output path, the pickle path with a .bin suffix by default.
+
+    Returns:
+        Path: The path of the written chunk store.
+    """
+    store_path = Path(store_path) if store_path else Path(pkl_path).with_suffix('.bin')
+    with open(pkl_path, 'rb') as f:
+        chunk_dict = pickle.load(f)
+    write_chunk_store(chunk_dict, store_path)
+    return store_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert a chunks.pkl file to a memory-mapped chunk store.')
+    parser.add_argument('pkl_path')
+    parser.add_argument('store_path', nargs='?', default=None)
+    args = parser.parse_args()
+    print(f"Chunk store written to {convert_pickle(args.pkl_path, args.store_path)}")
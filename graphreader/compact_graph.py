@@ -0,0 +1,153 @@
+import sys
+from array import array
+from itertools import chain
+import networkx as nx
+import numpy as np
+from .node_view import NodeView
+
+
+class CompactGraph:
+    """
+    A read-only key graph held in a few flat arrays instead of networkx dicts.
+
+    Nodes are integer ids with interned names; neighbors are NumPy CSR arrays;
+    atomic facts are columnar, all fact texts in one UTF-8 buffer with an offset
+    array and the chunk ids in an int64 column. A node's fact dicts are only
+    created when it is read. It answers the same calls as GraphStore (nodes,
+    node_data, neighbors, ...), which are all the tools and vector stores need.
+
+    Attributes:
+    ----------
+    names : list
+        The interned node names, the name of node id i at position i.
+    indptr, indices : numpy.ndarray
+        CSR neighbor arrays, the neighbors of node i are indices[indptr[i]:indptr[i + 1]].
+    fact_ptr : numpy.ndarray
+        The facts of node i are the rows fact_ptr[i] to fact_ptr[i + 1] of the fact columns.
+    text_offsets : numpy.ndarray
+        Fact row r is text[text_offsets[r]:text_offsets[r + 1]].
+    chunk_ids : numpy.ndarray or list
+        Chunk id of each fact row, an int64 array when all ids are integers.
+
+    Methods:
+    -------
+    from_networkx(graph) -> CompactGraph:
+        Packs a networkx key graph, keeping node and adjacency order.
+
+    node_data(node_name: str) -> list:
+        Returns the atomic facts and chunk ids of a node.
+
+    neighbors(node_name: str) -> list:
+        Returns the names of the neighbors of a node.
+
+    nodes, number_of_nodes(), number_of_edges(), edges(), has_node(), __iter__, __len__, __contains__ :
+        The networkx graph interface used by graphreader.
+
+    to_networkx() -> networkx.Graph:
+        Unpacks the graph into networkx.
+
+    nbytes() -> int:
+        Returns the approximate memory held by the graph.
+    """
+    def __init__(self, names, node_facts, adjacency):
+        self.names = [sys.intern(name) for name in names]
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in adjacency], out=self.indptr[1:])
+        self.indices = np.fromiter(chain.from_iterable(adjacency), dtype=np.int32, count=int(self.indptr[-1]))
+        # node_facts is read once, node by node, so a generator can free each node's facts as they are packed
+        fact_ptr, text_offsets, text, chunk_ids = array('q', [0]), array('q', [0]), bytearray(), []
+        for facts in node_facts:
+            for fact in facts:
+                text += fact['atom_fact'].encode('utf-8')
+                text_offsets.append(len(text))
+                chunk_ids.append(fact['chunk_id'])
+            fact_ptr.append(len(chunk_ids))
+        self.fact_ptr = np.frombuffer(fact_ptr, dtype=np.int64)
+        self.text_offsets = np.frombuffer(text_offsets, dtype=np.int64)
+        self.text = bytes(text)
+        del text
+        # Integer chunk ids are packed, other ids are kept as they are
+        if all(isinstance(chunk_id, (int, np.integer)) for chunk_id in chunk_ids):
+            chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        self.chunk_ids = chunk_ids
+        self.nodes = NodeView(self)
+
+    def __repr__(self):
+        return f"CompactGraph with {len(self.names)} nodes"
+
+    @classmethod
+    def from_networkx(cls, graph):
+        names = list(graph.nodes())
+        position = {name: i for i, name in enumerate(names)}
+        return cls(names, [graph.nodes[name]['data'] for name in names],
+                   [[position[other] for other in graph.adj[name]] for name in names])
+
+    def node_index(self, node_name):
+        return self._index[node_name]
+
+    def _facts(self, index):
+        # One slice per column, then plain Python values
+        first, last = int(self.fact_ptr[index]), int(self.fact_ptr[index + 1])
+        offsets = self.text_offsets[first:last + 1].tolist()
+        chunk_ids = self.chunk_ids[first:last]
+        chunk_ids = chunk_ids.tolist() if isinstance(chunk_ids, np.ndarray) else chunk_ids
+        return [{'atom_fact': self.text[offsets[row]:offsets[row + 1]].decode('utf-8'), 'chunk_id': chunk_ids[row]}
+                for row in range(last - first)]
+
+    def node_data(self, node_name):
+        return self._facts(self._index[node_name])
+
+    def node_attrs(self, node_name):
+        return {'data': self.node_data(node_name)}
+
+    def _neighbor_indices(self, index):
+        return self.indices[self.indptr[index]:self.indptr[index + 1]].tolist()
+
+    def neighbors(self, node_name):
+        return [self.names[i] for i in self._neighbor_indices(self._index[node_name])]
+
+    def has_node(self, node_name):
+        return node_name in self._index
+
+    def __contains__(self, node_name):
+        return node_name in self._index
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def number_of_edges(self):
+        # Every edge is stored in the rows of both of its ends, self-loops once
+        rows = np.repeat(np.arange(len(self.names)), np.diff(self.indptr))
+        return int((len(self.indices) + np.count_nonzero(rows == self.indices)) // 2)
+
+    def edges(self):
+        for i, name in enumerate(self.names):
+            for j in self._neighbor_indices(i):
+                if j >= i:
+                    yield name, self.names[j]
+
+    def to_networkx(self):
+        graph = nx.Graph()
+        for i, name in enumerate(self.names):
+            graph.add_node(name, data=self._facts(i))
+        # Filled row by row as in GraphStore.to_networkx, so neighbor order is kept
+        adj = graph._adj
+        for i, name in enumerate(self.names):
+            neighbors = adj[name]
+            for j in self._neighbor_indices(i):
+                other = self.names[j]
+                neighbors[other] = adj[other].get(name, {})
+        return graph
+
+    def nbytes(self):
+        arrays = (self.indptr, self.indices, self.fact_ptr, self.text_offsets)
+        chunk_bytes = self.chunk_ids.nbytes if isinstance(self.chunk_ids, np.ndarray) else sys.getsizeof(self.chunk_ids)
+        return (sum(array.nbytes for array in arrays) + chunk_bytes + sys.getsizeof(self.text)
+                + sys.getsizeof(self._index) + sys.getsizeof(self.names) + sum(map(sys.getsizeof, self.names)))
@@ -0,0 +1,220 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+import networkx as nx
+from .chunk_store import ChunkStore, write_chunk_store
+from .graph_store import GraphStore, write_graph_store
+from .compact_graph import CompactGraph
+from .store import KnowledgeStore
+
+
+class Corpus:
+    """
+    A collection of documents, each kept as its own graph shard and chunk store.
+
+    Every document is saved under root/doc_id as graph.bin and chunks.bin, and its
+    node vectors go to the namespace doc_id of one shared vector index. Across the
+    corpus, chunks are addressed as 'doc_id:chunk_id' and nodes as 'doc_id:node',
+    so chunk ids from different documents never collide. Nodes with the same name
+    in several documents are joined by cross-document edges through a key index.
+    A shard is only loaded when a query or a tool call reaches it.
+
+    Attributes:
+    ----------
+    root : Path
+        Directory of the corpus, 'data/corpus' by default.
+    vector_store : VectorStore or None
+        The shared vector index, one namespace per document.
+    index_name : str
+        Name of the shared vector index, 'graphreader' by default.
+    manifest : dict
+        Number of chunks and nodes of each document, by doc_id.
+    keys : dict
+        For each node name, the documents that contain it.
+    store : CorpusStore
+        Read access to all shards by global ids, used by the agent tools.
+
+    Methods:
+    -------
+    add_document(doc_id: str, graph, chunks=None, upsert=True) -> None:
+        Saves a document's graph and chunks as a new shard and indexes its nodes.
+
+    remove_document(doc_id: str) -> None:
+        Deletes a shard, its namespace and its cross-document edges.
+
+    shard(doc_id: str) -> KnowledgeStore:
+        Returns the lazily loaded store of one document.
+
+    query_nodes(query_text: str, doc_ids=None, top_k=None) -> list:
+        Returns the global names of the closest nodes, searching only the given documents.
+    """
+    def __init__(self, root='data/corpus', vector_store=None, index_name='graphreader'):
+        self.root = Path(root)
+        self.vector_store = vector_store
+        self.index_name = index_name
+        self._shards = {}
+        self._lock = threading.Lock()
+        self.manifest = self._read_json('manifest.json')
+        self.keys = self._read_json('keys.json')
+        self.store = CorpusStore(self)
+
+    def __repr__(self):
+        return f"Corpus at {self.root} with {len(self.manifest)} documents"
+
+    def _read_json(self, name):
+        path = self.root / name
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_json(self, name, value):
+        # Replaced atomically, readers never see a half written file
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+        tmp = self.root / (name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp, self.root / name)
+
+    def _doc_dir(self, doc_id):
+        return self.root / doc_id
+
+    def add_document(self, doc_id, graph, chunks=None, upsert=True):
+        if not doc_id or ':' in doc_id or '/' in doc_id:
+            raise ValueError(f"Invalid document id '{doc_id}', it must be non-empty without ':' or '/'.")
+        if doc_id in self.manifest:
+            raise ValueError(f"Document '{doc_id}' is already in the corpus. Remove it first with remove_document().")
+        if chunks is None:
+            chunks = graph.chunks
+        node_graph = graph if isinstance(graph, (nx.Graph, GraphStore, CompactGraph)) else graph.graph
+        doc_dir = self._doc_dir(doc_id)
+        if not os.path.exists(doc_dir):
+            os.makedirs(doc_dir)
+        write_graph_store(node_graph, doc_dir / 'graph.bin')
+        # A chunk store written in place, e.g. by IngestPipeline, is kept as it is
+        chunk_path = doc_dir / 'chunks.bin'
+        if not (isinstance(chunks, ChunkStore) and chunks.path.resolve() == chunk_path.resolve()):
+            write_chunk_store(chunks, chunk_path)
+        if upsert and self.vector_store is not None:
+            self.vector_store.upsert_data(self.index_name, node_graph, namespace=doc_id)
+        for node in node_graph.nodes():
+            self.keys.setdefault(node, []).append(doc_id)
+        self.manifest[doc_id] = {'chunks': len(chunks), 'nodes': node_graph.number_of_nodes()}
+        self._write_json('keys.json', self.keys)
+        self._write_json('manifest.json', self.manifest)
+        self._shards.pop(doc_id, None)
+
+    def remove_document(self, doc_id):
+        if doc_id not in self.manifest:
+            raise ValueError(f"Document '{doc_id}' is not in the corpus.")
+        nodes = [node for node, docs in self.keys.items() if doc_id in docs]
+        if self.vector_store is not None:
+            self.vector_store.write_vectors(self.index_name, [], removed=nodes, namespace=doc_id)
+            self.vector_store.flush(self.index_name, namespace=doc_id)
+        for node in nodes:
+            docs = [doc for doc in self.keys.get(node, []) if doc != doc_id]
+            if docs:
+                self.keys[node] = docs
+            else:
+                self.keys.pop(node, None)
+        del self.manifest[doc_id]
+        self._write_json('keys.json', self.keys)
+        self._write_json('manifest.json', self.manifest)
+        with self._lock:
+            shard = self._shards.pop(doc_id, None)
+        if shard is not None:
+            shard.close()
+        shutil.rmtree(self._doc_dir(doc_id))
+
+    def shard(self, doc_id):
+        store = self._shards.get(doc_id)
+        if store is None:
+            if doc_id not in self.manifest:
+                raise KeyError(f"Document '{doc_id}' is not in the corpus.")
+            with self._lock:
+                store = self._shards.get(doc_id)
+                if store is None:
+                    doc_dir = self._doc_dir(doc_id)
+                    # Shards written before the binary graph format keep their GML file
+                    graph_path = doc_dir / 'graph.bin'
+                    if not os.path.exists(graph_path):
+                        graph_path = doc_dir / 'graph.gml'
+                    store = self._shards[doc_id] = KnowledgeStore(graph_path=graph_path,
+                                                                  chunks_path=doc_dir / 'chunks.bin')
+        return store
+
+    def query_nodes(self, query_text, doc_ids=None, top_k=None):
+        namespaces = list(self.manifest) if doc_ids is None else list(doc_ids)
+        kwargs = {} if top_k is None else {'top_k': top_k}
+        found = self.vector_store.query_namespaces(query_text, self.index_name, namespaces, **kwargs)
+        return [f"{match['namespace']}:{match['metadata']['node']}" for match in found['matches']]
+
+
+class CorpusStore:
+    """
+    The KnowledgeStore interface over all shards of a Corpus, with global ids.
+
+    Node names are 'doc_id:node' and chunk ids 'doc_id:chunk_id'. The facts of a
+    node carry global chunk ids, and its neighbors include the nodes of the same
+    name in other documents.
+
+    Methods:
+    -------
+    node_data(node_name: str) -> list:
+        Returns the atomic facts of a node with global chunk ids.
+
+    neighbors(node_name: str) -> list:
+        Returns the global names of the neighbors of a node, in its own and in other documents.
+
+    chunk(chunk_id: str, offset: int = 0) -> str:
+        Returns the text of a chunk, or of the chunk offset positions after it in the same document.
+
+    parse_chunk_id(text: str) -> str:
+        Normalizes a global chunk id written by the agent.
+
+    version() -> tuple:
+        Returns the modification time and size of the corpus manifest, (0, 0) before the first document.
+    """
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def __repr__(self):
+        return f"CorpusStore of {self.corpus}"
+
+    @staticmethod
+    def _split(global_id):
+        doc_id, sep, local_id = str(global_id).strip().strip('\'"').partition(':')
+        if not sep:
+            raise ValueError(f"'{global_id}' is not a corpus id of the form 'doc_id:id'.")
+        return doc_id, local_id
+
+    def node_data(self, node_name):
+        doc_id, node = self._split(node_name)
+        data = self.corpus.shard(doc_id).node_data(node)
+        # A single fact comes back from GML as a dict instead of a list
+        data = [data] if isinstance(data, dict) else data
+        return [{**fact, 'chunk_id': f"{doc_id}:{fact['chunk_id']}"} for fact in data]
+
+    def neighbors(self, node_name):
+        doc_id, node = self._split(node_name)
+        local = [f"{doc_id}:{x}" for x in self.corpus.shard(doc_id).neighbors(node)]
+        return local + [f"{other}:{node}" for other in self.corpus.keys.get(node, []) if other != doc_id]
+
+    def chunk(self, chunk_id, offset=0):
+        doc_id, local_id = self._split(chunk_id)
+        return self.corpus.shard(doc_id).chunk(local_id, offset)
+
+    def parse_chunk_id(self, text):
+        return ":".join(self._split(text))
+
+    def version(self):
+        # The manifest is rewritten whenever a document is added or removed,
+        # and only written with the first one
+        try:
+            stat = os.stat(self.corpus.root / 'manifest.json')
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,156 @@
+import re
+import zlib
+import numpy as np
+
+# Mersenne prime modulus of the MinHash permutations
+_PRIME = (1 << 61) - 1
+_WORD = re.compile(r'\w+')
+
+
+def _bands(num_perm, threshold):
+    # The banding whose LSH threshold (1/b)^(1/r) is the highest one not above threshold, for recall
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [(b, r) for b, r in options if (1 / b) ** (1 / r) <= threshold]
+    return max(below, key=lambda option: (1 / option[0]) ** (1 / option[1]))[0] if below else num_perm
+
+
+class ChunkDeduplicator:
+    """
+    Finds near-duplicate chunks with MinHash signatures and LSH buckets.
+
+    A chunk is reduced to the set of its word shingles (shingle_size consecutive
+    lowercased words) and a MinHash signature of num_perm values. Signatures are
+    cut into bands, and chunks sharing a band are candidates; a candidate is a
+    duplicate when the exact Jaccard similarity of the shingle sets reaches the
+    threshold. Chunks are added one at a time, so the first copy of a text is
+    its canonical chunk and later copies map to it, in a full build as in a
+    stream.
+
+    Attributes:
+    ----------
+    threshold : float
+        Jaccard similarity of the shingle sets from which a chunk is a duplicate, 0.8 by default.
+    num_perm : int
+        Length of the MinHash signatures, 128 by default.
+    bands : int
+        Number of LSH bands, chosen from the threshold when not given.
+    shingle_size : int
+        Words per shingle, 3 by default.
+    duplicates : dict
+        Each duplicate chunk id mapped to its canonical chunk id.
+
+    Methods:
+    -------
+    add(chunk_id, text: str) -> canonical chunk id or None:
+        Adds a chunk and returns the canonical chunk it duplicates, None for a new text.
+
+    canonical(chunk_id) -> chunk id:
+        Returns the canonical chunk of a chunk, itself when it is not a duplicate.
+
+    remove(chunk_ids) -> dict:
+        Forgets chunks. A removed canonical chunk with remaining duplicates is replaced by the
+        first of them; returns the promoted chunks mapped to the canonical they replace.
+    """
+    def __init__(self, threshold=0.8, num_perm=128, bands=None, shingle_size=3, seed=0):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands or _bands(num_perm, threshold)
+        if num_perm % self.bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({self.bands}).")
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._shingles = {}
+        self._signatures = {}
+        self.duplicates = {}
+
+    def __repr__(self):
+        return f"ChunkDeduplicator(threshold={self.threshold}, chunks={len(self._shingles)}, duplicates={len(self.duplicates)})"
+
+    def _shingle(self, text):
+        words = _WORD.findall(text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        # Sorted unique 32-bit hashes, stable across runs unlike hash()
+        return np.unique(np.fromiter((zlib.crc32(" ".join(words[i:i + size]).encode('utf-8'))
+                                      for i in range(max(len(words) - size + 1, 1))), dtype=np.uint64))
+
+    def _signature(self, shingles):
+        return ((self._a * shingles[None, :] + self._b) % _PRIME).min(axis=1)
+
+    def _band_keys(self, signature):
+        return [band.tobytes() for band in np.split(signature, self.bands)]
+
+    @staticmethod
+    def _jaccard(first, second):
+        shared = len(np.intersect1d(first, second, assume_unique=True))
+        return shared / (len(first) + len(second) - shared)
+
+    def _index(self, chunk_id):
+        for buckets, key in zip(self._buckets, self._band_keys(self._signatures[chunk_id])):
+            buckets.setdefault(key, []).append(chunk_id)
+
+    def add(self, chunk_id, text):
+        shingles = self._shingle(text)
+        signature = self._signature(shingles)
+        self._shingles[chunk_id], self._signatures[chunk_id] = shingles, signature
+        candidates = dict.fromkeys(other for buckets, key in zip(self._buckets, self._band_keys(signature))
+                                   for other in buckets.get(key, ()))
+        # The most similar canonical chunk, the earliest one on ties
+        best, best_score = None, self.threshold
+        for other in candidates:
+            score = self._jaccard(shingles, self._shingles[other])
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = other, score
+        if best is None:
+            # Only canonical chunks are indexed, duplicates are found through them
+            self._index(chunk_id)
+            return None
+        self.duplicates[chunk_id] = best
+        return best
+
+    def canonical(self, chunk_id):
+        return self.duplicates.get(chunk_id, chunk_id)
+
+    def remove(self, chunk_ids):
+        chunk_ids = set(chunk_ids)
+        promoted = {}
+        for chunk_id in chunk_ids:
+            self.duplicates.pop(chunk_id, None)
+        for duplicate, canonical in list(self.duplicates.items()):
+            if canonical in chunk_ids:
+                # The first remaining copy takes the place of the removed canonical chunk
+                new = promoted.setdefault(canonical, duplicate)
+                if new == duplicate:
+                    del self.duplicates[duplicate]
+                else:
+                    self.duplicates[duplicate] = new
+        for buckets in self._buckets:
+            for key in list(buckets):
+                buckets[key] = [chunk_id for chunk_id in buckets[key] if chunk_id not in chunk_ids]
+                if not buckets[key]:
+                    del buckets[key]
+        for chunk_id in chunk_ids:
+            self._shingles.pop(chunk_id, None)
+            self._signatures.pop(chunk_id, None)
+        for new in promoted.values():
+            self._index(new)
+        return {new: old for old, new in promoted.items()}
+
+
+def dedup_chunks(chunk_dict, threshold=0.8, **kwargs):
+    """
+    Drops near-duplicate chunks, keeping the first copy of every text.
+
+    Args:
+        chunk_dict (dict): Chunk texts keyed by chunk id, in document order.
+        threshold (float): Jaccard similarity of word shingles from which two chunks are duplicates.
+        **kwargs: Passed on to ChunkDeduplicator (num_perm, bands, shingle_size, seed).
+
+    Returns:
+        tuple: The unique chunks as a dict, and each duplicate chunk id mapped to its canonical chunk id.
+    """
+    deduplicator = ChunkDeduplicator(threshold=threshold, **kwargs)
+    unique = {chunk_id: text for chunk_id, text in chunk_dict.items() if deduplicator.add(chunk_id, text) is None}
+    return unique, deduplicator.duplicates
@@ -3,7 +3,19 @@ from tqdm import tqdm
 import re
 import os
 import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from .chunk_store import write_chunk_store
+
+SENTENCE_END = re.compile(r'(?<=[.!?]) +')
+
+
+def _extract_pages(doc_path, start, stop):
+    # Runs in a worker process: each worker opens its own reader for a range of pages
+    reader = PdfReader(doc_path)
+    return [reader.pages[i].extract_text() for i in range(start, stop)]
+
 
 class Document:
     """
@@ -15,16 +27,21 @@ class Document:
         The file path of the PDF document.
     chunk_len : int
         The maximum length of each text chunk.
+    workers : int
+        Number of processes extracting pages in parallel, 1 extracts in this process.
+    pages_per_task : int
+        Number of consecutive pages each worker task extracts.
     document : PdfReader
         The PdfReader object used to read the PDF document.
     text : str
-        The extracted text from the PDF document.
+        The extracted text from the PDF document, set by _get_text(). get_chunks()
+        streams pages and never holds the whole text.
     chunks : dict
         A dictionary of text chunks, indexed by their order.
 
     Methods:
     -------
-    __init__(doc_path: str, chunk_len: int = 1000)
+    __init__(doc_path: str, chunk_len: int = 1000, workers: int = 1, pages_per_task: int = 8)
         Initializes the Document object with a file path and chunk length.
         
     __repr__()
@@ -33,19 +50,33 @@ class Document:
     _del_head_foot(text, st_ind=0, end_ind=0)
         Removes headers and footers from the text based on provided start and end indices.
         
+    _iter_page_texts(**kwargs)
+        Yields the processed text of every page in page order, extracted in parallel when workers > 1.
+
     _get_text(**kwargs)
         Extracts text from the PDF document and processes it according to the given parameters.
+
+    iter_sentences(**kwargs)
+        Yields the sentences of the document as pages stream in.
+
+    iter_chunks(**kwargs)
+        Yields (chunk_id, chunk) pairs with the same ids and text as get_chunks, in bounded memory.
         
     get_chunks(**kwargs)
         Splits the processed text into chunks of specified length and stores them in a dictionary.
         
     export_chunks(export_path='', filename='chunks')
         Exports the chunks as a pickle file to the specified path and filename.
+
+    export_chunk_store(export_path='data', filename='chunks')
+        Exports the chunks as a memory-mapped chunk store (.bin) for random access.
     """
-    def __init__(self, doc_path: str, chunk_len: int = 1000):
+    def __init__(self, doc_path: str, chunk_len: int = 1000, workers: int = 1, pages_per_task: int = 8):
         # Initialize the document with path and chunk length
         self.path = doc_path
         self.chunk_len = chunk_len
+        self.workers = workers
+        self.pages_per_task = pages_per_task
         try:
             self.document = PdfReader(doc_path)
         except Exception as e:
@@ -61,40 +92,83 @@ class Document:
         text = text[st_ind:end_ind]
         return text
 
-    def _get_text(self, **kwargs):
-        # Extract and process text from all pages of the document
-        text = ''
-        for page in tqdm(self.document.pages, desc='Extracting text from document'):
-            pg_text = page.extract_text()
+    def _iter_raw_pages(self):
+        # Page texts in page order; with workers, a bounded window of page ranges is in flight
+        n_pages = len(self.document.pages)
+        if self.workers <= 1:
+            for page in self.document.pages:
+                yield page.extract_text()
+            return
+        ranges = ((start, min(start + self.pages_per_task, n_pages)) for start in range(0, n_pages, self.pages_per_task))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = deque()
+            for start, stop in ranges:
+                in_flight.append(executor.submit(_extract_pages, self.path, start, stop))
+                if len(in_flight) >= 2 * self.workers:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+
+    def _iter_page_texts(self, **kwargs):
+        for pg_text in tqdm(self._iter_raw_pages(), total=len(self.document.pages),
+                            desc='Extracting text from document'):
             if pg_text:
-                proc_text = self._del_head_foot(pg_text, **kwargs)
-                text += ' ' + proc_text
+                yield self._del_head_foot(pg_text, **kwargs)
             else:
                 print("Warning: A page in the document returned no text.")
-        self.text = text
 
-    def get_chunks(self, **kwargs):
-        # Split the text into chunks of specified length
-        self._get_text(**kwargs)
-        sentences = re.split(r'(?<=[.!?]) +', self.text)
-        chunks = []
-        current_chunk = []
+    def _get_text(self, **kwargs):
+        # Extract and process text from all pages of the document
+        self.text = ''.join([' ' + proc_text for proc_text in self._iter_page_texts(**kwargs)])
 
-        for sentence in tqdm(sentences, desc='Chunking the text'):
-            # Add sentences to the current chunk until the length limit is reached
-            if len(' '.join(current_chunk + [sentence])) <= self.chunk_len:
+    def iter_sentences(self, **kwargs):
+        # Same split as re.split over the whole text, but only the unfinished tail is kept between pages
+        buffer = ''
+        resume = 0
+        for proc_text in self._iter_page_texts(**kwargs):
+            buffer += ' ' + proc_text
+            start = 0
+            pending = None
+            for match in SENTENCE_END.finditer(buffer, resume):
+                if match.end() == len(buffer):
+                    # The run of spaces may continue on the next page, rescan it from its start
+                    pending = match.start()
+                    break
+                yield buffer[start:match.start()]
+                start = match.end()
+            resume = (len(buffer) if pending is None else pending) - start
+            buffer = buffer[start:]
+        yield from SENTENCE_END.split(buffer)
+
+    def iter_chunks(self, **kwargs):
+        # Add sentences to the current chunk until the length limit is reached,
+        # tracking the joined length instead of re-joining the chunk for every sentence
+        chunk_id = 0
+        current_chunk = []
+        current_len = 0
+        for sentence in tqdm(self.iter_sentences(**kwargs), desc='Chunking the text'):
+            new_len = current_len + len(sentence) + (1 if current_chunk else 0)
+            if new_len <= self.chunk_len:
                 current_chunk.append(sentence)
+                current_len = new_len
             else:
-                # Save the current chunk and start a new one
-                chunks.append(' '.join(current_chunk))
+                # Emit the current chunk and start a new one, empty chunks still use up an id
+                chunk = ' '.join(current_chunk)
+                if chunk:
+                    yield chunk_id, chunk
+                chunk_id += 1
                 current_chunk = [sentence]
+                current_len = len(sentence)
 
-        # Add the last chunk if it has content
+        # Emit the last chunk if it has content
         if current_chunk:
-            chunks.append(' '.join(current_chunk))
+            chunk = ' '.join(current_chunk)
+            if chunk:
+                yield chunk_id, chunk
 
+    def get_chunks(self, **kwargs):
         # Store and return chunks as a dictionary
-        self.chunks = {i: chunk for i, chunk in enumerate(chunks) if chunk}
+        self.chunks = dict(self.iter_chunks(**kwargs))
         return self.chunks
 
     def export_chunks(self, export_path='data', filename='chunks'):
@@ -115,3 +189,15 @@ class Document:
         except Exception as e:
             print(f"Error exporting chunks: {e}")
 
+    def export_chunk_store(self, export_path='data', filename='chunks'):
+        # Export chunks to a packed text blob with an offset index, read back with ChunkStore
+        if not hasattr(self, 'chunks'):
+            print("No chunks to export. Please generate chunks first using get_chunks() method.")
+            return
+
+        full_path = Path(export_path) / (filename + ".bin")
+        try:
+            write_chunk_store(self.chunks, full_path)
+            print(f"Chunks exported successfully to {full_path}")
+        except Exception as e:
+            print(f"Error exporting chunks: {e}")
@@ -0,0 +1,239 @@
+from collections import deque
+import networkx as nx
+from tqdm import tqdm
+
+
+class KeyMatcher:
+    """
+    A multi-pattern substring matcher (Aho-Corasick automaton) over a set of keys.
+
+    The automaton is built once from all the keys and then scans any text in a
+    single pass, reporting every key that occurs in it as a substring. This is
+    the same test as ``key in text`` for each key, without looping over the keys.
+
+    Attributes:
+    ----------
+    keys : list
+        The keys the automaton was built from, in insertion order.
+    goto : list
+        One transition dict per automaton state, mapping a character to a state.
+    fail : list
+        The failure link of each state.
+    output : list
+        The key indices ending at each state, extended along the failure links.
+
+    Methods:
+    -------
+    __init__(keys)
+        Builds the trie, failure links and merged outputs for the given keys.
+
+    find(text) -> set:
+        Returns the indices of all keys that occur in the text.
+    """
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        # The empty key is a substring of every text, it never enters the trie
+        self.empty_keys = [i for i, key in enumerate(self.keys) if key == '']
+        for i, key in enumerate(self.keys):
+            if key:
+                self._insert(key, i)
+        self._link()
+
+    def __repr__(self):
+        return f"KeyMatcher over {len(self.keys)} keys"
+
+    def _insert(self, key, key_ind):
+        state = 0
+        for char in key:
+            nxt = self.goto[state].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append(key_ind)
+
+    def _link(self):
+        # Breadth first walk so every failure target is finished before it is used
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[nxt] = self.goto[fail].get(char, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find(self, text):
+        found = set(self.empty_keys)
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+def node_document(at_facts, clean_fn):
+    # The text a node is searched in: its atomic facts joined and cleaned once
+    return clean_fn(". ".join([i["atom_fact"] for i in at_facts]))
+
+
+def alias_patterns(keys, aliases=None):
+    """
+    Lists the patterns searched for a set of keys: the keys, then the names merged into them.
+
+    Args:
+        keys (list): The keys.
+        aliases (dict): Names merged into another key, mapped to that key. Aliases of keys
+            not in keys are left out.
+
+    Returns:
+        tuple: The patterns, and the index in keys of the key each pattern stands for.
+    """
+    position = {key: i for i, key in enumerate(keys)}
+    patterns, owners = list(keys), list(range(len(keys)))
+    for alias, key in (aliases or {}).items():
+        if key in position and alias not in position:
+            patterns.append(alias)
+            owners.append(position[key])
+    return patterns, owners
+
+
+def find_mentions(clean_dict, clean_fn, show_progress=True, aliases=None):
+    """
+    Finds, for every key of clean_dict, the indices of the keys its document mentions.
+
+    Args:
+        clean_dict (dict): Cleaned keys mapped to their lists of atomic facts.
+        clean_fn (callable): The string cleaning function applied to each document.
+        show_progress (bool): Whether to show a tqdm progress bar.
+        aliases (dict): Names merged into a key, mapped to that key; a document mentioning
+            an alias mentions the key.
+
+    Returns:
+        List[set]: Position i holds the indices of the keys found in the document of key i.
+    """
+    keys = list(clean_dict.keys())
+    patterns, owners = alias_patterns(keys, aliases)
+    matcher = KeyMatcher(patterns)
+    mentions = []
+    for key in tqdm(keys, desc='Matching keys in node facts', disable=not show_progress):
+        found = matcher.find(node_document(clean_dict[key], clean_fn))
+        mentions.append({owners[i] for i in found} if aliases else found)
+    return mentions
+
+
+def mutual_edges(mentions):
+    """
+    Turns per-key mentions into mutual-mention adjacency lists.
+
+    Two keys i and j are linked when i != j, key i occurs in the document of j
+    and key j occurs in the document of i.
+
+    Returns:
+        List[list]: Position i holds the sorted indices of the keys linked to key i.
+    """
+    adjacency = [[] for _ in mentions]
+    for i, found in enumerate(mentions):
+        for j in found:
+            if j > i and i in mentions[j]:
+                adjacency[i].append(j)
+                adjacency[j].append(i)
+    for neighbors in adjacency:
+        neighbors.sort()
+    return adjacency
+
+
+def build_graph(clean_dict, clean_fn, graph=None, show_progress=True, aliases=None):
+    """
+    Builds the key graph from clean_dict without comparing every pair of keys.
+
+    The nodes, node data, edges and insertion orders are identical to adding every
+    key as a node and then checking every other key for a mutual mention, so the
+    result compares equal to the pairwise construction in all respects.
+
+    Args:
+        clean_dict (dict): Cleaned keys mapped to their lists of atomic facts.
+        clean_fn (callable): The string cleaning function applied to each document.
+        graph (networkx.Graph): Graph to add to. A new graph is created when None.
+        show_progress (bool): Whether to show tqdm progress bars.
+        aliases (dict): Names merged into a key, mapped to that key, matched as the key.
+
+    Returns:
+        networkx.Graph: The graph with the nodes and edges added.
+    """
+    if graph is None:
+        graph = nx.Graph()
+    keys = list(clean_dict.keys())
+    adjacency = mutual_edges(find_mentions(clean_dict, clean_fn, show_progress, aliases))
+    for i, key in enumerate(tqdm(keys, desc='Building graph', disable=not show_progress)):
+        graph.add_node(key, data=clean_dict[key])
+        for j in adjacency[i]:
+            graph.add_edge(key, keys[j])
+    return graph
+
+
+def update_graph(graph, clean_dict, changed_keys, clean_fn, aliases=None):
+    """
+    Updates the graph in place after the facts of some keys changed.
+
+    Only edges touching a changed key can appear or disappear, since every other
+    pair of documents is unchanged. Changed keys missing from clean_dict are
+    removed from the graph, the others get fresh data and recomputed edges.
+
+    Args:
+        graph (networkx.Graph): The graph built from the previous clean_dict.
+        clean_dict (dict): The updated cleaned keys and their atomic facts.
+        changed_keys (iterable): Keys whose list of facts was added, changed or emptied.
+        clean_fn (callable): The string cleaning function applied to each document.
+        aliases (dict): Names merged into a key, mapped to that key, matched as the key.
+
+    Returns:
+        dict: The 'added', 'updated' and 'removed' node names.
+    """
+    changes = {'added': [], 'updated': [], 'removed': []}
+    live = []
+    for key in dict.fromkeys(changed_keys):
+        if key not in clean_dict:
+            if key in graph:
+                graph.remove_node(key)
+                changes['removed'].append(key)
+            continue
+        changes['updated' if key in graph else 'added'].append(key)
+        graph.add_node(key, data=clean_dict[key])
+        live.append(key)
+    if not live:
+        return changes
+
+    # Keys each changed document mentions, and documents that mention each changed key
+    keys = list(clean_dict.keys())
+    position = {key: i for i, key in enumerate(keys)}
+    all_patterns, all_owners = alias_patterns(keys, aliases)
+    live_patterns, live_owners = alias_patterns(live, aliases)
+    all_matcher = KeyMatcher(all_patterns)
+    live_matcher = KeyMatcher(live_patterns)
+    mentions = {key: {keys[all_owners[i]] for i in all_matcher.find(node_document(clean_dict[key], clean_fn))}
+                for key in live}
+    mentioned_in = {key: set() for key in live}
+    for other in keys:
+        for i in live_matcher.find(node_document(clean_dict[other], clean_fn)):
+            mentioned_in[live[live_owners[i]]].add(other)
+
+    for key in live:
+        graph.remove_edges_from(list(graph.edges(key)))
+    for key in live:
+        linked = (mentions[key] & mentioned_in[key]) - {key}
+        for other in sorted(linked, key=position.get):
+            graph.add_edge(key, other)
+    return changes
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+import numpy as np
+
+
+class EmbeddingStore:
+    """
+    A persistent store of embeddings as float16 vectors in SQLite.
+
+    Keys are the text hashes computed by Text_Encoder, which already include the
+    model name, so one store can be shared by several encoders.
+
+    Attributes:
+    ----------
+    path : Path
+        Location of the SQLite database file.
+
+    Methods:
+    -------
+    get_many(keys) -> dict:
+        Returns the stored float32 vectors of the keys that are present.
+
+    put_many(items) -> None:
+        Stores (key, vector) pairs as float16.
+    """
+    def __init__(self, path='data/embedding_cache.sqlite'):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        if not os.path.exists(self.path.parent):
+            os.makedirs(self.path.parent)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def __repr__(self):
+        return f"EmbeddingStore at {self.path}"
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch)
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        return found
+
+    def put_many(self, items):
+        rows = [(key, np.asarray(vector, dtype=np.float16).tobytes()) for key, vector in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,13 +1,27 @@
 import os
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
 import yaml
 import unicodedata
 import re
-from nltk.stem import WordNetLemmatizer
 from tqdm import tqdm
 from pathlib import Path
 from .openai_client import OpenAI_client
+from .edge_builder import build_graph, update_graph, find_mentions, mutual_edges
+from .key_merge import cluster_keys
+from .dedup import ChunkDeduplicator
+from .graph_store import write_graph_store
+from .compact_graph import CompactGraph
+from .rate_limiter import RateLimiter
+from .llm_cache import ResponseCache
+from .resources import get_lemmatizer
+from .tracing import get_tracer, propagate
+from .Text_encoder import Text_Encoder
+
+# Line opening each chunk of a packed extraction request, and of its part of the answer
+CHUNK_HEADER = "### CHUNK {}"
+CHUNK_HEADER_RE = re.compile(r'^[ \t]*#+[ \t]*CHUNK[ \t]+([^\s:]+)[ \t]*:?[ \t]*$', re.M | re.I)
 
 class Graph:
     """
@@ -29,36 +43,152 @@ class Graph:
         A dictionary that maps lemmatized keys to lists of atomic facts.
     clean_dict : defaultdict
         A dictionary that maps cleaned keys to lists of atomic facts.
-    graph : networkx.Graph
+    chunk_keys : defaultdict
+        A dictionary that maps each chunk ID to the raw keys extracted from it.
+    graph : networkx.Graph or CompactGraph
         The constructed graph representing relationships between keys.
+    max_workers : int
+        Number of chunks sent to the LLM concurrently (1 processes them one by one).
+    gpt_client : OpenAI_client
+        The single pooled client shared by all extraction requests.
+    llm_cache : ResponseCache or None
+        On-disk cache of extraction responses, so unchanged chunks are never sent twice.
+    key_aliases : dict
+        Clean keys merged into a similar key by the embedding merge, mapped to the key they were merged into.
+        Facts mentioning an alias are linked to the key it was merged into.
+    merge_stats : dict or None
+        Keys before the merge and the nodes and edges it removed, None while merging is off.
+        The edges are only counted with merge_report, otherwise edges_removed is None.
+    batch_stats : dict or None
+        Chunks, requests and chunks sent again alone of the last packed extraction, None while packing is off.
+    deduplicator : ChunkDeduplicator or None
+        Finds near-duplicate chunks before extraction, None while deduplication is off.
+    chunk_duplicates : dict
+        Each duplicate chunk id mapped to the canonical chunk whose facts stand for it, empty while deduplication is off.
+    mutations : int
+        Number of add_chunks and remove_chunks calls so far, part of the version of a KnowledgeStore built on the graph.
+
+    Keyword Arguments:
+    -----------------
+    max_workers : int
+        Concurrent extraction requests, defaults to 1.
+    rpm, tpm : int
+        Requests and tokens per minute allowed by the rate limiter, unlimited by default.
+    model, temperature, base_url, max_retries, backoff :
+        Passed on to OpenAI_client.
+    gpt_client :
+        A ready-made client with get_response(text, sys_prompt=...), used instead of creating one.
+    llm_cache : str, ResponseCache or None
+        Path of the response cache, a cache instance, or None to disable caching.
+        Defaults to 'data/llm_cache.sqlite'.
+    merge_threshold : float or None
+        Cosine similarity from which the embeddings of two clean keys merge them into one node,
+        e.g. 0.9. None, the default, keeps every clean key as its own node.
+    key_encoder : Text_Encoder
+        Encoder of the keys for the merge, the default sentence model when not given.
+    merge_report : bool
+        Counts the edges removed by the merge, which matches the unmerged keys a second time.
+        False by default.
+    batch_tokens : int or None
+        Packs consecutive chunks into one extraction request of up to about this many tokens of
+        chunk text, e.g. 4000, each chunk behind a '### CHUNK <id>' line. Chunks missing from
+        the answer are sent again alone. None, the default, sends every chunk on its own.
+    dedup_threshold : float or None
+        Jaccard similarity of word shingles from which a chunk is a near duplicate of an earlier one,
+        e.g. 0.8. Duplicates are kept in chunks, so read_chunk still finds them, but only their
+        canonical chunk is extracted and carries facts. None, the default, extracts every chunk.
+    compact : bool
+        Builds the graph as a read-only CompactGraph and releases k_at_dict, lem_dict,
+        clean_dict and chunk_keys afterwards, for large corpora. add_chunks and remove_chunks
+        are then unavailable. False by default.
 
     Methods:
     -------
     _clean_string(text: str) -> str:
         Cleans and normalizes a string by removing accents and special characters.
 
-    _process_k_at(k_at_resp: str, chunk_id: int) -> None:
+    _process_k_at(k_at_resp: str, chunk_id: int) -> dict:
         Processes atomic facts from the response and updates k_at_dict with chunk IDs.
+        Returns the new fact entry of each raw key.
 
     _normalize_keys() -> None:
         Normalizes keys using lemmatization and cleaning, then updates the clean_dict.
+        Similar keys are merged when merge_threshold is set.
+
+    _extract_chunk(text: str) -> str:
+        Sends one chunk to the LLM and returns the raw key/atomic fact response.
+
+    _pack_chunks(chunk_dict: dict) -> list:
+        Groups consecutive chunks into packs of up to batch_tokens tokens.
+
+    _extract_batch(pack: list) -> tuple:
+        Sends a pack of chunks as one request and splits the answer per chunk.
+
+    _extract_responses(chunk_dict: dict) -> list:
+        Extracts the responses for the given chunks, concurrently when max_workers > 1, in chunk order.
+
+    _unique_chunks(chunk_dict: dict) -> dict:
+        Returns the chunks that are not near duplicates of chunks already seen.
 
     _process_chunks() -> None:
-        Processes each chunk by extracting atomic facts and normalizing keys.
+        Extracts atomic facts for all chunks and normalizes keys.
+
+    _apply_responses(chunk_ids: list, responses: list) -> list:
+        Adds the facts of already extracted chunks to all key dictionaries, without touching the graph.
+
+    _build_edges() -> None:
+        Adds all nodes and mutual-mention edges from clean_dict to the graph.
 
     _build() -> None:
-        Builds the graph by adding nodes and edges based on the cleaned atomic facts.
+        Builds the graph by adding nodes and mutual-mention edges based on the cleaned atomic facts.
 
-    export_graph(file_path: str = '', filename: str = 'graph') -> None:
-        Exports the constructed graph to a GML file.
+    add_chunks(new_chunk_dict: dict) -> dict:
+        Extracts facts for new chunks only and updates the affected keys, nodes and edges.
+
+    remove_chunks(chunk_ids) -> dict:
+        Drops the facts of the given chunks and updates the affected keys, nodes and edges.
+
+    export_graph(file_path: str = '', filename: str = 'graph', binary: bool = False) -> None:
+        Exports the constructed graph to a GML file, or to a memory-mapped graph store (.bin) with binary=True.
     """
-    def __init__(self, chunk_dict, openai_api_key):
-        self.chunks = chunk_dict
+    def __init__(self, chunk_dict, openai_api_key, **kwargs):
+        # A copy, so adding or removing chunks later never changes the caller's dict
+        self.chunks = dict(chunk_dict)
         self.api_key = openai_api_key
         self.k_at_dict = defaultdict(list)
         self.lem_dict = defaultdict(list)
         self.clean_dict = defaultdict(list)
+        self.chunk_keys = defaultdict(list)
         self.graph = nx.Graph()
+        self.mutations = 0
+        self.max_workers = kwargs.get('max_workers', 1)
+        # Lemmatized and clean form of every raw key seen, each key is normalized once
+        self._key_forms = {}
+        self.key_aliases = {}
+        self.merge_stats = None
+        self.merge_threshold = kwargs.get('merge_threshold')
+        self.key_encoder = kwargs.get('key_encoder')
+        self.merge_report = kwargs.get('merge_report', False)
+        self._unmerged_dict = None
+        self.compact = kwargs.get('compact', False)
+        self.batch_tokens = kwargs.get('batch_tokens')
+        self.batch_stats = None
+        dedup_threshold = kwargs.get('dedup_threshold')
+        self.deduplicator = ChunkDeduplicator(threshold=dedup_threshold) if dedup_threshold is not None else None
+        self.chunk_duplicates = self.deduplicator.duplicates if self.deduplicator is not None else {}
+        llm_cache = kwargs.get('llm_cache', 'data/llm_cache.sqlite')
+        if llm_cache is not None and not isinstance(llm_cache, ResponseCache):
+            llm_cache = ResponseCache(llm_cache)
+        self.llm_cache = llm_cache
+        self.gpt_client = kwargs['gpt_client'] if 'gpt_client' in kwargs else OpenAI_client(
+            api_key = self.api_key,
+            model = kwargs.get('model', "gpt-3.5-turbo"),
+            temperature = kwargs.get('temperature', 0.7),
+            base_url = kwargs.get('base_url'),
+            max_retries = kwargs.get('max_retries', 5),
+            backoff = kwargs.get('backoff', 1.0),
+            rate_limiter = RateLimiter(rpm=kwargs.get('rpm'), tpm=kwargs.get('tpm')),
+            cache = self.llm_cache)
         self._load_prompts()
         self._build()
         
@@ -67,11 +197,13 @@ class Graph:
             self.prompts = yaml.safe_load(file)
     
     def _clean_string(self,text):
-        # Normalize the text to NFD (decomposed form) to separate accents
-        text = unicodedata.normalize('NFD', text)
-        
-        # Remove accents by filtering out characters with a combining mark
-        text = ''.join([char for char in text if not unicodedata.combining(char)])
+        # ASCII text has no accents, only the regex below changes it
+        if not text.isascii():
+            # Normalize the text to NFD (decomposed form) to separate accents
+            text = unicodedata.normalize('NFD', text)
+            
+            # Remove accents by filtering out characters with a combining mark
+            text = ''.join([char for char in text if not unicodedata.combining(char)])
         
         # Use regex to remove apostrophes and other special characters, keeping only alphanumerics and spaces
         text = re.sub(r"[^a-zA-Z0-9\s]", "", text)
@@ -79,6 +211,9 @@ class Graph:
         # Return the cleaned string
         return text
     def _process_k_at(self,k_at_resp, chunk_id):
+        if k_at_resp is None:
+            print(f"Warning: No atomic facts were extracted for chunk {chunk_id}.")
+            return {}
         at_dict = defaultdict(list)
         for line in re.split(r'\n+', k_at_resp):
             sub = line.split('|')
@@ -86,54 +221,238 @@ class Graph:
             for d_key in sub[1:]:
                 d_key = d_key.strip().lower() 
                 at_dict[d_key].append(at)
+        new_facts = {}
         for a_key in at_dict: 
-            self.k_at_dict[a_key].append({'atom_fact':" ".join(at_dict[a_key]),'chunk_id':chunk_id})
+            new_facts[a_key] = {'atom_fact':" ".join(at_dict[a_key]),'chunk_id':chunk_id}
+            self.k_at_dict[a_key].append(new_facts[a_key])
+        self.chunk_keys[chunk_id].extend(new_facts)
+        return new_facts
     
+    def _normalize_key(self, d_key):
+        # Returns the lemmatized and clean forms of a raw key, and the key it is merged into
+        forms = self._key_forms.get(d_key)
+        if forms is None:
+            lem_key = get_lemmatizer().lemmatize(d_key)
+            forms = self._key_forms[d_key] = (lem_key, self._clean_string(lem_key))
+        return forms[0], self.key_aliases.get(forms[1], forms[1])
+
     def _normalize_keys(self):
-        key_list = list(self.k_at_dict.keys())
-        lemmatizer = WordNetLemmatizer()
-        for d_key in key_list:
-            self.lem_dict[lemmatizer.lemmatize(d_key)].extend(self.k_at_dict[d_key])
-        
-        lem_key_list = list(self.lem_dict.keys())
-        for d_key in lem_key_list:
-            self.clean_dict[self._clean_string(d_key)].extend(self.lem_dict[d_key])
-        
-        
-        ''' 
-        lem_key_list = list(self.lem_dict.keys())
-        model = SentenceTransformer('whaleloops/phrase-bert')
-        key_embs = model.encode(lem_key_list)
-        
-        self.key_emb = key_embs
-        '''
+        with get_tracer().span('build.normalize', keys=len(self.k_at_dict)):
+            self._clean_keys()
+            if self.merge_threshold is not None:
+                self._merge_similar_keys()
+
+    def _clean_keys(self):
+        clean_keys = {}
+        for d_key in list(self.k_at_dict.keys()):
+            lem_key, clean_keys[lem_key] = self._normalize_key(d_key)
+            self.lem_dict[lem_key].extend(self.k_at_dict[d_key])
+        for lem_key in list(self.lem_dict.keys()):
+            self.clean_dict[clean_keys[lem_key]].extend(self.lem_dict[lem_key])
+
+    def _merge_similar_keys(self):
+        # Large key sets are compared through LSH buckets, never pairwise
+        if self.key_encoder is None:
+            self.key_encoder = Text_Encoder()
+        keys = list(self.clean_dict.keys())
+        with get_tracer().span('build.merge', keys=len(keys)) as span:
+            vectors = self.key_encoder.get_embeddings(keys)
+            if len(keys) < 2:
+                return
+            aliases = cluster_keys(keys, vectors, self.merge_threshold,
+                                   weights=[len(self.clean_dict[key]) for key in keys])
+            if self.merge_report:
+                self._unmerged_dict = self.clean_dict
+            merged = defaultdict(list)
+            for key in keys:
+                merged[aliases.get(key, key)].extend(self.clean_dict[key])
+            self.clean_dict = merged
+            self.key_aliases.update(aliases)
+            self.merge_stats = {'keys': len(keys), 'nodes_removed': len(aliases), 'edges_removed': None}
+            span.add(merged=len(aliases))
+            print(f"Key merge: {len(keys)} keys, removed {len(aliases)} nodes")
                 
+    def _extract_chunk(self, text):
+        return self.gpt_client.get_response(text, sys_prompt=self.prompts['key_atomic_prompt'])
+
+    def _pack_chunks(self, chunk_dict):
+        # Consecutive chunks, so the facts keep their context; a chunk over the budget goes alone
+        packs, pack, tokens = [], [], 0
+        for chunk_id, text in chunk_dict.items():
+            size = RateLimiter.estimate_tokens(text)
+            if pack and tokens + size > self.batch_tokens:
+                packs.append(pack)
+                pack, tokens = [], 0
+            pack.append((chunk_id, text))
+            tokens += size
+        if pack:
+            packs.append(pack)
+        return packs
+
+    @staticmethod
+    def _split_batch_response(response):
+        # The text after each chunk header, keyed by the chunk id as written
+        parts = CHUNK_HEADER_RE.split(response or '')
+        return {chunk_id: body.strip() for chunk_id, body in zip(parts[1::2], parts[2::2])}
+
+    def _extract_batch(self, pack):
+        # Returns the responses of the pack in order and the number of chunks sent again alone
+        if len(pack) == 1:
+            return [self._extract_chunk(pack[0][1])], 0
+        text = "\n\n".join(f"{CHUNK_HEADER.format(chunk_id)}\n{chunk}" for chunk_id, chunk in pack)
+        response = self.gpt_client.get_response(text, sys_prompt=self.prompts['key_atomic_prompt'] + "\n"
+                                                + self.prompts['key_atomic_batch_prompt'])
+        sections = self._split_batch_response(response)
+        missing = [chunk_id for chunk_id, _ in pack if str(chunk_id) not in sections]
+        if missing:
+            print(f"Warning: chunks {missing} are missing from a packed answer and are sent again alone.")
+        return [sections[str(chunk_id)] if str(chunk_id) in sections else self._extract_chunk(chunk)
+                for chunk_id, chunk in pack], len(missing)
+
+    def _extract_responses(self, chunk_dict):
+        texts = list(chunk_dict.values())
+        with get_tracer().span('build.extract', chunks=len(texts)) as span:
+            # Without packing every chunk is a pack of its own
+            if self.batch_tokens:
+                extract, items = self._extract_batch, self._pack_chunks(chunk_dict)
+            else:
+                extract, items = self._extract_chunk, texts
+            if self.max_workers > 1:
+                # map yields in submission order, so facts are merged in chunk order;
+                # the LLM calls of the workers are traced under this span
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    responses = list(tqdm(executor.map(propagate(extract), items),
+                                          total=len(items), desc= 'Processing chunks'))
+            else:
+                responses = [extract(item) for item in tqdm(items, desc= 'Processing chunks')]
+            if self.batch_tokens:
+                retried = sum(count for _, count in responses)
+                responses = [response for pack_responses, _ in responses for response in pack_responses]
+                self.batch_stats = {'chunks': len(texts), 'requests': len(items) + retried, 'resent': retried}
+                span.add(requests=len(items) + retried, resent=retried)
+                print(f"Packed extraction: {len(texts)} chunks in {len(items) + retried} requests, "
+                      f"{retried} chunks sent again alone")
+        if self.llm_cache is not None:
+            stats = self.llm_cache.stats()
+            print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses")
+        return responses
+
+    def _unique_chunks(self, chunk_dict):
+        # Near duplicates are only recorded, their canonical chunk is extracted once
+        if self.deduplicator is None:
+            return chunk_dict
+        unique = {chunk_id: text for chunk_id, text in chunk_dict.items()
+                  if self.deduplicator.add(chunk_id, text) is None}
+        if len(unique) < len(chunk_dict):
+            print(f"Chunk dedup: {len(chunk_dict) - len(unique)} of {len(chunk_dict)} chunks are near duplicates")
+        return unique
+
     def _process_chunks(self):
-        for key,value in tqdm(self.chunks.items(), desc= 'Processing chunks'):
-            gpt_client = OpenAI_client(api_key = self.api_key)
-            key_at_facts = gpt_client.get_response(value, sys_prompt=self.prompts['key_atomic_prompt'])
+        chunks = self._unique_chunks(self.chunks)
+        responses = self._extract_responses(chunks)
+        for key, key_at_facts in zip(chunks, responses):
             self.fact = key_at_facts
             self._process_k_at(key_at_facts,chunk_id = key)
         self._normalize_keys()
             
+    def _build_edges(self):
+        # Each node's facts are cleaned once and scanned for all keys in a single pass
+        with get_tracer().span('build.edges', keys=len(self.clean_dict)):
+            if self.compact:
+                keys = list(self.clean_dict.keys())
+                adjacency = mutual_edges(find_mentions(self.clean_dict, self._clean_string, aliases=self.key_aliases))
+                # The key dicts go first and each node's facts are freed once packed, so they are never held twice
+                clean_dict = self.clean_dict
+                self._release_dicts()
+                self.graph = CompactGraph(keys, (clean_dict.pop(key) for key in keys), adjacency)
+                del adjacency
+            else:
+                build_graph(self.clean_dict, self._clean_string, graph=self.graph, aliases=self.key_aliases)
+        if self._unmerged_dict is not None:
+            # The edges the unmerged keys would have had, a second matching pass only run for merge_report
+            unmerged = sum(map(len, mutual_edges(find_mentions(self._unmerged_dict, self._clean_string, False)))) // 2
+            self._unmerged_dict = None
+            self.merge_stats['edges_removed'] = unmerged - self.graph.number_of_edges()
+            print(f"Key merge removed {self.merge_stats['edges_removed']} edges")
+
+    def _release_dicts(self):
+        # The facts now live in the compact graph only
+        self.k_at_dict = defaultdict(list)
+        self.lem_dict = defaultdict(list)
+        self.clean_dict = defaultdict(list)
+        self.chunk_keys = defaultdict(list)
+        self._key_forms = {}
+
+    def _check_mutable(self):
+        if self.compact:
+            raise ValueError("A compact graph cannot be updated in place. Rebuild it, or create the Graph with compact=False.")
+
     def _build(self):
-        self._process_chunks()
-        for key, at_fact in tqdm(self.clean_dict.items(), desc= 'Building graph'):
-            self.graph.add_node(key, data=at_fact)
-            for other_key in self.clean_dict:
-                other_document = self._clean_string(". ".join(
-                    [i["atom_fact"] for i in self.clean_dict[other_key]]))
-                self_documents = self._clean_string(". ".join(
-                    [i["atom_fact"] for i in self.clean_dict[key]]))
-                if key != other_key and (key in other_document) and (other_key in self_documents):
-                    self.graph.add_edge(key, other_key)
+        with get_tracer().span('build', chunks=len(self.chunks)):
+            self._process_chunks()
+            self._build_edges()
     
-    def export_graph(self,file_path='data',filename='graph'):
-        file_w_ext = filename + ".gml"
+    def _apply_responses(self, chunk_ids, responses):
+        # Appends the facts of extracted chunks to the keys they name and returns the touched clean keys.
+        # A key merged earlier goes to the key it was merged into, new keys are only merged by a full build
+        changed = []
+        for key, key_at_facts in zip(chunk_ids, responses):
+            for d_key, fact in self._process_k_at(key_at_facts, chunk_id = key).items():
+                lem_key, clean_key = self._normalize_key(d_key)
+                self.lem_dict[lem_key].append(fact)
+                self.clean_dict[clean_key].append(fact)
+                changed.append(clean_key)
+        return changed
+
+    def add_chunks(self, new_chunk_dict):
+        # Only the new chunks go to the LLM, their facts are appended to the keys they name
+        self._check_mutable()
+        overlap = [key for key in new_chunk_dict if key in self.chunks]
+        if overlap:
+            raise ValueError(f"Chunk ids {overlap} are already in the graph. Remove them first with remove_chunks().")
+        unique = self._unique_chunks(new_chunk_dict)
+        responses = self._extract_responses(unique)
+        self.chunks.update(new_chunk_dict)
+        changed = self._apply_responses(unique, responses)
+        changes = update_graph(self.graph, self.clean_dict, changed, self._clean_string, self.key_aliases)
+        self.mutations += 1
+        return changes
+
+    def remove_chunks(self, chunk_ids):
+        # Only the keys extracted from the removed chunks are touched
+        self._check_mutable()
+        chunk_ids = set(chunk_ids)
+        changed = []
+        for chunk_id in chunk_ids:
+            self.chunks.pop(chunk_id, None)
+            for d_key in self.chunk_keys.pop(chunk_id, []):
+                lem_key, clean_key = self._normalize_key(d_key)
+                for key, key_dict in ((d_key, self.k_at_dict), (lem_key, self.lem_dict), (clean_key, self.clean_dict)):
+                    if key not in key_dict:
+                        continue
+                    key_dict[key] = [fact for fact in key_dict[key] if fact['chunk_id'] not in chunk_ids]
+                    if not key_dict[key]:
+                        del key_dict[key]
+                changed.append(clean_key)
+        if self.deduplicator is not None:
+            # A copy of a removed canonical chunk is extracted in its place
+            promoted = list(self.deduplicator.remove(chunk_ids))
+            if promoted:
+                promoted_chunks = {chunk_id: self.chunks[chunk_id] for chunk_id in promoted}
+                changed += self._apply_responses(promoted_chunks, self._extract_responses(promoted_chunks))
+        changes = update_graph(self.graph, self.clean_dict, changed, self._clean_string, self.key_aliases)
+        self.mutations += 1
+        return changes
+
+    def export_graph(self,file_path='data',filename='graph',binary=False):
+        file_w_ext = filename + (".bin" if binary else ".gml")
 
         if not os.path.exists(file_path):
             os.makedirs(file_path)
 
         full_path = Path(file_path)/file_w_ext
-        nx.write_gml(self.graph, full_path)
+        if binary:
+            write_graph_store(self.graph, full_path)
+        else:
+            nx.write_gml(self.graph if isinstance(self.graph, nx.Graph) else self.graph.to_networkx(), full_path)
         print(f"Graph exported to {full_path}")
\ No newline at end of file
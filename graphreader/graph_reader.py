@@ -1,129 +1,508 @@
 import yaml
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import tool
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 import json
 from .pinecone_client import Pinecone_client
 from .openai_client import OpenAI_client
 from .tools_utils import *
+from .store import KnowledgeStore
+from .tracing import get_tracer
+from .vector_store import VectorStore
+from .hybrid_search import HybridSearch
+from .prefetch import Prefetcher
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Records every LangChain chat model call as an 'llm.chat' span with its token counts.
+
+    The span is a child of the span current when the call starts, e.g. the query
+    stage of the agent that made it, so agent iterations show up as LLM calls.
+    """
+    # Called in the thread and context of the model call
+    run_inline = True
+
+    def __init__(self):
+        self._spans = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._spans[run_id] = get_tracer().span('llm.chat')
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        usage = (response.llm_output or {}).get('token_usage') or {}
+        if not usage and response.generations and response.generations[0]:
+            metadata = getattr(response.generations[0][0], 'message', None)
+            metadata = getattr(metadata, 'usage_metadata', None) or {}
+            usage = {'prompt_tokens': metadata.get('input_tokens', 0),
+                     'completion_tokens': metadata.get('output_tokens', 0)}
+        span.add(llm_calls=1, prompt_tokens=usage.get('prompt_tokens') or 0,
+                 completion_tokens=usage.get('completion_tokens') or 0)
+        span.end()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.end(error=repr(error))
+
+
+class QuerySession:
+    """
+    The state of one query answered by a GraphReader.
+
+    Everything a query produces lives on its session, so any number of sessions
+    can run at the same time against one GraphReader. The graph, index, encoder
+    and models of the reader are shared and only read.
+
+    Attributes:
+    ----------
+    reader : GraphReader
+        The reader whose graph, index and models are used.
+    query : str
+        The user question.
+    fast : bool
+        Whether the query runs in fast mode, which skips the plan, node selection and atomic-fact agent.
+    plan : str
+        The rational plan written for the question, None in fast mode.
+    node_matches : list
+        Nodes shortlisted from the vector index, fused with the BM25 ranking in fast mode.
+    sel_nodes : list
+        Initial nodes selected by the LLM, the best fused nodes in fast mode.
+    prefetched : dict or None
+        Candidate facts ranked by the reader's prefetcher for the atomic-fact agent.
+    sel_at_facts : list
+        Chunk ids selected by the atomic-fact agent, or those of the best prefetched facts in fast mode.
+    notes : list
+        Insights written by the chunk-reading agent with write_notes.
+    response : str
+        The final answer.
+    tools : dict
+        The reader's tools, with write_notes bound to this session's notes, and search_neighbors
+        ranking by this session's question when the reader has a neighbor_search.
+    cached : list
+        Stages taken from the reader's query cache instead of being computed.
+
+    Methods:
+    -------
+    run() -> str:
+        Answers the query and returns the response.
+
+    arun() -> str:
+        Coroutine version of run().
+    """
+    def __init__(self, reader, query, fast=None):
+        self.reader = reader
+        self.query = query
+        self.fast = reader.fast if fast is None else fast
+        self.plan = None
+        self.node_matches = None
+        self.sel_nodes = None
+        self.prefetched = None
+        self.sel_at_facts = None
+        self.response = None
+        self.notes = []
+        self.cached = []
+        self.tools = {**reader.tools, 'write_notes': self._make_write_notes()}
+        if reader.neighbor_search is not None:
+            self.tools['search_neighbors'] = self._make_search_neighbors()
+        self._version = None
+
+    def __repr__(self):
+        return f"QuerySession for '{self.query}'"
+
+    def _make_write_notes(self):
+        notes = self.notes
+
+        @tool
+        def write_notes(text: str):
+            """
+            Appends the insights drawn from chunks by the model to the notes of this query.
+
+            Args:
+                text (str): Insights to be appended to the notes.
+            """
+            with get_tracer().span('tool.write_notes'):
+                notes.append(text)
+
+        return write_notes
+
+    def _make_search_neighbors(self):
+        reader, session = self.reader, self
+        # Rankings already computed for this query, later pages of a node only slice them
+        rankings = {}
+
+        @tool
+        def search_neighbors(node_name: str, page: int = 0):
+            """
+            Searches for the neighboring nodes of the given input node, the most relevant to the question first.
+
+            Args:
+                node_name (str): The name of the node whose neighbors are to be retrieved.
+                page (int): Page of neighbors to return, 0 for the most relevant ones; use next_page to read more.
+
+            Returns:
+                dict: The neighbors of the page, each with its score, atomic facts and chunk ids, and the number
+                of its facts left out to save tokens; the total number of neighbors and next_page, None after the last page.
+            """
+            with get_tracer().span('tool.search_neighbors', node=node_name, page=page) as span:
+                found = reader.neighbor_search.search(reader.store, node_name, f"{session.query} {session.plan or ''}",
+                                                      page, cache=rankings)
+                tokens, saved = found.pop('tokens'), found.pop('tokens_saved')
+                span.add(neighbors=len(found['neighbors']), tokens=tokens, tokens_saved=saved)
+            print(f"Searching neighbors for node: {node_name}, page {page}: "
+                  f"{len(found['neighbors'])} of {found['total_neighbors']} neighbors, ~{tokens} tokens, ~{saved} saved")
+            return found
+
+        return search_neighbors
+
+    def _load_cached(self):
+        # Reuse the stages a similar earlier query already computed on the same graph
+        cache = self.reader.query_cache
+        if cache is None:
+            return
+        with get_tracer().span('query.cache') as span:
+            self._version = self.reader.store.version()
+            found = cache.lookup(self.query, self._version)
+            for stage, value in found.items():
+                setattr(self, stage, value)
+            self.cached = list(found)
+            span.add(cache_hits=len(found))
+
+    def _remember(self, stage):
+        # Fast mode results are not cached, a full run of a similar query must not reuse them
+        if self.reader.query_cache is not None and not self.fast:
+            self.reader.query_cache.update(self.query, self._version, **{stage: getattr(self, stage)})
+
+    def _set_rational_plan(self):
+        with get_tracer().span('query.plan'):
+            self.plan = self.reader.gpt_client.get_response(self.query, sys_prompt=self.reader.prompts['rational_plan'])
+
+    def _query_nodes(self, comp_text):
+        reader = self.reader
+        if reader.corpus is not None:
+            return reader.corpus.query_nodes(comp_text, doc_ids=reader.doc_ids)
+        matches = reader.vector_store.query_index(comp_text,index_name=reader.vect_db)
+        return [x['metadata']['node'] for x in matches['matches']]
+
+    def _shortlist_nodes(self):
+        if self.plan is None:
+            self._set_rational_plan()
+            self._remember('plan')
+        with get_tracer().span('query.shortlist'):
+            self.node_matches = self._query_nodes(self.query + " " + self.plan)
+        self._remember('node_matches')
+        return self.node_matches
+
+    def _format_mssg(self,nodes,facts=None):
+
+        formatted_query = f"""
+        Question: {self.query}"""
+        if self.plan is not None:
+            formatted_query += f"""
+        Plan: {self.plan}"""
+        if facts:
+            # One line per prefetched fact, best first; the nodes stay last
+            lines = "\n".join(f"        chunk {fact['chunk_id']} | {fact['node']} | {fact['atom_fact']}" for fact in facts)
+            formatted_query += f"""
+        Candidate facts:
+{lines}"""
+        formatted_query += f"""
+        Nodes: {nodes}"""
+
+        return formatted_query
+
+    def _node_selection(self):
+        llm = self.reader.llm.with_structured_output(self.reader.json_schema)
+        chat_template = ChatPromptTemplate.from_messages(
+                    [
+                        ("system",  self.reader.prompts['select_nodes']),
+                        ("user", self._format_mssg(self.node_matches))
+                    ]
+                )
+        return llm, chat_template.format_messages()
+
+    def _agent(self, prompt_name, tool_names):
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", self.reader.prompts[prompt_name]),
+            ("human", "{input}"),
+            ("placeholder", "{agent_scratchpad}"),
+        ])
+        tools = [self.tools[name] for name in tool_names]
+        agent = create_tool_calling_agent(self.reader.agent_llm, tools, prompt)
+        return AgentExecutor(agent=agent, tools=tools, verbose=True)
+
+    def _fact_agent(self):
+        prompt_name = 'read_at_facts_prefetched' if self.prefetched else 'read_at_facts'
+        return self._agent(prompt_name, ['read_node', 'search_neighbors'])
+
+    def _prefetch(self):
+        # Ranks the neighborhood of the selected nodes locally, before the agent's first round trip
+        prefetcher = self.reader.prefetcher
+        if prefetcher is not None:
+            self.prefetched = prefetcher.bundle(self.reader.store, self.query, self.sel_nodes, self.node_matches)
+
+    def _fast_select(self):
+        # Nodes and chunks picked locally from the BM25 and dense rankings, without any LLM call
+        reader = self.reader
+        with get_tracer().span('query.fast_select') as span:
+            fused = reader._hybrid_search(self.query, self._query_nodes(self.query))
+            self.node_matches = [node for node, _ in fused]
+            self.sel_nodes = self.node_matches[:reader.fast_nodes]
+            self.prefetched = reader.fast_prefetcher.bundle(reader.store, self.query, self.sel_nodes, self.node_matches)
+            self.sel_at_facts = self.prefetched['chunk_ids'][:reader.fast_chunks]
+            span.add(nodes=len(self.sel_nodes), chunks=len(self.sel_at_facts))
+
+    def _fact_agent_input(self):
+        facts = self.prefetched['facts'] if self.prefetched else None
+        return {"input": self._format_mssg(self.sel_nodes, facts)}
+
+    def _chunk_agent(self):
+        return self._agent('read_chunks', ['read_chunk', 'read_next_chunk', 'read_prev_chunk', 'write_notes'])
+
+    def _config(self):
+        # LLM calls are only traced while the tracer has an exporter
+        return {'callbacks': [self.reader.tracing_callback]} if get_tracer().enabled else {}
+
+    def _parse_chunk_ids(self, output):
+        return [self.reader.store.parse_chunk_id(x) for x in output.strip('[]').split(',')]
+
+    def _get_initial_nodes(self):
+        if self.node_matches is None:
+            self._shortlist_nodes()
+        with get_tracer().span('query.select_nodes'):
+            llm, messages = self._node_selection()
+            self.sel_nodes = list(llm.invoke(messages, config=self._config()).values())
+        self._remember('sel_nodes')
+
+    def _select_atomic_facts(self):
+        self._prefetch()
+        with get_tracer().span('query.atomic_facts'):
+            sel_chunks = self._fact_agent().invoke(self._fact_agent_input(), config=self._config())
+        self.sel_at_facts = self._parse_chunk_ids(sel_chunks['output'])
+        self._remember('sel_at_facts')
+
+    def _reading_chunks(self):
+        with get_tracer().span('query.read_chunks'):
+            final_response = self._chunk_agent().invoke({"input": self._format_mssg(self.sel_at_facts)}, config=self._config())
+        self.response = final_response['output']
+        self._remember('response')
+
+    def run(self):
+        # Each stage runs only if it was not found in the query cache
+        with get_tracer().span('query', query=self.query, fast=self.fast):
+            self._load_cached()
+            if self.fast:
+                if self.sel_at_facts is None:
+                    self._fast_select()
+            else:
+                if self.sel_nodes is None:
+                    self._get_initial_nodes()
+                if self.sel_at_facts is None:
+                    self._select_atomic_facts()
+            if self.response is None:
+                self._reading_chunks()
+        return self.response
+
+    async def arun(self):
+        # The cache, plan, vector search and prefetch are blocking calls and run in a worker thread,
+        # the LLM and agent calls use the models' native async API
+        tracer = get_tracer()
+        with tracer.span('query', query=self.query, fast=self.fast):
+            await asyncio.to_thread(self._load_cached)
+            if self.fast and self.sel_at_facts is None:
+                await asyncio.to_thread(self._fast_select)
+            if not self.fast and self.sel_nodes is None:
+                if self.node_matches is None:
+                    await asyncio.to_thread(self._shortlist_nodes)
+                with tracer.span('query.select_nodes'):
+                    llm, messages = self._node_selection()
+                    self.sel_nodes = list((await llm.ainvoke(messages, config=self._config())).values())
+                self._remember('sel_nodes')
+            if not self.fast and self.sel_at_facts is None:
+                await asyncio.to_thread(self._prefetch)
+                with tracer.span('query.atomic_facts'):
+                    sel_chunks = await self._fact_agent().ainvoke(self._fact_agent_input(), config=self._config())
+                self.sel_at_facts = self._parse_chunk_ids(sel_chunks['output'])
+                self._remember('sel_at_facts')
+            if self.response is None:
+                with tracer.span('query.read_chunks'):
+                    final_response = await self._chunk_agent().ainvoke({"input": self._format_mssg(self.sel_at_facts)},
+                                                                         config=self._config())
+                self.response = final_response['output']
+                self._remember('response')
+        return self.response
 
 
 class GraphReader:
+    """
+    Answers questions over a graph of atomic facts with LLM agents.
+
+    A question is turned into a rational plan, the closest graph nodes are found in
+    the vector index, an agent reads the atomic facts of the selected nodes and
+    their neighbors to pick chunks, and a second agent reads those chunks to write
+    the answer. The graph, index, encoder and models are loaded once and shared by
+    all queries; the state of each query lives in its own QuerySession, so one
+    reader can answer many queries at the same time.
+
+    In fast mode (fast kwarg, or per query) the plan, LLM node selection and
+    atomic-fact agent are skipped: nodes are shortlisted by fusing a local BM25
+    index over the node facts with the vector index, their best facts are ranked
+    by the prefetcher, and the chunks of those facts go to the chunk-reading
+    agent directly, one LLM stage instead of four.
+
+    Attributes:
+    ----------
+    vector_store : VectorStore
+        The node index, a Pinecone_client unless vector_store or corpus is passed.
+    llm : ChatOpenAI
+        Model used for node selection (llm_model kwarg).
+    agent_llm : ChatOpenAI
+        Model shared by the two agents (agent_llm kwarg).
+    gpt_client : OpenAI_client
+        Client writing the rational plans.
+    store : KnowledgeStore or CorpusStore
+        Graph and chunks read by the tools.
+    tools : dict
+        The agent tools bound to the store.
+    query_cache : QueryCache or None
+        Semantic cache of answers and intermediate results (query_cache kwarg), off by default.
+    prefetcher : Prefetcher or None
+        Ranks candidate facts around the selected nodes for the atomic-fact agent (prefetcher kwarg), off by default.
+    neighbor_search : NeighborSearch or None
+        Makes search_neighbors return a page of neighbors ranked by the question under a token budget
+        (neighbor_search kwarg); off by default, search_neighbors then returns the facts of all neighbors.
+    fast : bool
+        Whether queries run in fast mode by default (fast kwarg), False by default.
+    hybrid_search : HybridSearch
+        BM25 indexes and rank fusion used by fast mode (hybrid_search kwarg), built on the first fast query;
+        in a corpus, lexical matches come from the documents the dense search reached.
+    fast_nodes : int
+        Fused nodes whose facts are ranked in fast mode (fast_nodes kwarg), 5 by default.
+    fast_chunks : int
+        Chunks handed to the chunk-reading agent in fast mode (fast_chunks kwarg), 5 by default.
+    tracing_callback : TracingCallbackHandler
+        Traces the chat model calls while the tracer from graphreader.tracing has an exporter.
+
+    Methods:
+    -------
+    session(query: str, fast: bool = None) -> QuerySession:
+        Creates the session of a query without running it, in fast mode if fast (the reader's default when None).
+
+    get_response(query: str, fast: bool = None) -> str:
+        Answers one query.
+
+    aget_response(query: str, fast: bool = None) -> str:
+        Coroutine answering one query, many can be awaited together.
+
+    get_responses(queries: list, max_concurrency: int = 8, fast: bool = None) -> list:
+        Answers a batch of queries in parallel, in the order given.
+    """
     def __init__(self,
-                 graph, 
+                 graph,
                  pinecone_api_key,
                  openai_api_key,
                  vect_db_name = 'graph-reader',
                  **kwargs):
-        
+
         self.pinecone_api_key = pinecone_api_key
         self.openai_api_key = openai_api_key
 
         self.vect_db = vect_db_name
         self.graph = graph
-        self.pine_client = Pinecone_client(api_key = self.pinecone_api_key)
-        self.pine_client.upsert_data(self.vect_db,self.graph)
-        self.llm = kwargs.get('llm_model',ChatOpenAI(model="gpt-3.5-turbo",api_key=self.openai_api_key))
+        # A Corpus answers over many documents, searching only the doc_ids given (all by default)
+        self.corpus = kwargs.get('corpus')
+        self.doc_ids = kwargs.get('doc_ids')
+        if self.corpus is not None:
+            self.vector_store = self.corpus.vector_store
+        else:
+            # Any VectorStore backend can be passed in, e.g. LocalVectorStore for offline use
+            self.vector_store = kwargs['vector_store'] if 'vector_store' in kwargs else Pinecone_client(api_key = self.pinecone_api_key)
+            # An index already filled by IngestPipeline can be used as it is with upsert=False
+            if kwargs.get('upsert', True):
+                self.vector_store.upsert_data(self.vect_db,self.graph)
+        self.llm = kwargs['llm_model'] if 'llm_model' in kwargs else ChatOpenAI(model="gpt-3.5-turbo",api_key=self.openai_api_key)
+        # One client per model for all queries, they are safe to share between threads
+        self.agent_llm = kwargs['agent_llm'] if 'agent_llm' in kwargs else ChatOpenAI(model="gpt-3.5-turbo",api_key=self.openai_api_key)
+        self.gpt_client = kwargs['gpt_client'] if 'gpt_client' in kwargs else OpenAI_client(api_key = self.openai_api_key)
+        # Graph and chunks are loaded once, on first tool call, and shared by all tool calls
+        if self.corpus is not None:
+            self.store = self.corpus.store
+        else:
+            self.store = kwargs.get('store') or KnowledgeStore(graph_path=kwargs.get('graph_path','graph.gml'),
+                                                               chunks_path=kwargs.get('chunks_path','chunks.pkl'))
+        self.tools = make_tools(self.store)
+        self.tracing_callback = TracingCallbackHandler()
+        self.query_cache = kwargs.get('query_cache')
+        if self.query_cache is not None and self.query_cache.encoder is None:
+            self.query_cache.encoder = self.vector_store.encoder
+        self.prefetcher = kwargs.get('prefetcher')
+        if self.prefetcher is not None and self.prefetcher.encoder is None:
+            self.prefetcher.encoder = self.vector_store.encoder
+        self.neighbor_search = kwargs.get('neighbor_search')
+        if self.neighbor_search is not None and self.neighbor_search.encoder is None:
+            self.neighbor_search.encoder = self.vector_store.encoder
+        self.fast = kwargs.get('fast', False)
+        self.hybrid_search = kwargs.get('hybrid_search') or HybridSearch()
+        self.fast_nodes = kwargs.get('fast_nodes', 5)
+        self.fast_chunks = kwargs.get('fast_chunks', 5)
+        # Fast mode always ranks facts locally, with the reader's prefetcher when it has one
+        self.fast_prefetcher = self.prefetcher or Prefetcher(encoder=self.vector_store.encoder)
         self._load_prompts()
         self._load_json_struct()
-        
+
     def _load_prompts(self,prompts_file_path = 'graphreader/prompts/prompts.yaml'):
         with open(prompts_file_path, 'r') as file:
             self.prompts = yaml.safe_load(file)
-            
-    def _load_json_struct(self,json_file_path = 'sel_nodes_struct.json'):
+
+    def _load_json_struct(self,json_file_path = 'graphreader/sel_nodes_struct.json'):
         with open(json_file_path) as f:
             json_schema = json.load(f)
-            
+
         self.json_schema = json_schema
-        
-    def _set_rational_plan(self,query):
-        gpt_client = OpenAI_client(api_key = self.openai_api_key)
-        self.plan = gpt_client.get_response(query, sys_prompt=self.prompts['rational_plan'])
-
-        
-    def _shortlist_nodes(self,query):
-        self._set_rational_plan(query)
-        comp_text = query + " " + self.plan
-        matches = self.pine_client.query_index(comp_text,index_name=self.vect_db)
-        node_matches = [x['metadata']['node'] for x in matches['matches']]
-        self.node_matches = node_matches
-        return node_matches
-        
-    def _format_mssg(self,nodes):
-        
-        formatted_query = f"""
-        Question: {self.query}
-        Plan: {self.plan}
-        Nodes: {nodes}"""
-        
-        return formatted_query
-        
-    
-    def _get_initial_nodes(self):
-        shortlist_nodes = self._shortlist_nodes(self.query)
-        format_query = self._format_mssg(shortlist_nodes)
-        llm = self.llm.with_structured_output(self.json_schema)
-        chat_template = ChatPromptTemplate.from_messages(
-                    [
-                        ("system",  self.prompts['select_nodes']),
-                        ("user", format_query)
-                    ]
-                )
-        
-        messages = chat_template.format_messages()
-        resp = llm.invoke(messages)
-        
-        self.sel_nodes = list(resp.values())
-        
-    def _select_atomic_facts(self,init_nodes):
-        formatted_query = f"""
-        Question: {self.query}
-        Plan: {self.plan}
-        Nodes: {init_nodes}"""
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.prompts['read_at_facts']), 
-            ("human", "{input}"), 
-            ("placeholder", "{agent_scratchpad}"),
-        ])
+    def _node_texts(self, store, prefix=''):
+        # (node, text) pairs of every node of a store, prefixed with the doc_id in a corpus
+        for node in store.graph.nodes():
+            yield prefix + node, VectorStore._node_text(self._facts(store, node))
 
-        tools=[read_node, search_neighbors]
-        llm = ChatOpenAI(model="gpt-3.5-turbo")
+    @staticmethod
+    def _facts(store, node):
+        data = store.node_data(node)
+        # A single fact comes back from GML as a dict instead of a list
+        return [data] if isinstance(data, dict) else data
 
-        agent = create_tool_calling_agent(llm, tools, prompt)
-        agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+    def _lexical_indexes(self, dense):
+        # A BM25 index follows its graph and is rebuilt when the store changes
+        if self.corpus is None:
+            return [self.hybrid_search.ensure_index(self._node_texts(self.store), self.store.version())]
+        # One index per shard, and only for the documents the dense search reached, so shards stay lazily loaded
+        indexes = []
+        for doc_id in dict.fromkeys(node.partition(':')[0] for node in dense):
+            shard = self.corpus.shard(doc_id)
+            indexes.append(self.hybrid_search.ensure_index(self._node_texts(shard, f"{doc_id}:"), shard.version(), key=doc_id))
+        return indexes
 
-        sel_chunks = agent_executor.invoke({"input": formatted_query})
-        self.sel_at_facts = [int(x) for  x in sel_chunks['output'].strip('[]').split(',')]
-        
-    def _reading_chunks(self,chunk_ids):
-        formatted_query = f"""
-        Question: {self.query}
-        Plan: {self.plan}
-        Nodes: {chunk_ids}"""
+    def _hybrid_search(self, query, dense):
+        return self.hybrid_search.search(query, dense, self._lexical_indexes(dense))
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.prompts['read_chunks']), 
-            ("human", "{input}"), 
-            ("placeholder", "{agent_scratchpad}"),
-        ])
+    def session(self, query, fast=None):
+        return QuerySession(self, query, fast=fast)
 
-        tools=[read_chunk,read_next_chunk, read_prev_chunk,write_notes]
-        llm = ChatOpenAI(model="gpt-3.5-turbo")
-        agent = create_tool_calling_agent(llm, tools, prompt)
-        agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+    def get_response(self,query,fast=None):
+        return self.session(query, fast=fast).run()
+
+    async def aget_response(self,query,fast=None):
+        return await self.session(query, fast=fast).arun()
+
+    def get_responses(self,queries,max_concurrency=8,fast=None):
+        # map keeps the answers in the order of the queries
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            return list(executor.map(lambda query: self.get_response(query, fast=fast), queries))
 
-        final_response = agent_executor.invoke({"input": formatted_query})
-        
-        self.response = final_response['output']
-        
-    def get_response(self,query):
-        self.query = query
-        self._get_initial_nodes()
-        self._select_atomic_facts(self.sel_nodes)
-        self._reading_chunks(self.sel_at_facts)
-        
-        return self.response
-    
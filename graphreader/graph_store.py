@@ -0,0 +1,295 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+import networkx as nx
+from .node_view import NodeView
+
+MAGIC = b'GRGRAPH1'
+HEADER = struct.Struct('<8sQQ6Q')
+# Order of the sections after the header, their offsets are stored in the header
+SECTIONS = ('name_offsets', 'name_order', 'indptr', 'indices', 'payload_offsets', 'payload')
+
+
+def write_graph_store(graph, path):
+    """
+    Writes an undirected graph to the binary graph store format read by GraphStore.
+
+    Layout of the file (all integers little-endian):
+        header          : magic b'GRGRAPH1', node count n (uint64), adjacency length m (uint64),
+                          byte offset of each section below (uint64[6])
+        names           : the UTF-8 name of every node, back to back
+                          (the sections below start on 8 byte boundaries)
+        name_offsets    : uint64[n + 1], node i's name is names[off[i]:off[i + 1]]
+        name_order      : uint32[n], node indices sorted by name bytes, for binary search
+        indptr          : uint64[n + 1], CSR row pointers
+        indices         : uint32[m], the neighbors of node i are indices[indptr[i]:indptr[i + 1]],
+                          in networkx adjacency order
+        payload_offsets : uint64[n + 1]
+        payload         : the attributes of every node as one JSON object, back to back
+
+    Args:
+        graph (networkx.Graph, Graph, GraphStore or CompactGraph): The graph, with string node names.
+        path (str): Output path.
+    """
+    graph = graph if isinstance(graph, nx.Graph) or hasattr(graph, 'to_networkx') else graph.graph
+    if not isinstance(graph, nx.Graph):
+        # A GraphStore or CompactGraph is unpacked first
+        graph = graph.to_networkx()
+    if graph.is_directed() or graph.is_multigraph():
+        raise ValueError("Only undirected simple graphs can be written to a graph store.")
+    path = Path(path)
+    if not os.path.exists(path.parent):
+        os.makedirs(path.parent)
+    nodes = list(graph.nodes())
+    if any(not isinstance(node, str) for node in nodes):
+        raise ValueError("Graph store node names must be strings.")
+    position = {node: i for i, node in enumerate(nodes)}
+    names = [node.encode('utf-8') for node in nodes]
+    name_offsets, indptr, indices, payload_offsets = array('Q', [0]), array('Q', [0]), array('I'), array('Q', [0])
+    for name in names:
+        name_offsets.append(name_offsets[-1] + len(name))
+    payloads = []
+    for node in nodes:
+        indices.extend(position[other] for other in graph.adj[node])
+        indptr.append(len(indices))
+        payloads.append(json.dumps(graph.nodes[node], separators=(',', ':')).encode('utf-8'))
+        payload_offsets.append(payload_offsets[-1] + len(payloads[-1]))
+    name_order = array('I', sorted(range(len(nodes)), key=names.__getitem__))
+    columns = [name_offsets, name_order, indptr, indices, payload_offsets]
+    if sys.byteorder != 'little':
+        for column in columns:
+            column.byteswap()
+    # Written next to the target and swapped in whole: a store that has the old file mapped keeps reading it,
+    # and a reload never sees a half written file
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        _write_sections(tmp, nodes, names, columns, payloads, len(indices))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _write_sections(path, nodes, names, columns, payloads, n_indices):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+        f.write(b''.join(names))
+        offsets = []
+        for column in columns:
+            # Sections start on 8 byte boundaries, so the columns can be cast in place
+            f.write(b'\0' * (-f.tell() % 8))
+            offsets.append(f.tell())
+            column.tofile(f)
+        offsets.append(f.tell())
+        for payload in payloads:
+            f.write(payload)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, len(nodes), n_indices, *offsets))
+
+
+def is_graph_store(path):
+    """Tells whether a file is a graph store, by its magic bytes."""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class GraphStore:
+    """
+    Read-only, memory-mapped access to a graph written by write_graph_store.
+
+    Opening a store only maps the file and reads the header, whatever the size
+    of the graph. A node is found by binary search in the sorted name table,
+    its neighbors are a slice of the CSR arrays, and its atomic facts are
+    parsed from its own JSON payload only when they are read. It answers the
+    networkx calls used by the tools and vector stores (nodes, neighbors,
+    number_of_nodes, ...), so it can stand in for the graph loaded from GML.
+
+    Methods:
+    -------
+    node_index(node_name: str) -> int:
+        Returns the integer id of a node, KeyError if it does not exist.
+
+    node_attrs(node_name: str) -> dict:
+        Returns the attributes of a node, e.g. {'data': [...]}.
+
+    node_data(node_name: str) -> list:
+        Returns the atomic facts and chunk ids of a node.
+
+    neighbors(node_name: str) -> list:
+        Returns the names of the neighbors of a node, in the order they were written.
+
+    nodes, number_of_nodes(), number_of_edges(), edges(), has_node(), __iter__, __len__, __contains__ :
+        The networkx graph interface used by graphreader.
+
+    to_networkx() -> networkx.Graph:
+        Loads the whole graph, with the same node and adjacency order as the written one.
+
+    close() -> None:
+        Unmaps the file.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, adjacency, *offsets = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a graph store file.")
+        self._count = count
+        self._adjacency = adjacency
+        sections = dict(zip(SECTIONS, offsets))
+        view = self._view = memoryview(self._mmap)
+        self._names = HEADER.size
+        self._name_offsets = self._column(view, sections['name_offsets'], 'Q', count + 1)
+        self._name_order = self._column(view, sections['name_order'], 'I', count)
+        self._indptr = self._column(view, sections['indptr'], 'Q', count + 1)
+        self._indices = self._column(view, sections['indices'], 'I', adjacency)
+        self._payload_offsets = self._column(view, sections['payload_offsets'], 'Q', count + 1)
+        self._payload = sections['payload']
+        self.nodes = NodeView(self)
+
+    def __repr__(self):
+        return f"GraphStore at {self.path} with {self._count} nodes"
+
+    @staticmethod
+    def _column(view, offset, code, length):
+        column = view[offset:offset + length * array(code).itemsize]
+        if sys.byteorder == 'little':
+            return column.cast(code)
+        column = array(code, column.tobytes())
+        column.byteswap()
+        return column
+
+    def _name_bytes(self, index):
+        return self._mmap[self._names + self._name_offsets[index]:self._names + self._name_offsets[index + 1]]
+
+    def _name(self, index):
+        return str(self._name_bytes(index), 'utf-8')
+
+    def _find(self, node_name):
+        target = node_name.encode('utf-8') if isinstance(node_name, str) else None
+        if target is None:
+            return None
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._name_bytes(self._name_order[mid]) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._count and self._name_bytes(self._name_order[low]) == target:
+            return self._name_order[low]
+        return None
+
+    def node_index(self, node_name):
+        index = self._find(node_name)
+        if index is None:
+            raise KeyError(node_name)
+        return index
+
+    def _attrs(self, index):
+        start = self._payload + self._payload_offsets[index]
+        return json.loads(self._mmap[start:self._payload + self._payload_offsets[index + 1]])
+
+    def node_attrs(self, node_name):
+        return self._attrs(self.node_index(node_name))
+
+    def node_data(self, node_name):
+        return self.node_attrs(node_name)['data']
+
+    def _neighbor_indices(self, index):
+        return self._indices[self._indptr[index]:self._indptr[index + 1]]
+
+    def neighbors(self, node_name):
+        return [self._name(i) for i in self._neighbor_indices(self.node_index(node_name))]
+
+    def has_node(self, node_name):
+        return self._find(node_name) is not None
+
+    def __contains__(self, node_name):
+        return self.has_node(node_name)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (self._name(i) for i in range(self._count))
+
+    def number_of_nodes(self):
+        return self._count
+
+    def number_of_edges(self):
+        # Every edge is stored in the rows of both of its ends, self-loops once
+        loops = sum(1 for i in range(self._count) if i in self._neighbor_indices(i))
+        return (self._adjacency + loops) // 2
+
+    def edges(self):
+        # Each edge once, from the end written first
+        for i in range(self._count):
+            for j in self._neighbor_indices(i):
+                if j >= i:
+                    yield self._name(i), self._name(j)
+
+    def to_networkx(self):
+        graph = nx.Graph()
+        names = list(self)
+        for i, name in enumerate(names):
+            graph.add_node(name, **self._attrs(i))
+        # The adjacency dicts are filled row by row, so every node keeps its neighbor order;
+        # both ends of an edge share one attribute dict, as with add_edge
+        adj = graph._adj
+        for i, name in enumerate(names):
+            neighbors = adj[name]
+            for j in self._neighbor_indices(i):
+                other = names[j]
+                neighbors[other] = adj[other].get(name, {})
+        return graph
+
+    def close(self):
+        for column in (self._name_offsets, self._name_order, self._indptr, self._indices,
+                       self._payload_offsets, self._view):
+            if isinstance(column, memoryview):
+                column.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_graph(path):
+    """Loads a graph file, as a GraphStore for the binary format and with networkx for GML."""
+    return GraphStore(path) if is_graph_store(path) else nx.read_gml(path)
+
+
+def convert_gml(gml_path, store_path=None):
+    """
+    Converts a GML graph written by Graph.export_graph to a graph store.
+
+    Args:
+        gml_path (str): Path of the GML file.
+        store_path (str): Output path, the GML path with a .bin suffix by default.
+
+    Returns:
+        Path: The path of the written graph store.
+    """
+    store_path = Path(store_path) if store_path else Path(gml_path).with_suffix('.bin')
+    write_graph_store(nx.read_gml(gml_path), store_path)
+    return store_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert a GML graph file to a memory-mapped graph store.')
+    parser.add_argument('gml_path')
+    parser.add_argument('store_path', nargs='?', default=None)
+    args = parser.parse_args()
+    print(f"Graph store written to {convert_gml(args.gml_path, args.store_path)}")
@@ -0,0 +1,142 @@
+import heapq
+import math
+import random
+import numpy as np
+
+
+class HNSWIndex:
+    """
+    A hierarchical navigable small world graph for approximate inner-product search.
+
+    Vectors live in an external matrix (usually memory-mapped) and are referred
+    to by row number; the index only stores the layered neighbor lists. For
+    cosine similarity the rows must be L2-normalized.
+
+    Attributes:
+    ----------
+    M : int
+        Neighbors kept per node on the upper layers (2 * M on layer 0).
+    ef_construction : int
+        Candidate list size used while inserting.
+    levels : list
+        Top layer of each inserted row.
+    links : list
+        For each row, one neighbor list per layer from 0 to its top layer.
+    entry : int
+        Row the searches start from, -1 while the index is empty.
+
+    Methods:
+    -------
+    add(row, vectors) -> None:
+        Inserts one row of the vector matrix.
+
+    search(query, k, vectors, ef=64) -> list:
+        Returns up to k (score, row) pairs, best first.
+
+    to_arrays() / from_arrays(arrays, **kwargs):
+        Flattens the neighbor lists into NumPy arrays for saving, and back.
+    """
+    def __init__(self, M=16, ef_construction=100, seed=0):
+        self.M = M
+        self.ef_construction = ef_construction
+        self.level_mult = 1 / math.log(M)
+        self.levels = []
+        self.links = []
+        self.entry = -1
+        self.max_level = -1
+        self._rng = random.Random(seed)
+
+    def __repr__(self):
+        return f"HNSWIndex with {len(self.levels)} vectors and {self.max_level + 1} layers"
+
+    def __len__(self):
+        return len(self.levels)
+
+    def _max_links(self, level):
+        return 2 * self.M if level == 0 else self.M
+
+    def _search_layer(self, query, entry_points, ef, level, vectors):
+        # Best-first walk of one layer, keeping the ef best rows seen so far
+        visited = set(entry_points)
+        scores = vectors[entry_points] @ query
+        candidates = [(-float(s), row) for s, row in zip(scores, entry_points)]
+        heapq.heapify(candidates)
+        results = [(float(s), row) for s, row in zip(scores, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        while candidates:
+            neg_score, row = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_score < results[0][0]:
+                break
+            fresh = [n for n in self.links[row][level] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for score, n in zip((vectors[fresh] @ query).tolist(), fresh):
+                if len(results) < ef or score > results[0][0]:
+                    heapq.heappush(candidates, (-score, n))
+                    heapq.heappush(results, (score, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+    def _prune(self, row, level, vectors):
+        neighbors = self.links[row][level]
+        if len(neighbors) <= self._max_links(level):
+            return
+        scores = vectors[neighbors] @ vectors[row]
+        keep = np.argsort(-scores)[:self._max_links(level)]
+        self.links[row][level] = [neighbors[i] for i in keep]
+
+    def add(self, row, vectors):
+        if row != len(self.levels):
+            raise ValueError(f"Rows must be added in order, expected {len(self.levels)} got {row}")
+        level = int(-math.log(1.0 - self._rng.random()) * self.level_mult)
+        self.levels.append(level)
+        self.links.append([[] for _ in range(level + 1)])
+        if self.entry == -1:
+            self.entry, self.max_level = row, level
+            return
+        query = vectors[row]
+        entry_points = [self.entry]
+        for lev in range(self.max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, lev, vectors)[0][1]]
+        for lev in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(query, entry_points, self.ef_construction, lev, vectors)
+            self.links[row][lev] = [n for _, n in found[:self.M]]
+            for n in self.links[row][lev]:
+                self.links[n][lev].append(row)
+                self._prune(n, lev, vectors)
+            entry_points = [n for _, n in found]
+        if level > self.max_level:
+            self.entry, self.max_level = row, level
+
+    def search(self, query, k, vectors, ef=64):
+        if self.entry == -1:
+            return []
+        entry_points = [self.entry]
+        for lev in range(self.max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, lev, vectors)[0][1]]
+        return self._search_layer(query, entry_points, max(ef, k), 0, vectors)[:k]
+
+    def to_arrays(self):
+        lists = [neighbors for node_links in self.links for neighbors in node_links]
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(neighbors) for neighbors in lists])
+        flat = np.fromiter((n for neighbors in lists for n in neighbors), dtype=np.int32, count=int(offsets[-1]))
+        return {'levels': np.asarray(self.levels, dtype=np.int32), 'offsets': offsets, 'neighbors': flat,
+                'header': np.asarray([self.M, self.ef_construction, self.entry, self.max_level], dtype=np.int64)}
+
+    @classmethod
+    def from_arrays(cls, arrays, seed=0):
+        M, ef_construction, entry, max_level = (int(x) for x in arrays['header'])
+        index = cls(M=M, ef_construction=ef_construction, seed=seed)
+        index.entry, index.max_level = entry, max_level
+        index.levels = arrays['levels'].tolist()
+        offsets, flat = arrays['offsets'].tolist(), arrays['neighbors'].tolist()
+        pos = 0
+        for level in index.levels:
+            index.links.append([flat[offsets[pos + lev]:offsets[pos + lev + 1]] for lev in range(level + 1)])
+            pos += level + 1
+        return index
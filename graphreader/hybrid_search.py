@@ -0,0 +1,147 @@
+import math
+import re
+import threading
+from collections import Counter
+import numpy as np
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercased word tokens of a text, as indexed by BM25Index."""
+    return _WORD.findall(text.lower())
+
+
+class BM25Index:
+    """
+    An in-memory BM25 inverted index over node texts.
+
+    Every term maps to the rows of the nodes containing it and its frequency in
+    each, as NumPy arrays, so a query only touches the postings of its own terms.
+
+    Attributes:
+    ----------
+    k1 : float
+        Term frequency saturation, 1.5 by default.
+    b : float
+        Length normalization, 0.75 by default.
+    nodes : list
+        The indexed node names, by row.
+
+    Methods:
+    -------
+    search(query: str, top_k: int = 20) -> list:
+        Returns (node, score) pairs of the best matching nodes, best first, nodes without a query term left out.
+    """
+    def __init__(self, nodes, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.nodes = list(nodes)
+        postings = {}
+        lengths = []
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(row)
+                postings[term][1].append(count)
+        self._lengths = np.asarray(lengths, dtype=np.float32)
+        average = self._lengths.mean() if len(lengths) and self._lengths.mean() > 0 else 1.0
+        self._norms = k1 * (1 - b + b * self._lengths / average)
+        n = len(self.nodes)
+        self._postings = {term: (np.asarray(rows, dtype=np.int64), np.asarray(counts, dtype=np.float32),
+                                 math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5)))
+                          for term, (rows, counts) in postings.items()}
+
+    def __repr__(self):
+        return f"BM25Index with {len(self.nodes)} nodes and {len(self._postings)} terms"
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def search(self, query, top_k=20):
+        scores = np.zeros(len(self.nodes), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term in self._postings:
+                rows, counts, idf = self._postings[term]
+                scores[rows] += idf * counts * (self.k1 + 1) / (counts + self._norms[rows])
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        # Best first, earlier nodes first on ties
+        matched = matched[np.lexsort((matched, -scores[matched]))]
+        return [(self.nodes[row], float(scores[row])) for row in matched]
+
+
+class HybridSearch:
+    """
+    Shortlists graph nodes by fusing a BM25 ranking with the dense index ranking.
+
+    A BM25 index is built over the same node texts as the vector index (all
+    atomic facts of a node) and kept until the store version changes; a corpus
+    has one index per document shard, each built when a query first reaches
+    that document. The lexical results of several indexes are merged by BM25
+    score. The lexical and dense rankings are combined by weighted reciprocal
+    rank fusion, each node scoring weight / (rrf_k + rank) in every ranking it
+    appears in, so neither score scale has to be calibrated against the other.
+
+    Attributes:
+    ----------
+    top_k : int
+        Nodes returned by a search and taken from each ranking, 20 by default.
+    lexical_weight, dense_weight : float
+        Weights of the BM25 and dense rankings in the fusion, 1.0 by default.
+    rrf_k : int
+        Rank offset of the fusion, 60 by default.
+    indexes : dict
+        The lexical indexes and the store version each was built for, by key ('' for a single graph).
+
+    Methods:
+    -------
+    ensure_index(items, version, key='') -> BM25Index:
+        Returns the lexical index of a key, built from (node, text) pairs unless it was built for this version.
+
+    fuse(lexical: list, dense: list) -> list:
+        Returns (node, score) pairs of the fused ranking of two ranked node lists.
+
+    search(query: str, dense: list, indexes: list) -> list:
+        Returns (node, score) pairs fusing the BM25 results of the query in the given indexes with a dense ranking.
+    """
+    def __init__(self, top_k=20, lexical_weight=1.0, dense_weight=1.0, rrf_k=60, k1=1.5, b=0.75):
+        self.top_k = top_k
+        self.lexical_weight = lexical_weight
+        self.dense_weight = dense_weight
+        self.rrf_k = rrf_k
+        self.k1 = k1
+        self.b = b
+        self.indexes = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"HybridSearch(top_k={self.top_k}, lexical_weight={self.lexical_weight}, dense_weight={self.dense_weight})"
+
+    def ensure_index(self, items, version, key=''):
+        # items is only consumed when the index is (re)built
+        with self._lock:
+            index, built = self.indexes.get(key, (None, None))
+            if index is None or built != version:
+                nodes, texts = [], []
+                for node, text in items:
+                    nodes.append(node)
+                    texts.append(text)
+                index = BM25Index(nodes, texts, k1=self.k1, b=self.b)
+                self.indexes[key] = (index, version)
+            return index
+
+    def fuse(self, lexical, dense):
+        scores = {}
+        for weight, ranking in ((self.lexical_weight, lexical), (self.dense_weight, dense)):
+            for rank, node in enumerate(ranking[:self.top_k]):
+                scores[node] = scores.get(node, 0.0) + weight / (self.rrf_k + rank + 1)
+        # sorted is stable, so ties keep the lexical order first
+        return sorted(scores.items(), key=lambda item: -item[1])[:self.top_k]
+
+    def search(self, query, dense, indexes):
+        hits = sorted((hit for index in indexes for hit in index.search(query, self.top_k)), key=lambda hit: -hit[1])
+        return self.fuse([node for node, _ in hits], dense)
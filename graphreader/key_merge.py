@@ -0,0 +1,112 @@
+import numpy as np
+from tqdm import tqdm
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def similar_pairs(vectors, threshold, exact_max=5000, tables=16, bits=None, max_bucket=1000,
+                  block_size=1024, seed=0, show_progress=True):
+    """
+    Finds the pairs of rows whose cosine similarity is at least threshold.
+
+    Up to exact_max rows every pair is checked, block by block with one matrix
+    product per block. Beyond that, rows are hashed by the signs of random
+    projections (random-hyperplane LSH) into 2**bits buckets, over several
+    independent tables, and only rows sharing a bucket are compared. Close rows
+    share a bucket in at least one table with high probability, so the cost grows
+    with the number of rows instead of its square, at the price of missing a few
+    pairs. Buckets larger than max_bucket are compared in slices.
+
+    Args:
+        vectors (numpy.ndarray): One embedding per row.
+        threshold (float): Minimum cosine similarity of a pair.
+        exact_max (int): Number of rows up to which all pairs are checked.
+        tables (int): Number of hash tables.
+        bits (int): Hyperplanes per table, so that buckets hold about 16 rows when None.
+        max_bucket (int): Largest number of rows compared at once within a bucket.
+        block_size (int): Rows per matrix product in the exact search.
+        seed (int): Seed of the random hyperplanes.
+        show_progress (bool): Whether to show a tqdm progress bar.
+
+    Returns:
+        List[tuple]: (i, j, similarity) with i < j, each pair once, sorted.
+    """
+    vectors = _normalize(vectors)
+    n = len(vectors)
+    pairs = {}
+    if n < 2:
+        return []
+    if n <= exact_max:
+        for start in tqdm(range(0, n, block_size), desc='Comparing keys', disable=not show_progress):
+            # Rows of the block against themselves and all later rows, each pair once
+            block = vectors[start:start + block_size] @ vectors[start:].T
+            found_i, found_j = np.nonzero(np.triu(block >= threshold, 1))
+            for i, j in zip(found_i, found_j):
+                pairs[(start + int(i), start + int(j))] = float(block[i, j])
+    else:
+        bits = bits or max(1, int(np.log2(n / 16)))
+        rng = np.random.default_rng(seed)
+        powers = 1 << np.arange(bits, dtype=np.int64)
+        for _ in tqdm(range(tables), desc='Comparing keys', disable=not show_progress):
+            codes = (vectors @ rng.standard_normal((vectors.shape[1], bits)).astype(np.float32) > 0) @ powers
+            order = np.argsort(codes, kind='stable')
+            bounds = np.flatnonzero(np.diff(codes[order])) + 1
+            for bucket in np.split(order, bounds):
+                for start in range(0, len(bucket), max_bucket):
+                    rows = np.sort(bucket[start:start + max_bucket])
+                    if len(rows) < 2:
+                        continue
+                    block = vectors[rows] @ vectors[rows].T
+                    found_i, found_j = np.nonzero(np.triu(block >= threshold, 1))
+                    for i, j in zip(found_i, found_j):
+                        pairs[(int(rows[i]), int(rows[j]))] = float(block[i, j])
+    return sorted((int(i), int(j), score) for (i, j), score in pairs.items())
+
+
+def cluster_keys(keys, vectors, threshold, weights=None, **kwargs):
+    """
+    Groups keys whose embeddings are similar and picks one representative per group.
+
+    Keys joined by a similar pair end up in the same group (single linkage). The
+    representative of a group is its key with the largest weight, e.g. the
+    number of facts, and the earliest one on ties.
+
+    Args:
+        keys (list): The keys, in order.
+        vectors (numpy.ndarray): One embedding per key.
+        threshold (float): Minimum cosine similarity for two keys to be merged.
+        weights (list): Weight of each key, all equal when None.
+        **kwargs: Passed on to similar_pairs.
+
+    Returns:
+        dict: Each merged key mapped to the representative of its group. Keys left alone are not included.
+    """
+    parent = list(range(len(keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j, _ in similar_pairs(vectors, threshold, **kwargs):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    weights = [1] * len(keys) if weights is None else weights
+    groups = {}
+    for i in range(len(keys)):
+        groups.setdefault(find(i), []).append(i)
+    aliases = {}
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        best = max(members, key=lambda i: (weights[i], -i))
+        for i in members:
+            if i != best:
+                aliases[keys[i]] = keys[best]
+    return aliases
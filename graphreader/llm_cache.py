@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class ResponseCache:
+    """
+    A persistent, content-addressed cache of LLM responses backed by SQLite.
+
+    Entries are keyed by a hash of everything that determines the response
+    (query text, system prompt, model and temperature), so a rebuild over
+    unchanged chunks is answered entirely from disk. When the stored responses
+    exceed max_bytes the least recently used entries are evicted.
+
+    Attributes:
+    ----------
+    path : Path
+        Location of the SQLite database file.
+    max_bytes : int
+        Size budget for the stored responses.
+    hits : int
+        Lookups answered from the cache since it was opened.
+    misses : int
+        Lookups that found no entry since it was opened.
+
+    Methods:
+    -------
+    make_key(text, sys_prompt, model, temperature) -> str:
+        Returns the content hash used as the cache key.
+
+    get(key) -> str or None:
+        Returns the cached response and marks it as recently used.
+
+    put(key, response) -> None:
+        Stores a response and evicts old entries if over budget.
+
+    stats() -> dict:
+        Returns hit/miss counts, hit rate, entry count and stored bytes.
+
+    clear() -> None:
+        Removes every entry.
+    """
+    def __init__(self, path='data/llm_cache.sqlite', max_bytes=512 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if not os.path.exists(self.path.parent):
+            os.makedirs(self.path.parent)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def __repr__(self):
+        return f"ResponseCache at {self.path}"
+
+    @staticmethod
+    def make_key(text, sys_prompt, model, temperature):
+        payload = json.dumps([text, sys_prompt, model, temperature], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time_ns(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, response):
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time_ns()))
+            self._bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used entries until the stored responses fit the budget again
+        while self._bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bytes -= size
+                if self._bytes <= self.max_bytes:
+                    break
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries, 'bytes': self._bytes}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,219 @@
+import json
+import os
+import threading
+from pathlib import Path
+import numpy as np
+from .vector_store import VectorStore
+from .hnsw import HNSWIndex
+from .tracing import get_tracer
+
+
+class LocalVectorStore(VectorStore):
+    """
+    An in-process vector index with no network round trips.
+
+    Small indexes are searched exactly with one matrix-vector product, large ones
+    through an HNSW graph. Each index is persisted under path/index_name as a
+    .npy vector matrix (memory-mapped when loaded back), a JSON file with the ids
+    and metadata, and the HNSW neighbor lists when present. Updated and removed
+    nodes are tombstoned and the index is compacted once half of it is stale.
+    Each namespace of an index is a separate index under path/index_name/namespace.
+
+    Attributes:
+    ----------
+    path : Path
+        Directory the indexes are saved in, 'data/vector_index' by default.
+    index_type : str
+        'exact', 'hnsw' or 'auto' (HNSW from hnsw_threshold vectors on).
+    hnsw_threshold : int
+        Number of vectors from which 'auto' builds an HNSW graph.
+    M, ef_construction, ef_search : int
+        HNSW parameters.
+    top_k : int
+        Number of matches returned by query_index, 20 by default.
+    indexes : dict
+        The loaded indexes by name.
+
+    Methods:
+    -------
+    upsert_data(index_name, graph, **kwargs) -> None:
+        Embeds all nodes of the graph and replaces the index with them.
+
+    update_nodes(index_name, graph, changes) -> None:
+        Re-embeds the added and updated nodes and tombstones the removed ones.
+
+    write_vectors(index_name, vector_list, removed=(), namespace='') -> None:
+        Appends embedded vectors in memory, replacing rows with the same id; flush() saves them.
+
+    query_index(query_text, index_name=None, **kwargs) -> dict:
+        Returns the top_k closest nodes in the Pinecone match format.
+
+    search_vector(index, vector, top_k) -> list:
+        Returns (score, row) pairs of an index for an already encoded query vector.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.metric not in ('cosine', 'dotproduct'):
+            raise ValueError(f"Unsupported metric '{self.metric}'. Use 'cosine' or 'dotproduct'.")
+        self.path = Path(kwargs.get('path', 'data/vector_index'))
+        self.index_type = kwargs.get('index_type', 'auto')
+        self.hnsw_threshold = kwargs.get('hnsw_threshold', 100000)
+        self.M = kwargs.get('M', 16)
+        self.ef_construction = kwargs.get('ef_construction', 100)
+        self.ef_search = kwargs.get('ef_search', 64)
+        self.top_k = kwargs.get('top_k', 20)
+        self.indexes = {}
+        self.index = None
+        self._load_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"LocalVectorStore at {self.path}"
+
+    def _prepare(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if self.metric == 'cosine':
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def _use_hnsw(self, n_vectors):
+        return self.index_type == 'hnsw' or (self.index_type == 'auto' and n_vectors >= self.hnsw_threshold)
+
+    def _new_index(self, ids, metadata, vectors):
+        index = {'ids': list(ids), 'metadata': list(metadata), 'vectors': vectors,
+                 'deleted': set(), 'hnsw': None}
+        index['rows'] = {vid: row for row, vid in enumerate(index['ids'])}
+        if self._use_hnsw(len(index['ids'])):
+            index['hnsw'] = HNSWIndex(M=self.M, ef_construction=self.ef_construction)
+            for row in range(len(index['ids'])):
+                index['hnsw'].add(row, vectors)
+        return index
+
+    def _index_dir(self, index_name):
+        return self.path / index_name
+
+    @staticmethod
+    def _index_key(index_name, namespace=''):
+        # A namespace is kept as its own index in a subdirectory of the index
+        return f"{index_name}/{namespace}" if namespace else index_name
+
+    def _save(self, index_name):
+        # Files are replaced atomically, an older memory map of the vectors stays valid
+        index = self.indexes[index_name]
+        index_dir = self._index_dir(index_name)
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        tmp = index_dir / 'vectors.tmp.npy'
+        np.save(tmp, index['vectors'])
+        os.replace(tmp, index_dir / 'vectors.npy')
+        meta = {'metric': self.metric, 'ids': index['ids'], 'metadata': index['metadata'],
+                'deleted': sorted(index['deleted'])}
+        with open(index_dir / 'meta.tmp.json', 'w') as f:
+            json.dump(meta, f)
+        os.replace(index_dir / 'meta.tmp.json', index_dir / 'meta.json')
+        if index['hnsw'] is not None:
+            np.savez(index_dir / 'hnsw.tmp.npz', **index['hnsw'].to_arrays())
+            os.replace(index_dir / 'hnsw.tmp.npz', index_dir / 'hnsw.npz')
+        elif os.path.exists(index_dir / 'hnsw.npz'):
+            os.remove(index_dir / 'hnsw.npz')
+
+    def _load(self, index_name):
+        index_dir = self._index_dir(index_name)
+        with open(index_dir / 'meta.json') as f:
+            meta = json.load(f)
+        index = {'ids': meta['ids'], 'metadata': meta['metadata'], 'deleted': set(meta['deleted']),
+                 'vectors': np.load(index_dir / 'vectors.npy', mmap_mode='r'), 'hnsw': None}
+        index['rows'] = {vid: row for row, vid in enumerate(index['ids']) if row not in index['deleted']}
+        if os.path.exists(index_dir / 'hnsw.npz'):
+            with np.load(index_dir / 'hnsw.npz') as arrays:
+                index['hnsw'] = HNSWIndex.from_arrays(arrays)
+        return index
+
+    def _connect_db(self, index_name):
+        # Returns the index instead of switching self.index, concurrent queries may search different indexes
+        index = self.indexes.get(index_name)
+        if index is None:
+            with self._load_lock:
+                index = self.indexes.get(index_name)
+                if index is None:
+                    if os.path.exists(self._index_dir(index_name) / 'meta.json'):
+                        index = self._load(index_name)
+                    else:
+                        index = self._new_index([], [], np.zeros((0, self.vector_dimension), dtype=np.float32))
+                    self.indexes[index_name] = index
+        return index
+
+    def upsert_data(self, index_name, graph, **kwargs):
+        index_name = self._index_key(index_name, kwargs.get('namespace', ''))
+        with get_tracer().span('vector.upsert', backend='local', index=index_name) as span:
+            vector_list = self._get_vectors(graph)
+            vectors = self._prepare([x['values'] for x in vector_list]) if vector_list \
+                else np.zeros((0, self.vector_dimension), dtype=np.float32)
+            self.indexes[index_name] = self._new_index([x['id'] for x in vector_list],
+                                                       [x['metadata'] for x in vector_list], vectors)
+            self.index = self.indexes[index_name]
+            self._save(index_name)
+            span.add(vectors=len(vector_list))
+
+    def write_vectors(self, index_name, vector_list, removed=(), namespace=''):
+        with get_tracer().span('vector.write', backend='local', index=index_name) as span:
+            span.add(vectors=len(vector_list), removed=len(removed))
+            self._write_vectors(index_name, vector_list, removed, namespace)
+
+    def _write_vectors(self, index_name, vector_list, removed, namespace):
+        # Vectors of known ids replace the old rows, which are tombstoned
+        index_name = self._index_key(index_name, namespace)
+        index = self.index = self._connect_db(index_name)
+        stale = [self._node_id(node) for node in removed] + [x['id'] for x in vector_list]
+        for vid in stale:
+            row = index['rows'].pop(vid, None)
+            if row is not None:
+                index['deleted'].add(row)
+        if vector_list:
+            start = len(index['ids'])
+            index['vectors'] = np.concatenate([index['vectors'], self._prepare([x['values'] for x in vector_list])])
+            for row, x in enumerate(vector_list, start):
+                index['ids'].append(x['id'])
+                index['metadata'].append(x['metadata'])
+                index['rows'][x['id']] = row
+                if index['hnsw'] is not None:
+                    index['hnsw'].add(row, index['vectors'])
+        if len(index['deleted']) * 2 > len(index['ids']) or \
+                (index['hnsw'] is None and self._use_hnsw(len(index['rows']))):
+            live = sorted(index['rows'].values())
+            self.indexes[index_name] = self._new_index([index['ids'][r] for r in live],
+                                                       [index['metadata'][r] for r in live],
+                                                       np.ascontiguousarray(index['vectors'][live]))
+            self.index = self.indexes[index_name]
+
+    def flush(self, index_name, namespace=''):
+        index_name = self._index_key(index_name, namespace)
+        if index_name in self.indexes:
+            with get_tracer().span('vector.flush', backend='local', index=index_name):
+                self._save(index_name)
+
+    def search_vector(self, index, vector, top_k):
+        query = self._prepare(vector)[0]
+        if not index['ids']:
+            return []
+        if index['hnsw'] is not None:
+            # Ask for extra rows so tombstoned ones can be dropped without coming up short
+            found = index['hnsw'].search(query, top_k + len(index['deleted']), index['vectors'], ef=self.ef_search)
+            return [(s, r) for s, r in found if r not in index['deleted']][:top_k]
+        scores = np.asarray(index['vectors'] @ query)
+        if index['deleted']:
+            scores[list(index['deleted'])] = -np.inf
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[r]), int(r)) for r in best if np.isfinite(scores[r])]
+
+    def query_index(self, query_text, index_name = None, **kwargs):
+        with get_tracer().span('vector.query', backend='local', index=index_name):
+            index = self._connect_db(self._index_key(index_name, kwargs.get('namespace', ''))) if index_name else self.index
+            text_emb = self.encoder.get_embeddings(query_text)
+            found = self.search_vector(index, text_emb, kwargs.get('top_k', self.top_k))
+            return {'matches': [{'id': index['ids'][row], 'score': score,
+                                 'metadata': index['metadata'][row]} for score, row in found]}
@@ -0,0 +1,114 @@
+import numpy as np
+from .rate_limiter import RateLimiter
+from .vector_store import VectorStore
+
+FACT_OVERHEAD = 32
+
+
+class NeighborSearch:
+    """
+    Ranked, size-capped neighbor retrieval for the search_neighbors tool.
+
+    The neighbors of a node are ranked by the cosine similarity of their
+    embedding with the question and plan of the query. Node embeddings are those
+    of the vector index (all the atomic facts of a node as one text), so the ones
+    computed when the index was built come from the encoder's cache. A call
+    returns one page of top_k neighbors, best first, and their atomic facts are
+    included in rounds, one fact per neighbor at a time, until the token budget
+    is spent; the agent asks for the next page when it needs more. Every call
+    reports the tokens it saved against returning the facts of all neighbors.
+    Given a cache dict, the ranking of a node for a query is kept in it, so the
+    following pages only read the facts of their own neighbors.
+
+
+    Attributes:
+    ----------
+    encoder : Text_Encoder or None
+        Encoder of the queries and node texts, GraphReader sets its index encoder when None.
+        Without an encoder neighbors keep their graph order.
+    top_k : int
+        Neighbors per page, 10 by default.
+    token_budget : int
+        Largest estimated number of tokens of facts returned by one call, 2000 by default.
+
+    Methods:
+    -------
+    rank(store, node_name: str, query: str) -> list:
+        Returns (neighbor, score) pairs, best first.
+
+    search(store, node_name: str, query: str, page: int = 0, cache: dict = None) -> dict:
+        Returns one page of ranked neighbors with their facts, and the token counts of the call.
+    """
+    def __init__(self, encoder=None, top_k=10, token_budget=2000):
+        self.encoder = encoder
+        self.top_k = top_k
+        self.token_budget = token_budget
+
+    def __repr__(self):
+        return f"NeighborSearch(top_k={self.top_k}, token_budget={self.token_budget})"
+
+    @staticmethod
+    def _facts(store, node):
+        data = store.node_data(node)
+        # A single fact comes back from GML as a dict instead of a list
+        return [data] if isinstance(data, dict) else data
+
+    def _rank(self, neighbors, texts, query):
+        if self.encoder is None or not neighbors:
+            return [(neighbor, 0.0) for neighbor in neighbors]
+        vectors = np.asarray(self.encoder.get_embeddings([query] + [texts[neighbor] for neighbor in neighbors]),
+                             dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1
+        vectors /= norms[:, None]
+        scores = vectors[1:] @ vectors[0]
+        order = np.argsort(-scores, kind='stable')
+        return [(neighbors[i], float(scores[i])) for i in order]
+
+    def rank(self, store, node_name, query):
+        neighbors = store.neighbors(node_name)
+        return self._rank(neighbors, {neighbor: VectorStore._node_text(self._facts(store, neighbor))
+                                      for neighbor in neighbors}, query)
+
+    def _ranking(self, store, node_name, query):
+        # The ranked neighbors and the estimated tokens of all their facts, read once per node and query
+        neighbors = store.neighbors(node_name)
+        facts = {neighbor: self._facts(store, neighbor) for neighbor in neighbors}
+        texts = {neighbor: VectorStore._node_text(facts[neighbor]) for neighbor in neighbors}
+        # What the unranked tool returned: the facts of every neighbor, with about
+        # FACT_OVERHEAD characters of dict syntax and chunk id per fact
+        full = RateLimiter.estimate_tokens(*texts.values()) + FACT_OVERHEAD * sum(map(len, facts.values())) // 4
+        return self._rank(neighbors, texts, query), full
+
+    def search(self, store, node_name, query, page=0, cache=None):
+        if page < 0:
+            raise ValueError(f"page must be 0 or more, got {page}.")
+        if cache is None:
+            ranked, full = self._ranking(store, node_name, query)
+        else:
+            if (node_name, query) not in cache:
+                cache[(node_name, query)] = self._ranking(store, node_name, query)
+            ranked, full = cache[(node_name, query)]
+        start = page * self.top_k
+        selected = ranked[start:start + self.top_k]
+        facts = {neighbor: self._facts(store, neighbor) for neighbor, _ in selected}
+        kept = {neighbor: [] for neighbor, _ in selected}
+        used, spent = 0, False
+        # Facts are taken in rounds, one per neighbor in rank order, so every neighbor of the page gets some
+        for rank in range(max((len(facts[neighbor]) for neighbor in kept), default=0)):
+            for neighbor in kept:
+                if rank >= len(facts[neighbor]):
+                    continue
+                tokens = RateLimiter.estimate_tokens(str(facts[neighbor][rank]))
+                if used + tokens > self.token_budget:
+                    spent = True
+                    break
+                kept[neighbor].append(facts[neighbor][rank])
+                used += tokens
+            if spent:
+                break
+        results = [{'node': neighbor, 'score': round(score, 4), 'facts': kept[neighbor],
+                    'more_facts': len(facts[neighbor]) - len(kept[neighbor])} for neighbor, score in selected]
+        return {'node': node_name, 'page': page, 'total_neighbors': len(ranked), 'neighbors': results,
+                'next_page': page + 1 if start + self.top_k < len(ranked) else None,
+                'tokens': used, 'tokens_saved': max(0, full - used)}
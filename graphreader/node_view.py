@@ -0,0 +1,26 @@
+class NodeView:
+    """
+    The part of networkx's node view the tools and vector stores use.
+
+    Shared by the read-only graphs (GraphStore, CompactGraph), which provide
+    node_attrs(node_name), iteration over node names, __len__ and __contains__.
+    """
+    def __init__(self, store):
+        self._store = store
+
+    def __call__(self, data=False):
+        if data:
+            return ((name, self._store.node_attrs(name)) for name in self._store)
+        return iter(self._store)
+
+    def __getitem__(self, node_name):
+        return self._store.node_attrs(node_name)
+
+    def __iter__(self):
+        return iter(self._store)
+
+    def __len__(self):
+        return len(self._store)
+
+    def __contains__(self, node_name):
+        return node_name in self._store
@@ -1,5 +1,9 @@
 
-from openai import OpenAI
+import random
+import threading
+import time
+from openai import OpenAI, APIStatusError, APIConnectionError
+from .tracing import get_tracer
 
 
 
@@ -15,12 +19,16 @@ class OpenAI_client:
         The model name used for generating responses (e.g., "gpt-3.5-turbo").
     temperature : float
         The temperature setting controls the randomness of the model's output.
-    sys_prompt : str or bool
-        The system prompt providing initial instructions to the model.
-    user_prompt : str
-        The user query or input passed to the model.
-    message : list
-        A list of message dictionaries that define the conversation context.
+    base_url : str or None
+        Alternative OpenAI-compatible endpoint, e.g. a local server for testing.
+    max_retries : int
+        Number of retries on 429, 5xx and connection errors, with exponential backoff.
+    rate_limiter : RateLimiter or None
+        Shared requests/tokens-per-minute limiter applied before every call.
+    client : openai.OpenAI
+        The pooled HTTP client, created once and shared by all calls and threads.
+    cache : ResponseCache or None
+        Persistent response cache consulted before any network call.
 
     Methods:
     -------
@@ -30,8 +38,14 @@ class OpenAI_client:
     __repr__()
         Returns a string representation of the OpenAI_client object.
         
-    _construct_message()
+    _construct_message(sys_prompt, user_prompt) -> list
         Constructs the message payload based on system and user prompts.
+
+    _get_client() -> openai.OpenAI
+        Returns the pooled client, creating it on first use.
+
+    _create_completion(message, model, temperature)
+        Sends one chat completion request with rate limiting and retries.
         
     get_response(query, **kwargs)
         Generates a response from the model based on the provided query and settings.
@@ -41,37 +55,105 @@ class OpenAI_client:
         self.api_key = kwargs.get('api_key')
         if not self.api_key:
             raise ValueError("API key is missing. Provide it as 'api_key' or set the 'OPENAI_API_KEY' environment variable.")
+        self.model = kwargs.get('model', "gpt-3.5-turbo")
+        self.temperature = kwargs.get('temperature', 0.7)
+        self.base_url = kwargs.get('base_url')
+        self.max_retries = kwargs.get('max_retries', 5)
+        self.backoff = kwargs.get('backoff', 1.0)
+        self.max_backoff = kwargs.get('max_backoff', 60.0)
+        self.rate_limiter = kwargs.get('rate_limiter')
+        self.client = kwargs.get('client')
+        self.cache = kwargs.get('cache')
+        self._client_lock = threading.Lock()
 
     def __repr__(self):
         return "OpenAI API custom client"
 
-    def _construct_message(self):
+    def _construct_message(self, sys_prompt, user_prompt):
         # Constructs the message based on system and user prompts
-        self.sys_dict = {"role": "system", "content": self.sys_prompt} if self.sys_prompt else None
-        self.user_dict = {"role": "user", "content": self.user_prompt}
+        sys_dict = {"role": "system", "content": sys_prompt} if sys_prompt else None
+        user_dict = {"role": "user", "content": user_prompt}
         
         # Build the final message list
-        self.message = [self.sys_dict, self.user_dict] if self.sys_dict else [self.user_dict]
+        return [sys_dict, user_dict] if sys_dict else [user_dict]
+
+    def _get_client(self):
+        # One HTTP client (and connection pool) per OpenAI_client, retries are handled here
+        if self.client is None:
+            with self._client_lock:
+                if self.client is None:
+                    self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        return self.client
+
+    def _retry_delay(self, error, attempt):
+        # Honour Retry-After when the server sends it, otherwise back off exponentially with jitter
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.max_backoff)
+        except ValueError:
+            pass
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay * (0.5 + random.random() / 2)
+
+    def _create_completion(self, message, model, temperature):
+        client = self._get_client()
+        est_tokens, entry = 0, None
+        if self.rate_limiter:
+            est_tokens = self.rate_limiter.estimate_tokens(*[m['content'] for m in message])
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                entry = self.rate_limiter.acquire(est_tokens)
+            try:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=message,
+                    temperature=temperature
+                )
+            except (APIStatusError, APIConnectionError) as e:
+                retryable = isinstance(e, APIConnectionError) or e.status_code == 429 or e.status_code >= 500
+                if not retryable or attempt == self.max_retries:
+                    raise
+                get_tracer().current().add(retries=1)
+                time.sleep(self._retry_delay(e, attempt))
+                continue
+            usage = getattr(response, 'usage', None)
+            if self.rate_limiter and usage is not None and usage.total_tokens:
+                self.rate_limiter.adjust(usage.total_tokens - est_tokens, entry)
+            return response
 
     def get_response(self, query, **kwargs):
-        # Set model, temperature, and prompts from kwargs or use defaults
-        self.model = kwargs.get('model', "gpt-3.5-turbo")
-        self.temperature = kwargs.get('temperature', 0.7)
-        self.sys_prompt = kwargs.get('sys_prompt', None)
-        self.user_prompt = query
-        
-        # Construct the message for the OpenAI API call
-        self._construct_message()
+        # Set model, temperature, and prompts from kwargs or use the client defaults
+        model = kwargs.get('model', self.model)
+        temperature = kwargs.get('temperature', self.temperature)
+        sys_prompt = kwargs.get('sys_prompt', None)
         
-        # Call OpenAI's API to get the response
-        try:
-            client = OpenAI(api_key = self.api_key)
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=self.message,
-                temperature=self.temperature
-            )
-            return response.choices[0].message.content  # Extract and return the response text
-        except Exception as e:
-            print(f"Error during API call: {e}")
-            return None
\ No newline at end of file
+        with get_tracer().span('llm.completion', model=model) as span:
+            # Identical requests are answered from the cache without a network call
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key(query, sys_prompt, model, temperature)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    span.add(cache_hits=1)
+                    return cached
+            
+            # Construct the message for the OpenAI API call
+            message = self._construct_message(sys_prompt, query)
+            
+            # Call OpenAI's API to get the response
+            try:
+                response = self._create_completion(message, model, temperature)
+                content = response.choices[0].message.content  # Extract and return the response text
+            except Exception as e:
+                print(f"Error during API call: {e}")
+                span.set(error=str(e))
+                return None
+            span.add(llm_calls=1)
+            usage = getattr(response, 'usage', None)
+            if usage is not None:
+                span.add(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+            if cache_key is not None and content is not None:
+                self.cache.put(cache_key, content)
+            return content
\ No newline at end of file
@@ -1,27 +1,33 @@
 
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 from .tools_utils import *
-from .Text_encoder import Text_Encoder
+from .vector_store import VectorStore
+from .tracing import get_tracer
 
-class Pinecone_client:
+class Pinecone_client(VectorStore):
     def __init__(self,**kwargs):
+        super().__init__(**kwargs)
         self.api_key = kwargs.get("api_key")
-        self.vector_dimension = kwargs.get('vector_dim',384)
-        self.metric = kwargs.get('metric','cosine')
         self.db_cloud = kwargs.get('db_cloud','aws')
         self.cloud_region = kwargs.get('cloud_region','us-east-1')
-        self.encoder_model = kwargs.get('encoder_model',SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2'))
-        self.encoder = Text_Encoder(encoder_model=self.encoder_model)
-        self._set_client()
+        self.batch_size = kwargs.get('batch_size',1000)
+        self.max_in_flight = kwargs.get('max_in_flight',4)
+        self.ready_timeout = kwargs.get('ready_timeout',300)
+        self.top_k = kwargs.get('top_k',20)
+        self._indexes = {}
+        self._connect_lock = threading.Lock()
+        self._set_client(kwargs.get('client'))
         
     def __repr__(self):
         print("Pinecone database client")
         
-    def _set_client(self):
-        self.client = Pinecone(api_key=self.api_key)
+    def _set_client(self,client=None):
+        # A ready-made client (e.g. a local mock of the index API) can be injected
+        self.client = client if client is not None else Pinecone(api_key=self.api_key)
         
     def _create_index(self,index_name):
         self.client.create_index(
@@ -34,44 +40,66 @@ class Pinecone_client:
             )
         )
         
+    def _wait_until_ready(self,index_name):
+        # Poll the index status instead of sleeping a fixed time
+        delay = 0.1
+        deadline = time.monotonic() + self.ready_timeout
+        while not self.client.describe_index(index_name).status['ready']:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Pinecone index '{index_name}' was not ready after {self.ready_timeout}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+        
     def _connect_db(self,index_name):
-        self._set_client()
-        if index_name not in self.client.list_indexes().names():
-            self._create_index(index_name)
-            
-        time.sleep(2)
-        self.index = self.client.Index(index_name)
-        time.sleep(1)
+        # Index handles are created once per index name and reused by every call
+        index = self._indexes.get(index_name)
+        if index is None:
+            with self._connect_lock:
+                index = self._indexes.get(index_name)
+                if index is None:
+                    if index_name not in self.client.list_indexes().names():
+                        self._create_index(index_name)
+                    self._wait_until_ready(index_name)
+                    index = self._indexes[index_name] = self.client.Index(index_name)
+        return index
         
-    def _embed_nodes(self,graph):
-        self.embs = self.encoder.get_embeddings([" ".join([x['atom_fact'] for x in node[1]['data']])for node in graph.nodes(data=True)])
-        
-    def _get_vectors(self,graph):
-        final_data = []
-        nodes = [node[0] for node in graph.nodes(data=True)]
-        self._embed_nodes(graph)
-        for i in range(len(graph.nodes())):
-            data = {'id': str(i), 'values': self.embs[i], "metadata": {
-                "node": nodes[i]}}
-            final_data.append(data)
-            
-        self.vector_list = final_data
+    def _upsert_batches(self,index,vectors,desc=None,namespace=''):
+        # Batches are sent in parallel with at most max_in_flight requests outstanding
+        batches = chunks(vectors, batch_size=self.batch_size)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            pending = set()
+            for batch in tqdm(batches, desc=desc, disable=desc is None):
+                if len(pending) >= self.max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(index.upsert, vectors=list(batch), namespace=namespace))
+            for future in pending:
+                future.result()
         
     def upsert_data(self,index_name,graph,**kwargs):
-        
-        
-        
-        self._connect_db(index_name)
-        self._get_vectors(graph)
-        
-        for ids_vectors_chunk in tqdm(chunks(self.vector_list, batch_size=1000),desc='Adding vectors to Pinecone database in batch of 1000'):
-            self.index.upsert(vectors=ids_vectors_chunk)
-            time.sleep(2)
+        with get_tracer().span('vector.upsert', backend='pinecone', index=index_name) as span:
+            index = self.index = self._connect_db(index_name)
+            vector_list = self._get_vectors(graph)
+            self._upsert_batches(index, vector_list,
+                                 desc=f'Adding vectors to Pinecone database in batches of {self.batch_size}',
+                                 namespace=kwargs.get('namespace',''))
+            span.add(vectors=len(vector_list))
+            
+    def write_vectors(self,index_name,vector_list,removed=(),namespace=''):
+        # Upserts replace vectors with the same id, so updated nodes need no delete
+        with get_tracer().span('vector.write', backend='pinecone', index=index_name) as span:
+            span.add(vectors=len(vector_list), removed=len(removed))
+            index = self._connect_db(index_name)
+            if removed:
+                index.delete(ids=[self._node_id(node) for node in removed], namespace=namespace)
+            if vector_list:
+                self._upsert_batches(index, vector_list, namespace=namespace)
             
     def query_index(self, query_text,index_name = None ,**kwargs):
-        text_emb = self.encoder.get_embeddings(query_text).tolist()
-        if index_name:
-            self._connect_db(index_name)
-        self.query_matches = self.index.query(vector = text_emb, top_k = 20, include_metadata = True, **kwargs)
-        return self.query_matches    
+        with get_tracer().span('vector.query', backend='pinecone', index=index_name):
+            text_emb = self.encoder.get_embeddings(query_text).tolist()
+            index = self._connect_db(index_name) if index_name else self.index
+            top_k = kwargs.pop('top_k', self.top_k)
+            return index.query(vector = text_emb, top_k = top_k, include_metadata = True, **kwargs)    
         
\ No newline at end of file
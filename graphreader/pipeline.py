@@ -0,0 +1,270 @@
+import queue
+import resource
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .chunk_store import ChunkStore, ChunkStoreWriter
+from .document import Document
+from .graph_class import Graph
+
+_DONE = object()
+
+
+class _Aborted(Exception):
+    # Raised inside a stage when another stage failed
+    pass
+
+
+class _StageStats:
+    # Work counters of one stage; busy time excludes waiting on the queues
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.max_queue = 0
+
+    def report(self):
+        return {'items': self.items, 'busy_s': round(self.busy, 3), 'max_queue': self.max_queue,
+                'items_per_s': round(self.items / self.busy, 2) if self.busy else None}
+
+
+class IngestPipeline:
+    """
+    Ingests a PDF (or any stream of chunks) into a chunk store, a Graph and a vector index as one pipeline.
+
+    Pages, chunks, atomic-fact extraction, embedding and the index writes run
+    as stages in their own threads, connected by bounded queues, so the embedding
+    of early chunks overlaps the LLM calls of later ones and at most a few queues
+    worth of chunks, responses and vectors are held in memory at any time. Chunks
+    are written straight to a memory-mapped chunk store instead of a dict.
+
+    Facts are added to the graph in chunk order as responses arrive. The nodes
+    touched since the last embedding are embedded together every embed_every
+    chunks, so a node mentioned in many chunks is re-embedded at most once per
+    batch and its vector replaced in the index. Edges need every node's facts and
+    are built once at the end. So does the key merge of merge_threshold, which
+    runs right before them: the keys merged away are deleted from the index and
+    the keys they were merged into are embedded again with all their facts.
+
+    Attributes:
+    ----------
+    source : Document or iterable
+        The document being ingested (a path is opened with chunk_len and doc_workers),
+        or any iterable of (chunk_id, text) pairs.
+    graph : Graph
+        The graph the facts are added to, created empty with the Graph kwargs
+        (model, max_workers, llm_cache, rpm, tpm, merge_threshold, ...).
+    vector_store : VectorStore
+        The index the node vectors are written to.
+    index_name : str
+        Name of the vector index, 'graphreader' by default.
+    namespace : str
+        Namespace of the index the vectors are written to, '' (the default namespace) by default.
+    chunk_path : Path
+        Path of the chunk store, 'data/chunks.bin' by default.
+    queue_size : int
+        Capacity of each queue between two stages, 64 by default.
+    embed_every : int
+        Number of chunks whose touched nodes are embedded together, 32 by default.
+    stats : dict
+        Per-stage report of the last run, see run().
+
+    Methods:
+    -------
+    run(**kwargs) -> Graph:
+        Runs all stages to completion and returns the graph, kwargs go to
+        Document.iter_chunks (st_ind, end_ind).
+    """
+    def __init__(self, source, openai_api_key, vector_store, **kwargs):
+        if isinstance(source, (str, Path)):
+            source = Document(str(source), chunk_len=kwargs.get('chunk_len', 1000),
+                              workers=kwargs.get('doc_workers', 1))
+        self.source = source
+        self.vector_store = vector_store
+        self.index_name = kwargs.get('index_name', 'graphreader')
+        self.namespace = kwargs.get('namespace', '')
+        self.chunk_path = Path(kwargs.get('chunk_path', 'data/chunks.bin'))
+        self.queue_size = kwargs.get('queue_size', 64)
+        self.embed_every = kwargs.get('embed_every', 32)
+        graph_kwargs = {key: value for key, value in kwargs.items() if key not in
+                        ('index_name', 'namespace', 'chunk_path', 'queue_size', 'embed_every', 'chunk_len', 'doc_workers')}
+        self.graph = Graph({}, openai_api_key, **graph_kwargs)
+        self.stats = {}
+
+    def __repr__(self):
+        return f"IngestPipeline into index '{self.index_name}'"
+
+    def _put(self, q, item, stats):
+        # Blocks while the next stage is behind, unless another stage failed
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                stats.max_queue = max(stats.max_queue, q.qsize())
+                return
+            except queue.Full:
+                continue
+        raise _Aborted
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        raise _Aborted
+
+    def _chunk_stage(self, out_q, stats, **kwargs):
+        with ChunkStoreWriter(self.chunk_path) as writer:
+            chunks = iter(self.source.iter_chunks(**kwargs) if isinstance(self.source, Document) else self.source)
+            while True:
+                start = time.perf_counter()
+                item = next(chunks, _DONE)
+                if item is not _DONE:
+                    writer.add(*item)
+                    stats.items += 1
+                stats.busy += time.perf_counter() - start
+                self._put(out_q, item, stats)
+                if item is _DONE:
+                    return
+
+    def _extract_stage(self, in_q, out_q, stats):
+        # A window of requests is in flight and responses leave in chunk order;
+        # near duplicates of earlier chunks (dedup_threshold) are stored but never extracted
+        window = 2 * max(self.graph.max_workers, 1)
+        deduplicator = self.graph.deduplicator
+        with ThreadPoolExecutor(max_workers=max(self.graph.max_workers, 1)) as executor:
+            in_flight = deque()
+            while True:
+                item = self._get(in_q)
+                if item is not _DONE:
+                    chunk_id, text = item
+                    if deduplicator is None or deduplicator.add(chunk_id, text) is None:
+                        in_flight.append((chunk_id, executor.submit(self.graph._extract_chunk, text)))
+                while in_flight and (item is _DONE or len(in_flight) >= window or in_flight[0][1].done()):
+                    chunk_id, future = in_flight.popleft()
+                    start = time.perf_counter()
+                    response = future.result()
+                    stats.busy += time.perf_counter() - start
+                    stats.items += 1
+                    self._put(out_q, (chunk_id, response), stats)
+                if item is _DONE:
+                    self._put(out_q, _DONE, stats)
+                    return
+
+    def _graph_stage(self, in_q, out_q, stats):
+        # Only this thread touches the graph, so node texts can be read without a lock
+        dirty = {}
+        pending = 0
+        while True:
+            item = self._get(in_q)
+            start = time.perf_counter()
+            if item is not _DONE:
+                chunk_id, response = item
+                for clean_key in self.graph._apply_responses([chunk_id], [response]):
+                    dirty[clean_key] = None
+                pending += 1
+                stats.items += 1
+            batch = None
+            if dirty and (pending >= self.embed_every or item is _DONE):
+                nodes = list(dirty)
+                batch = (nodes, [self.vector_store._node_text(self.graph.clean_dict[node]) for node in nodes])
+                dirty, pending = {}, 0
+            stats.busy += time.perf_counter() - start
+            if batch is not None:
+                self._put(out_q, batch, stats)
+            if item is _DONE:
+                self._put(out_q, _DONE, stats)
+                return
+
+    def _embed_stage(self, in_q, out_q, stats):
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                self._put(out_q, _DONE, stats)
+                return
+            nodes, texts = item
+            start = time.perf_counter()
+            embs = self.vector_store.encoder.get_embeddings(texts)
+            vector_list = self.vector_store._vector_records(nodes, embs)
+            stats.busy += time.perf_counter() - start
+            stats.items += len(nodes)
+            self._put(out_q, vector_list, stats)
+
+    def _upsert_stage(self, in_q, stats):
+        while True:
+            item = self._get(in_q)
+            start = time.perf_counter()
+            if item is _DONE:
+                self.vector_store.flush(self.index_name, namespace=self.namespace)
+                stats.busy += time.perf_counter() - start
+                return
+            self.vector_store.write_vectors(self.index_name, item, namespace=self.namespace)
+            stats.busy += time.perf_counter() - start
+            stats.items += len(item)
+
+    def _merge_keys(self):
+        # Merged keys carry the facts of their aliases, so their vectors are replaced
+        self.graph._merge_similar_keys()
+        aliases = self.graph.key_aliases
+        if aliases:
+            nodes = list(dict.fromkeys(aliases.values()))
+            embs = self.vector_store.encoder.get_embeddings(
+                [self.vector_store._node_text(self.graph.clean_dict[node]) for node in nodes])
+            self.vector_store.write_vectors(self.index_name, self.vector_store._vector_records(nodes, embs),
+                                            removed=list(aliases), namespace=self.namespace)
+            self.vector_store.flush(self.index_name, namespace=self.namespace)
+
+    def _run_stage(self, target, *args, **kwargs):
+        try:
+            target(*args, **kwargs)
+        except _Aborted:
+            pass
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+
+    @staticmethod
+    def _peak_rss_mb():
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+    def run(self, **kwargs):
+        self._stop = threading.Event()
+        self._error = None
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(4)]
+        stages = {name: _StageStats(name) for name in ('chunk', 'extract', 'graph', 'embed', 'upsert')}
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self._chunk_stage, queues[0], stages['chunk']), kwargs=kwargs),
+            threading.Thread(target=self._run_stage, args=(self._extract_stage, queues[0], queues[1], stages['extract'])),
+            threading.Thread(target=self._run_stage, args=(self._graph_stage, queues[1], queues[2], stages['graph'])),
+            threading.Thread(target=self._run_stage, args=(self._embed_stage, queues[2], queues[3], stages['embed'])),
+            threading.Thread(target=self._run_stage, args=(self._upsert_stage, queues[3], stages['upsert'])),
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+
+        self.stats = {name: stage.report() for name, stage in stages.items()}
+        if self.graph.merge_threshold is not None:
+            merge_start = time.perf_counter()
+            self._merge_keys()
+            self.stats['merge'] = {'busy_s': round(time.perf_counter() - merge_start, 3)}
+        edge_start = time.perf_counter()
+        self.graph._build_edges()
+        self.graph.chunks = ChunkStore(self.chunk_path)
+        self.stats['edges'] = {'busy_s': round(time.perf_counter() - edge_start, 3)}
+        self.stats['total_s'] = round(time.perf_counter() - start, 3)
+        self.stats['peak_rss_mb'] = self._peak_rss_mb()
+        print(f"Ingested {stages['chunk'].items} chunks into {len(self.graph.graph)} nodes "
+              f"in {self.stats['total_s']}s, peak RSS {self.stats['peak_rss_mb']} MB")
+        return self.graph
@@ -0,0 +1,173 @@
+import networkx as nx
+import numpy as np
+from .tracing import get_tracer
+
+
+def personalized_pagerank(neighbors, seeds, alpha=0.85, max_hops=2, max_nodes=200, iterations=50, tol=1e-6):
+    """
+    Ranks the nodes around seed nodes by personalized PageRank.
+
+    The subgraph reachable from the seeds in max_hops hops is collected breadth
+    first, at most max_nodes nodes, and a random walk restarting at the seeds
+    with probability 1 - alpha is iterated on it. Edges leaving the subgraph are
+    ignored and the mass of nodes without edges goes back to the seeds.
+
+    Args:
+        neighbors (callable): Returns the neighbor names of a node, e.g. KnowledgeStore.neighbors.
+        seeds (dict): Seed node names mapped to their restart weights.
+        alpha (float): Probability of following an edge rather than restarting.
+        max_hops (int): Depth of the explored subgraph.
+        max_nodes (int): Largest number of nodes explored.
+        iterations (int): Largest number of power iterations.
+        tol (float): L1 change of the scores under which the iteration stops.
+
+    Returns:
+        dict: Scores of the explored nodes, summing to 1, from the highest. Empty when no seed exists.
+    """
+    adjacency = {}
+    frontier = []
+    for seed in seeds:
+        try:
+            adjacency[seed] = list(neighbors(seed))
+            frontier.append(seed)
+        except (KeyError, ValueError, nx.NetworkXError):
+            # Seed names come from the LLM and may not be nodes
+            continue
+    if not adjacency:
+        return {}
+    for _ in range(max_hops):
+        next_frontier = []
+        for node in frontier:
+            for other in adjacency[node]:
+                if other in adjacency or len(adjacency) >= max_nodes:
+                    continue
+                adjacency[other] = list(neighbors(other))
+                next_frontier.append(other)
+        frontier = next_frontier
+    nodes = list(adjacency)
+    position = {node: i for i, node in enumerate(nodes)}
+    rows = [[position[other] for other in adjacency[node] if other in position] for node in nodes]
+    restart = np.zeros(len(nodes))
+    for seed, weight in seeds.items():
+        if seed in position:
+            restart[position[seed]] += weight
+    restart /= restart.sum() if restart.sum() > 0 else 1
+    scores = restart.copy()
+    for _ in range(iterations):
+        spread = np.zeros(len(nodes))
+        dangling = 0.0
+        for i, row in enumerate(rows):
+            if row:
+                np.add.at(spread, row, scores[i] / len(row))
+            else:
+                dangling += scores[i]
+        updated = (1 - alpha) * restart + alpha * (spread + dangling * restart)
+        done = np.abs(updated - scores).sum() < tol
+        scores = updated
+        if done:
+            break
+    order = np.argsort(-scores, kind='stable')
+    return {nodes[i]: float(scores[i]) for i in order}
+
+
+class Prefetcher:
+    """
+    Explores the graph locally before the atomic-fact agent runs.
+
+    The nodes selected for a query (and, with a lower weight, the shortlisted
+    ones) seed a personalized PageRank over their neighborhood. The facts of the
+    best ranked nodes are scored by their node's rank and, when an encoder is
+    set, by their similarity with the question, and the best ones are handed to
+    the agent in one bundle. The agent then only calls read_node or
+    search_neighbors when the bundle is not enough, instead of paying one LLM
+    round trip per hop.
+
+    Attributes:
+    ----------
+    encoder : Text_Encoder or None
+        Encoder of the question and facts, GraphReader sets its index encoder when None.
+    alpha : float
+        Probability of the random walk following an edge, 0.85 by default.
+    max_hops : int
+        Depth of the explored neighborhood, 2 by default.
+    max_nodes : int
+        Largest number of nodes explored, 200 by default.
+    max_facts : int
+        Largest number of facts in a bundle, 30 by default.
+    max_chars : int
+        Largest total length of the fact texts in a bundle, 6000 by default.
+    similarity_weight : float
+        Share of the question similarity in a fact's score, 0.5 by default; 0 ranks by graph position only.
+    match_weight : float
+        Restart weight of shortlisted nodes relative to selected nodes, 0.5 by default.
+
+    Methods:
+    -------
+    rank_nodes(store, sel_nodes: list, node_matches: list = None) -> dict:
+        Returns the personalized PageRank scores of the explored nodes.
+
+    bundle(store, query: str, sel_nodes: list, node_matches: list = None) -> dict:
+        Returns the ranked nodes, the capped list of candidate facts and their chunk ids.
+    """
+    def __init__(self, encoder=None, alpha=0.85, max_hops=2, max_nodes=200, max_facts=30, max_chars=6000,
+                 similarity_weight=0.5, match_weight=0.5):
+        self.encoder = encoder
+        self.alpha = alpha
+        self.max_hops = max_hops
+        self.max_nodes = max_nodes
+        self.max_facts = max_facts
+        self.max_chars = max_chars
+        self.similarity_weight = similarity_weight
+        self.match_weight = match_weight
+
+    def __repr__(self):
+        return f"Prefetcher(max_hops={self.max_hops}, max_nodes={self.max_nodes}, max_facts={self.max_facts})"
+
+    def rank_nodes(self, store, sel_nodes, node_matches=None):
+        seeds = {str(node): self.match_weight for node in node_matches or []}
+        seeds.update({str(node): 1.0 for node in sel_nodes or []})
+        return personalized_pagerank(store.neighbors, seeds, alpha=self.alpha, max_hops=self.max_hops,
+                                     max_nodes=self.max_nodes)
+
+    def _similarities(self, query, texts):
+        if self.encoder is None or self.similarity_weight == 0 or not texts:
+            return np.zeros(len(texts))
+        vectors = np.asarray(self.encoder.get_embeddings([query] + texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1
+        vectors /= norms[:, None]
+        return np.clip(vectors[1:] @ vectors[0], 0, 1)
+
+    def bundle(self, store, query, sel_nodes, node_matches=None):
+        with get_tracer().span('query.prefetch') as span:
+            ranks = self.rank_nodes(store, sel_nodes, node_matches)
+            candidates = []
+            for node, rank in ranks.items():
+                # Facts of the best ranked nodes, a few times the cap, are scored
+                if len(candidates) >= 4 * self.max_facts:
+                    break
+                data = store.node_data(node)
+                # A single fact comes back from GML as a dict instead of a list
+                for fact in [data] if isinstance(data, dict) else data:
+                    candidates.append((node, rank, fact))
+            top_rank = max(ranks.values(), default=1) or 1
+            similarities = self._similarities(query, [fact['atom_fact'] for _, _, fact in candidates])
+            scores = [(1 - self.similarity_weight) * rank / top_rank + self.similarity_weight * similarity
+                      for (_, rank, _), similarity in zip(candidates, similarities)]
+            facts, seen, chars = [], set(), 0
+            # Best score first, earlier candidates first on ties
+            for i in sorted(range(len(candidates)), key=lambda i: -scores[i]):
+                node, _, fact = candidates[i]
+                score = scores[i]
+                key = (fact['atom_fact'], str(fact['chunk_id']))
+                if key in seen:
+                    continue
+                if len(facts) >= self.max_facts or chars + len(fact['atom_fact']) > self.max_chars:
+                    break
+                seen.add(key)
+                chars += len(fact['atom_fact'])
+                facts.append({'node': node, 'atom_fact': fact['atom_fact'], 'chunk_id': fact['chunk_id'],
+                              'score': round(float(score), 4)})
+            span.add(nodes_explored=len(ranks), facts=len(facts))
+        return {'nodes': list(ranks)[:self.max_facts], 'facts': facts,
+                'chunk_ids': list(dict.fromkeys(fact['chunk_id'] for fact in facts))}
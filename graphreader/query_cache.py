@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Stages of a query in the order they are computed; the plan depends only on the question
+STAGES = ('plan', 'node_matches', 'sel_nodes', 'sel_at_facts', 'response')
+
+
+class QueryCache:
+    """
+    A semantic cache of GraphReader answers and their intermediate results.
+
+    Incoming queries are embedded with a Text_Encoder and compared by cosine
+    similarity with the cached ones; the closest entry above the threshold is
+    reused. Besides the answer, every stage of a query is kept (rational plan,
+    shortlisted nodes, selected nodes, selected chunk ids), so a query whose run
+    stopped halfway, or whose answer is stale, only recomputes the later stages.
+
+    Each entry records the version of the graph and chunk store it was computed
+    on. After the version changes only the plan is reused, the stages that read
+    the graph are computed again. Entries expire after ttl seconds and the least
+    recently used ones are evicted beyond max_entries.
+
+    Attributes:
+    ----------
+    encoder : Text_Encoder
+        Encoder of the queries, GraphReader sets its index encoder when None.
+    threshold : float
+        Cosine similarity from which a cached query counts as the same query, 0.95 by default.
+    ttl : float or None
+        Seconds an entry stays valid, None for no expiry.
+    max_entries : int
+        Number of queries kept, 1000 by default.
+
+    Methods:
+    -------
+    lookup(query: str, version) -> dict:
+        Returns the reusable stages of the closest cached query, {} on a miss.
+
+    update(query: str, version, **stages) -> None:
+        Stores finished stages of a query.
+
+    stats() -> dict:
+        Returns the number of full hits, partial hits and misses.
+
+    clear() -> None:
+        Drops all entries.
+    """
+    def __init__(self, encoder=None, threshold=0.95, ttl=None, max_entries=1000):
+        self.encoder = encoder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._keys = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"QueryCache with {len(self._entries)} queries"
+
+    @staticmethod
+    def _key(query):
+        return " ".join(query.lower().split())
+
+    def _embed(self, query):
+        vector = np.asarray(self.encoder.get_embeddings(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry['created'] > self.ttl
+
+    def _closest(self, vector):
+        # The query matrix is rebuilt only after entries were added or removed
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key]['vector'] for key in self._keys]) if self._keys else None
+        if self._matrix is None:
+            return None
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self._keys[best] if scores[best] >= self.threshold else None
+
+    def _find(self, key, vector=None):
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is None and vector is not None:
+            key = self._closest(vector)
+            entry = self._entries.get(key) if key is not None else None
+        if entry is not None and self._expired(entry, now):
+            del self._entries[key]
+            self._matrix = None
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def lookup(self, query, version):
+        key = self._key(query)
+        with self._lock:
+            entry = self._find(key)
+        if entry is None and self._entries:
+            vector = self._embed(query)
+            with self._lock:
+                entry = self._find(key, vector)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return {}
+            found = {}
+            for stage in STAGES:
+                # Stages after the plan are only valid on the graph they were computed on
+                if stage not in entry['stages'] or (stage != 'plan' and entry['version'] != version):
+                    break
+                found[stage] = entry['stages'][stage]
+            if 'response' in found:
+                self.hits += 1
+            elif found:
+                self.partial_hits += 1
+            else:
+                self.misses += 1
+            return found
+
+    def update(self, query, version, **stages):
+        key = self._key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+        vector = self._embed(query) if entry is None else None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if vector is None:
+                    # Evicted since the first look
+                    vector = self._embed(query)
+                entry = self._entries[key] = {'vector': vector, 'created': time.time(),
+                                              'version': version, 'stages': {}}
+                self._matrix = None
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            elif entry['version'] != version:
+                # Keep the plan, drop what was read from the old graph
+                entry['stages'] = {'plan': entry['stages']['plan']} if 'plan' in entry['stages'] else {}
+                entry['version'] = version
+                entry['created'] = time.time()
+            entry['stages'].update(stages)
+            self._entries.move_to_end(key)
+
+    def stats(self):
+        return {'hits': self.hits, 'partial_hits': self.partial_hits, 'misses': self.misses,
+                'entries': len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """
+    A thread-safe sliding-window limiter for requests and tokens per minute.
+
+    Callers block in acquire() until the request fits in the last 60 seconds of
+    traffic. Token counts are estimates taken before the call; adjust() corrects
+    the entry of the request once the real usage is known, so the correction
+    leaves the window together with the tokens it corrects.
+
+    Attributes:
+    ----------
+    rpm : int or None
+        Maximum requests per minute, unlimited when None.
+    tpm : int or None
+        Maximum tokens per minute, unlimited when None.
+    window : float
+        Length of the sliding window in seconds.
+
+    Methods:
+    -------
+    acquire(tokens: int = 0) -> list or None:
+        Blocks until one request of the given token count can be sent, and returns its window entry.
+
+    adjust(tokens: int, entry=None) -> None:
+        Adds a token correction (positive or negative) to the entry returned by acquire(), which is
+        dropped once that entry left the window; without an entry it is added to the current window.
+
+    estimate_tokens(*texts) -> int:
+        Rough token count of the given texts, about four characters per token.
+    """
+    def __init__(self, rpm=None, tpm=None, window=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._requests = deque()
+        self._tokens = deque()
+        self._token_sum = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"RateLimiter(rpm={self.rpm}, tpm={self.tpm})"
+
+    @staticmethod
+    def estimate_tokens(*texts):
+        return sum(len(text) for text in texts if text) // 4 + 1
+
+    def _expire(self, now):
+        while self._requests and now - self._requests[0] >= self.window:
+            self._requests.popleft()
+        while self._tokens and now - self._tokens[0][0] >= self.window:
+            entry = self._tokens.popleft()
+            self._token_sum -= entry[1]
+            # Marks the entry as expired for adjust()
+            entry[0] = None
+
+    def _wait_time(self, now, tokens):
+        # Seconds until the oldest entries leave the window and make room, 0 if it fits now
+        wait = 0.0
+        if self.rpm and len(self._requests) >= self.rpm:
+            wait = max(wait, self._requests[0] + self.window - now)
+        if self.tpm and self._tokens and self._token_sum + tokens > self.tpm:
+            # A single request above the limit is let through once the window is empty
+            freed = self._token_sum
+            for stamp, count in self._tokens:
+                freed -= count
+                if freed + tokens <= self.tpm:
+                    wait = max(wait, stamp + self.window - now)
+                    break
+            else:
+                wait = max(wait, self._tokens[-1][0] + self.window - now)
+        return wait
+
+    def acquire(self, tokens=0):
+        if not self.rpm and not self.tpm:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._requests.append(now)
+                    if not self.tpm:
+                        return None
+                    # Kept even for 0 tokens, so the real usage can be charged to it
+                    entry = [now, tokens]
+                    self._tokens.append(entry)
+                    self._token_sum += tokens
+                    return entry
+            time.sleep(min(wait, 1.0))
+
+    def adjust(self, tokens, entry=None):
+        if not self.tpm or not tokens:
+            return
+        with self._lock:
+            if entry is None:
+                self._tokens.append([time.monotonic(), tokens])
+            elif entry[0] is not None:
+                entry[1] += tokens
+            else:
+                # The request already left the window, and its correction with it
+                return
+            self._token_sum += tokens
@@ -0,0 +1,42 @@
+import threading
+
+DEFAULT_ENCODER = 'sentence-transformers/all-MiniLM-L6-v2'
+
+_lock = threading.Lock()
+_encoders = {}
+_lemmatizer = None
+
+
+def get_lemmatizer():
+    """
+    Returns the shared WordNet lemmatizer, loading nltk and the corpus on first use.
+
+    The wordnet corpus is only downloaded when it is not installed yet, so
+    importing graphreader never touches the network.
+    """
+    global _lemmatizer
+    if _lemmatizer is None:
+        with _lock:
+            if _lemmatizer is None:
+                import nltk
+                from nltk.stem import WordNetLemmatizer
+                try:
+                    nltk.data.find('corpora/wordnet')
+                except LookupError:
+                    nltk.download('wordnet', quiet=True)
+                _lemmatizer = WordNetLemmatizer()
+    return _lemmatizer
+
+
+def get_encoder_model(model_name=DEFAULT_ENCODER):
+    """
+    Returns the shared SentenceTransformer for model_name, importing torch and loading it on first use.
+    """
+    model = _encoders.get(model_name)
+    if model is None:
+        with _lock:
+            model = _encoders.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = _encoders[model_name] = SentenceTransformer(model_name)
+    return model
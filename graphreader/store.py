@@ -0,0 +1,135 @@
+import os
+import pickle
+import threading
+from .chunk_store import ChunkStore
+from .graph_store import GraphStore, load_graph
+from .tracing import get_tracer
+
+
+class KnowledgeStore:
+    """
+    An in-memory view of the graph and text chunks used by the agent tools.
+
+    The graph and chunk files are parsed lazily on first access and kept in
+    memory, so each tool call is a dictionary lookup instead of a file parse.
+    Before every lookup the file's modification time and size are compared with
+    the loaded copy, and the file is parsed again when it changed on disk.
+    Objects passed in directly are used as they are and never reloaded. A
+    graphreader Graph can be passed as graph: its graph and chunks are read
+    through it, and its add_chunks and remove_chunks calls change version().
+
+    Attributes:
+    ----------
+    graph_path : str
+        Path of the GML graph file, or of a memory-mapped graph store written by export_graph(binary=True).
+    chunks_path : str
+        Path of the pickled chunk dictionary, or of a memory-mapped chunk store (.bin).
+
+    Methods:
+    -------
+    graph -> networkx.Graph
+        The loaded graph, reloaded when graph_path changes.
+
+    chunks -> dict
+        The loaded chunks, reloaded when chunks_path changes.
+
+    node_data(node_name: str) -> list:
+        Returns the atomic facts and chunk ids of a node.
+
+    neighbors(node_name: str) -> list:
+        Returns the names of the neighbors of a node.
+
+    chunk(chunk_id: int, offset: int = 0) -> str:
+        Returns the text of a chunk, or of the chunk offset positions after it.
+
+    parse_chunk_id(text: str) -> int:
+        Parses a chunk id written by the agent.
+
+    version() -> tuple:
+        Returns the modification time and size of the graph and chunk files, or the mutation count of a Graph passed in.
+
+    close() -> None:
+        Drops the loaded graph and chunks and unmaps the chunk store.
+    """
+    def __init__(self, graph_path='graph.gml', chunks_path='chunks.pkl', graph=None, chunks=None):
+        self.graph_path = graph_path
+        self.chunks_path = chunks_path
+        self._lock = threading.Lock()
+        # A Graph is kept to read its mutation count, its networkx graph and chunks dict change in place
+        self._source = graph if hasattr(graph, 'mutations') else None
+        if self._source is not None:
+            graph, chunks = graph.graph, graph.chunks if chunks is None else chunks
+        self._loaded = {'graph': (graph, None), 'chunks': (chunks, None)}
+
+    def __repr__(self):
+        return f"KnowledgeStore(graph={self.graph_path}, chunks={self.chunks_path})"
+
+    def _file_version(self, path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _get(self, name, path, loader):
+        value, version = self._loaded[name]
+        if value is not None and version is None:
+            return value
+        current = self._file_version(path)
+        if value is not None and version == current:
+            return value
+        with self._lock:
+            value, version = self._loaded[name]
+            if value is None or version != current:
+                old = value
+                # Loading or re-parsing a file shows up in traces, cached reads do not
+                with get_tracer().span('store.load', what=name, path=str(path)):
+                    value = loader(path)
+                self._loaded[name] = (value, current)
+                # The replaced store is unmapped, otherwise every file change leaks a mapping and a descriptor
+                if isinstance(old, (ChunkStore, GraphStore)):
+                    old.close()
+        return value
+
+    @staticmethod
+    def _load_chunks(path):
+        # A chunk store is only mapped, chunks are read from it on access
+        if str(path).endswith('.bin'):
+            return ChunkStore(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    @property
+    def graph(self):
+        return self._get('graph', self.graph_path, load_graph)
+
+    @property
+    def chunks(self):
+        return self._get('chunks', self.chunks_path, self._load_chunks)
+
+    def node_data(self, node_name):
+        return self.graph.nodes[node_name]['data']
+
+    def neighbors(self, node_name):
+        return list(self.graph.neighbors(node_name))
+
+    def chunk(self, chunk_id, offset=0):
+        return self.chunks[int(chunk_id) + offset]
+
+    @staticmethod
+    def parse_chunk_id(text):
+        return int(text)
+
+    def version(self):
+        # Changes whenever either file changes on disk, or a Graph passed in is updated;
+        # other objects passed in directly have a fixed version
+        fixed = self._source.mutations if self._source is not None else None
+        return tuple(fixed if self._loaded[name][0] is not None and self._loaded[name][1] is None
+                     else self._file_version(path)
+                     for name, path in (('graph', self.graph_path), ('chunks', self.chunks_path)))
+
+    def close(self):
+        # Unmaps the chunk and graph stores, the files can then be replaced or deleted
+        chunks, graph = self._loaded['chunks'][0], self._loaded['graph'][0]
+        if isinstance(chunks, ChunkStore):
+            chunks.close()
+        if isinstance(graph, GraphStore):
+            graph.close()
+        self._loaded = {'graph': (None, None), 'chunks': (None, None)}
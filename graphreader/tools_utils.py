@@ -1,7 +1,8 @@
 import itertools
+from typing import Union
 from langchain_core.tools import tool
-import networkx as nx
-import pickle
+from .store import KnowledgeStore
+from .tracing import get_tracer
 
 
 def chunks(iterable, batch_size=100):
@@ -13,95 +14,114 @@ def chunks(iterable, batch_size=100):
         chunk = tuple(itertools.islice(it, batch_size))
         
 @tool
-def read_node(node_name:str):
-    """
-    Read the node from graph and extract atomic facts.
-
-    Args:
-        node_name (str): The name of the node whose associated chunk IDs are to be retrieved.
-
-    Returns:
-        List[]: A list of dictionaries containing atomic facts and its respective chunk id.
-    """
-    print(f"Reading atomic facts for node: {node_name}") 
-    graph = nx.read_gml('graph.gml')
-    return graph.nodes[node_name]['data']
-
-@tool
-def search_neighbors(node_name:str):
-    """
-    Searches for neighboring nodes of the given input node .
-
-    Args:
-        node_name (str): The name of the node whose neighbors are to be retrieved.
-
-    Returns:
-        List[]: A list of nodes where each node has a list of dictionaries with atomic facts and chunk id.
-    """
-    print(f"Searching neighbors for node: {node_name}") 
-    graph = nx.read_gml('graph.gml')
-    neighbor_list =  graph.neighbors[node_name]['data']
-    return [graph.nodes[x]['data'] for x in neighbor_list]
-
-
-@tool
-def read_chunk(chunk_id:int):
+def write_notes(text: str):
     """
-    Retrieves the original text chunk from the given chunk id.
+    Appends the insights drawn from chunks by the model to a text file.
 
     Args:
-        chunk_id (int): Chunk id of the original text chunk.
-
-    Returns:
-        str: text chunk corresponding to the chunk id.
-    """
-    print(f"Retrieving chunk id: {chunk_id}") 
-    with open('chunks.pkl', 'rb') as f:
-        chunks = pickle.load(f)
-    return chunks[int(chunk_id)]
-
-
-@tool
-def read_next_chunk(chunk_id:int):
+        text (str): Insights to be appended to the file.
     """
-    Retrieves the next text chunk from the given chunk id.
-
-    Args:
-        chunk_id (int): Reference chunk id.
+    with open("text.txt", "a") as myfile:
+        myfile.write(text)
 
-    Returns:
-        str: text chunk corresponding to the next chunk id.
-    """
-    print(f"Retrieving chunk id: {int(chunk_id)+1}") 
-    with open('chunks.pkl', 'rb') as f:
-        chunks = pickle.load(f)
-    return chunks[int(chunk_id)+1]
 
-@tool
-def read_prev_chunk(chunk_id:int):
+def make_tools(store):
     """
-    Retrieves the previous text chunk from the given chunk id.
+    Creates the agent tools bound to a KnowledgeStore.
 
     Args:
-        chunk_id (int): Reference chunk id.
+        store (KnowledgeStore or CorpusStore): The store the tools read the graph and chunks from.
 
     Returns:
-        str: text chunk corresponding to the previous chunk id.
+        dict: The tools keyed by name.
     """
-    print(f"Retrieving chunk id: {int(chunk_id)-11}") 
-    with open('chunks.pkl', 'rb') as f:
-        chunks = pickle.load(f)
-    return chunks[int(chunk_id)-1]
-
-@tool
-def write_notes(text: str):
-    """
-    Appends the insights drawn from chunks by the model to a text file.
-
-    Args:
-        text (str): Insights to be appended to the file.
-    """
-    with open("text.txt", "a") as myfile:
-        myfile.write(text)
-
-
+    @tool
+    def read_node(node_name:str):
+        """
+        Read the node from graph and extract atomic facts.
+
+        Args:
+            node_name (str): The name of the node whose associated chunk IDs are to be retrieved.
+
+        Returns:
+            List[]: A list of dictionaries containing atomic facts and its respective chunk id.
+        """
+        print(f"Reading atomic facts for node: {node_name}") 
+        with get_tracer().span('tool.read_node', node=node_name):
+            return store.node_data(node_name)
+
+    @tool
+    def search_neighbors(node_name:str):
+        """
+        Searches for neighboring nodes of the given input node .
+
+        Args:
+            node_name (str): The name of the node whose neighbors are to be retrieved.
+
+        Returns:
+            List[]: A list of nodes where each node has a list of dictionaries with atomic facts and chunk id.
+        """
+        print(f"Searching neighbors for node: {node_name}") 
+        with get_tracer().span('tool.search_neighbors', node=node_name) as span:
+            neighbors = store.neighbors(node_name)
+            span.add(neighbors=len(neighbors))
+            return [store.node_data(x) for x in neighbors]
+
+    @tool
+    def read_chunk(chunk_id:Union[int, str]):
+        """
+        Retrieves the original text chunk from the given chunk id.
+
+        Args:
+            chunk_id (int or str): Chunk id of the original text chunk, as given in the atomic facts.
+
+        Returns:
+            str: text chunk corresponding to the chunk id.
+        """
+        print(f"Retrieving chunk id: {chunk_id}") 
+        with get_tracer().span('tool.read_chunk', chunk_id=chunk_id):
+            return store.chunk(chunk_id)
+
+    @tool
+    def read_next_chunk(chunk_id:Union[int, str]):
+        """
+        Retrieves the next text chunk from the given chunk id.
+
+        Args:
+            chunk_id (int or str): Reference chunk id.
+
+        Returns:
+            str: text chunk corresponding to the next chunk id.
+        """
+        print(f"Retrieving the chunk after chunk id: {chunk_id}") 
+        with get_tracer().span('tool.read_next_chunk', chunk_id=chunk_id):
+            return store.chunk(chunk_id, 1)
+
+    @tool
+    def read_prev_chunk(chunk_id:Union[int, str]):
+        """
+        Retrieves the previous text chunk from the given chunk id.
+
+        Args:
+            chunk_id (int or str): Reference chunk id.
+
+        Returns:
+            str: text chunk corresponding to the previous chunk id.
+        """
+        print(f"Retrieving the chunk before chunk id: {chunk_id}") 
+        with get_tracer().span('tool.read_prev_chunk', chunk_id=chunk_id):
+            return store.chunk(chunk_id, -1)
+
+    return {'read_node': read_node, 'search_neighbors': search_neighbors, 'read_chunk': read_chunk,
+            'read_next_chunk': read_next_chunk, 'read_prev_chunk': read_prev_chunk,
+            'write_notes': write_notes}
+
+
+# Tools over graph.gml and chunks.pkl in the working directory, loaded once on first use
+default_store = KnowledgeStore()
+_default_tools = make_tools(default_store)
+read_node = _default_tools['read_node']
+search_neighbors = _default_tools['search_neighbors']
+read_chunk = _default_tools['read_chunk']
+read_next_chunk = _default_tools['read_next_chunk']
+read_prev_chunk = _default_tools['read_prev_chunk']
@@ -0,0 +1,305 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+# The span the running code is inside, per thread and per asyncio task
+_current = contextvars.ContextVar('graphreader_span', default=None)
+
+
+class Span:
+    """
+    One timed operation, e.g. a query stage, a tool call or an LLM call.
+
+    A span is started when it is created and ended when its with block exits or
+    end() is called; it is then handed to the tracer's exporters. Inside its with
+    block it is the current span, the parent of the spans started there.
+
+    Attributes:
+    ----------
+    name : str
+        Dotted kind of the operation, e.g. 'query.plan', 'tool.read_node' or 'llm.completion'.
+    trace_id, span_id, parent_id : str
+        Ids linking the span to its trace and parent, parent_id is None for a root span.
+    attrs : dict
+        Descriptive values, e.g. the model or the node name.
+    counts : dict
+        Counters added with add(), e.g. llm_calls, prompt_tokens, completion_tokens, cache_hits.
+    duration_s : float or None
+        Wall time in seconds, None until the span ends.
+
+    Methods:
+    -------
+    add(**counts) -> None:
+        Adds to the counters of the span.
+
+    set(**attrs) -> None:
+        Sets attributes of the span.
+
+    end(error=None) -> None:
+        Ends the span and exports it, only the first call counts.
+    """
+    def __init__(self, tracer, name, parent=None, **attrs):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attrs = attrs
+        self.counts = {}
+        self.error = None
+        self.start = time.time()
+        self.duration_s = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._token = None
+
+    def __repr__(self):
+        return f"Span '{self.name}'"
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.end(error=repr(exc) if exc is not None else None)
+        return False
+
+    def add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.counts[key] = self.counts.get(key, 0) + value
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self, error=None):
+        with self._lock:
+            if self.duration_s is not None:
+                return
+            self.duration_s = time.perf_counter() - self._start
+            self.error = error
+        self.tracer._export(self)
+
+    def to_dict(self):
+        return {'name': self.name, 'trace_id': self.trace_id, 'span_id': self.span_id,
+                'parent_id': self.parent_id, 'start': self.start, 'duration_s': self.duration_s,
+                'attrs': self.attrs, 'counts': self.counts, 'error': self.error}
+
+
+class _NoopSpan:
+    # Returned while tracing is off, every call is a no-op
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, **counts):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+    def end(self, error=None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Creates spans and hands the finished ones to exporters.
+
+    Without exporters tracing is off: span() returns a shared no-op span and the
+    instrumented code runs as if untraced. The tracer used by graphreader is
+    set process-wide with set_tracer().
+
+    Attributes:
+    ----------
+    exporters : list
+        Objects with an export(span_dict) method, e.g. JSONLinesExporter or InMemoryExporter.
+
+    Methods:
+    -------
+    span(name: str, **attrs) -> Span:
+        Starts a span, a child of the current span. Use it in a with block to make it current.
+
+    current() -> Span:
+        Returns the current span, a no-op span outside of any span.
+
+    add_exporter(exporter) -> None:
+        Adds an exporter and turns tracing on.
+    """
+    def __init__(self, exporters=None):
+        self.exporters = list(exporters or [])
+
+    def __repr__(self):
+        return f"Tracer with {len(self.exporters)} exporters"
+
+    @property
+    def enabled(self):
+        return bool(self.exporters)
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def span(self, name, **attrs):
+        if not self.exporters:
+            return NOOP_SPAN
+        return Span(self, name, _current.get(), **attrs)
+
+    def current(self):
+        span = _current.get()
+        return span if span is not None and self.exporters else NOOP_SPAN
+
+    def _export(self, span):
+        record = span.to_dict()
+        for exporter in self.exporters:
+            exporter.export(record)
+
+
+class InMemoryExporter:
+    """
+    Keeps finished spans in a list, for tests and interactive use.
+
+    Attributes:
+    ----------
+    spans : list
+        The finished spans as dicts, in the order they ended.
+
+    Methods:
+    -------
+    summary() -> list:
+        Returns summarize(spans).
+
+    clear() -> None:
+        Drops the collected spans.
+    """
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"InMemoryExporter with {len(self.spans)} spans"
+
+    def export(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        return summarize(self.spans)
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+
+class JSONLinesExporter:
+    """
+    Appends every finished span as one JSON line to a file, 'data/traces.jsonl' by default.
+
+    Methods:
+    -------
+    close() -> None:
+        Closes the file.
+    """
+    def __init__(self, path='data/traces.jsonl'):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"JSONLinesExporter to {self.path}"
+
+    def export(self, span):
+        line = json.dumps(span, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_spans(path='data/traces.jsonl'):
+    """Reads the spans written by a JSONLinesExporter."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(spans):
+    """
+    Says where the time of each trace went.
+
+    The self time of a span is its wall time minus that of its children, so the
+    breakdown of a sequential trace adds up to its total. Children that ran in
+    parallel can make the breakdown exceed the total. Counters are summed over
+    the whole trace.
+
+    Args:
+        spans (list): Finished spans as dicts, from an exporter or load_spans().
+
+    Returns:
+        List[dict]: Per root span: name, attrs, total_s, the self time per span name
+        ('breakdown', largest first) and the summed counts.
+    """
+    children = {}
+    for span in spans:
+        children.setdefault(span['parent_id'], []).append(span)
+    summaries = []
+    for root in children.get(None, []):
+        breakdown = {}
+        counts = {}
+        stack = [root]
+        while stack:
+            span = stack.pop()
+            kids = children.get(span['span_id'], [])
+            own = max(0.0, span['duration_s'] - sum(kid['duration_s'] for kid in kids))
+            breakdown[span['name']] = breakdown.get(span['name'], 0.0) + own
+            for key, value in span['counts'].items():
+                counts[key] = counts.get(key, 0) + value
+            stack.extend(kids)
+        summaries.append({'name': root['name'], 'trace_id': root['trace_id'], 'attrs': root['attrs'],
+                          'total_s': round(root['duration_s'], 4),
+                          'breakdown': {name: round(seconds, 4) for name, seconds in
+                                        sorted(breakdown.items(), key=lambda item: -item[1])},
+                          'counts': counts})
+    return summaries
+
+
+def propagate(fn):
+    """
+    Wraps fn to run under the span current now, for calls made from worker threads.
+    """
+    parent = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """Returns the process-wide tracer, off until it has an exporter."""
+    return _tracer
+
+
+def set_tracer(tracer):
+    """Replaces the process-wide tracer, e.g. set_tracer(Tracer([JSONLinesExporter()]))."""
+    global _tracer
+    _tracer = tracer
@@ -0,0 +1,122 @@
+import hashlib
+from abc import ABC, abstractmethod
+import networkx as nx
+from .Text_encoder import Text_Encoder
+from .graph_store import GraphStore
+from .compact_graph import CompactGraph
+
+
+class VectorStore(ABC):
+    """
+    Base class of the vector indexes GraphReader retrieves nodes from.
+
+    A vector store embeds the atomic facts of every graph node with a
+    Text_Encoder, stores one vector per node with the node name as metadata,
+    and answers text queries with the closest nodes. Backends implement
+    upsert_data, write_vectors and query_index, which are abstract, so an
+    incomplete backend fails when it is created; the embedding of nodes, the
+    vector records and update_nodes are shared here.
+
+    Attributes:
+    ----------
+    encoder_model : SentenceTransformer or None
+        The sentence embedding model, None for the shared default loaded on first use.
+    encoder : Text_Encoder
+        The encoder used for node texts and queries. Node embeddings are cached
+        in memory and in 'data/embedding_cache.sqlite' (embedding_cache kwarg,
+        None disables it), so re-indexing an unchanged graph encodes nothing.
+    vector_dimension : int
+        Dimension of the embeddings.
+    metric : str
+        Similarity metric of the index.
+
+    Methods:
+    -------
+    upsert_data(index_name, graph, **kwargs) -> None:
+        Embeds all nodes of the graph and writes them to the index.
+
+    update_nodes(index_name, graph, changes, namespace='') -> None:
+        Re-embeds the added and updated nodes and deletes the removed ones.
+
+    write_vectors(index_name, vector_list, removed=(), namespace='') -> None:
+        Inserts or replaces already embedded vector records and deletes the removed nodes.
+
+    flush(index_name, namespace='') -> None:
+        Persists the writes made so far, for backends that buffer them.
+
+    query_index(query_text, index_name=None, **kwargs) -> dict:
+        Returns {'matches': [{'id', 'score', 'metadata': {'node'}}]} for the closest nodes.
+        A namespace kwarg searches one namespace of the index.
+
+    query_namespaces(query_text, index_name, namespaces, **kwargs) -> dict:
+        Searches several namespaces and merges the matches by score, each tagged with its namespace.
+    """
+    def __init__(self, **kwargs):
+        self.vector_dimension = kwargs.get('vector_dim',384)
+        self.metric = kwargs.get('metric','cosine')
+        self.encoder_model = kwargs.get('encoder_model')
+        self.encoder = Text_Encoder(encoder_model=self.encoder_model,
+                                    batch_size=kwargs.get('encode_batch_size',64),
+                                    num_processes=kwargs.get('encode_processes',1),
+                                    disk_cache=kwargs.get('embedding_cache','data/embedding_cache.sqlite'))
+
+    def _node_graph(self,graph):
+        # Accept a networkx graph, a GraphStore, a CompactGraph and a graphreader Graph wrapping one
+        return graph if isinstance(graph, (nx.Graph, GraphStore, CompactGraph)) else graph.graph
+
+    def _node_id(self,node):
+        # Stable vector id per node name, so single nodes can be replaced or deleted later
+        return hashlib.md5(node.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _node_text(data):
+        # The text embedded for a node: all of its atomic facts
+        return " ".join([x['atom_fact'] for x in data])
+
+    def _vector_records(self,nodes,embs):
+        return [{'id': self._node_id(node), 'values': emb, "metadata": {"node": node}}
+                for node, emb in zip(nodes, embs)]
+
+    def _embed_nodes(self,graph,nodes=None):
+        graph = self._node_graph(graph)
+        nodes = list(graph.nodes()) if nodes is None else nodes
+        return self.encoder.get_embeddings([self._node_text(graph.nodes[node]['data']) for node in nodes])
+
+    def _get_vectors(self,graph,nodes=None):
+        # Returned rather than kept on the instance, so concurrent upserts don't overwrite each other
+        nodes = list(self._node_graph(graph).nodes()) if nodes is None else nodes
+        return self._vector_records(nodes, self._embed_nodes(graph,nodes))
+
+    @abstractmethod
+    def upsert_data(self,index_name,graph,**kwargs):
+        pass
+
+    def update_nodes(self,index_name,graph,changes,namespace=''):
+        # Re-embed only the nodes reported by Graph.add_chunks / Graph.remove_chunks
+        nodes = changes['added'] + changes['updated']
+        vector_list = self._get_vectors(graph,nodes) if nodes else []
+        self.write_vectors(index_name, vector_list, removed=changes['removed'], namespace=namespace)
+        self.flush(index_name, namespace=namespace)
+
+    @abstractmethod
+    def write_vectors(self,index_name,vector_list,removed=(),namespace=''):
+        pass
+
+    def flush(self,index_name,namespace=''):
+        pass
+
+    @abstractmethod
+    def query_index(self,query_text,index_name=None,**kwargs):
+        pass
+
+    def query_namespaces(self,query_text,index_name,namespaces,**kwargs):
+        # The encoder caches the query, so it is embedded once for all namespaces
+        top_k = kwargs.get('top_k', getattr(self, 'top_k', 20))
+        matches = []
+        for namespace in namespaces:
+            found = self.query_index(query_text, index_name=index_name, namespace=namespace, top_k=top_k)
+            for match in found['matches']:
+                matches.append({'id': match['id'], 'score': match['score'], 'namespace': namespace,
+                                'metadata': dict(match['metadata'])})
+        matches.sort(key=lambda match: match['score'], reverse=True)
+        return {'matches': matches[:top_k]}
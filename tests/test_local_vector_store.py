@@ -0,0 +1,55 @@
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+import networkx as nx
+import numpy as np
+from graphreader.local_vector_store import LocalVectorStore
+
+
+class WordHashEncoder:
+    def encode(self, text, **kwargs):
+        texts = [text] if isinstance(text, str) else text
+        vectors = np.zeros((len(texts), 384), dtype=np.float32)
+        for row, t in enumerate(texts):
+            for word in re.findall(r'\w+', t.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 384] += 1.0
+        return vectors[0] if isinstance(text, str) else vectors
+
+
+def namespace_graph(prefix, n=50):
+    graph = nx.Graph()
+    for i in range(n):
+        graph.add_node(f"{prefix}{i}", data=[{'atom_fact': f"{prefix}{i} met word{i % 7}", 'chunk_id': i}])
+    return graph
+
+
+def test_concurrent_queries_search_their_own_namespace(tmp_path):
+    store = LocalVectorStore(encoder_model=WordHashEncoder(), embedding_cache=None, path=tmp_path)
+    for namespace in ('a', 'b'):
+        store.upsert_data('test', namespace_graph(namespace), namespace=namespace)
+    # Queries reload the namespaces from disk, as a fresh reader would
+    store.indexes.clear()
+
+    def query(i):
+        namespace = 'ab'[i % 2]
+        found = store.query_index(f"word{i % 7}", index_name='test', namespace=namespace, top_k=5)
+        return namespace, [match['metadata']['node'] for match in found['matches']]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(query, range(400)))
+    for namespace, nodes in results:
+        assert len(nodes) == 5
+        assert all(node.startswith(namespace) for node in nodes)
+
+
+def test_concurrent_upserts_index_their_own_graph(tmp_path):
+    store = LocalVectorStore(encoder_model=WordHashEncoder(), embedding_cache=None, path=tmp_path)
+
+    def upsert(namespace):
+        store.upsert_data('test', namespace_graph(namespace, n=200), namespace=namespace)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(upsert, 'abcd'))
+    for namespace in 'abcd':
+        found = store.query_index("word3", index_name='test', namespace=namespace, top_k=10)
+        assert all(match['metadata']['node'].startswith(namespace) for match in found['matches'])